@@ -1,11 +1,9 @@
-import os
 import warnings
 warnings.filterwarnings('ignore')
-from crewai import LLM, Agent, Crew, Process, Task  # noqa: E402
+from crewai import Agent, Crew, Process, Task  # noqa: E402
 from crewai.project import CrewBase, agent, crew, task# noqa: E402
-from tools.rag_tool import rag_tool# noqa: E402
-from tools.image_search_tool import pexels_cover_tool  # noqa: E402
-from tools.devto_publisher_tool import devto_publisher_tool # noqa: E402
+from utils.registry import registry  # noqa: E402
+from utils import tracing  # noqa: E402
 from dotenv import load_dotenv  # noqa: E402
 load_dotenv()
 
@@ -17,22 +15,14 @@ class BlogWritingCrew:
     agents_config = "config/agents.yaml"
     tasks_config = "config/tasks.yaml"
 
-    def __init__(self): 
-        self.rag_tool = rag_tool
-        self.pexels_cover_tool = pexels_cover_tool
-        self.devto_publisher_tool = devto_publisher_tool
-        self.gemini_flash = LLM(
-            model="gemini/gemini-2.5-flash",
-            api_key=os.getenv("GEMINI_API_KEY"),
-            temperature=0.01,
-        )
+    # Tools and the LLM come from the shared registry and are built on first use
 
     @agent
     def draft_creator(self) -> Agent:
         return Agent(
             config=self.agents_config["draft_creator"],  # type: ignore
-            tools=[self.rag_tool],
-            llm=self.gemini_flash,
+            tools=[registry.get("rag_tool")],
+            llm=registry.get("gemini_flash"),
             verbose=True,
             allow_delegation=False,
             max_iter=10,
@@ -42,8 +32,8 @@ class BlogWritingCrew:
     def senior_writer(self) -> Agent:
         return Agent(
             config=self.agents_config["senior_writer"],  # type: ignore
-            tools=[self.rag_tool, self.pexels_cover_tool],
-            llm=self.gemini_flash,
+            tools=[registry.get("rag_tool"), registry.get("pexels_cover_tool")],
+            llm=registry.get("gemini_flash"),
             verbose=True,
             allow_delegation=True,
             max_iter=10
@@ -53,8 +43,8 @@ class BlogWritingCrew:
     def devto_publisher(self) -> Agent:
         return Agent(
             config=self.agents_config["devto_publisher"],  # type: ignore
-            tools=[devto_publisher_tool],
-            llm=self.gemini_flash, 
+            tools=[registry.get("devto_publisher_tool")],
+            llm=registry.get("gemini_flash"), 
             verbose=True,
             allow_delegation=False,
             max_iter=5
@@ -64,7 +54,7 @@ class BlogWritingCrew:
     def social_media_post_creator(self) -> Agent:
         return Agent(
             config=self.agents_config["social_media_post_creator"],  # type: ignore
-            llm=self.gemini_flash,
+            llm=registry.get("gemini_flash"),
             verbose=True,
             allow_delegation=False,
             max_iter=5
@@ -78,7 +68,7 @@ class BlogWritingCrew:
             config=self.tasks_config["draft_creation_task"],  # type: ignore
             agent=self.draft_creator(),
             markdown=True,
-            output_file="output/drafts/draft_creation_{topic}.md",
+            output_file="{output_dir}/drafts/draft_creation_{topic}.md",
         )
 
     @task
@@ -88,7 +78,7 @@ class BlogWritingCrew:
             agent=self.senior_writer(),
             context=[self.draft_creation_task()],
             markdown=True,
-            output_file="output/blogs/final_writing_{topic}.md",
+            output_file="{output_dir}/blogs/final_writing_{topic}.md",
         )
     
     @task
@@ -97,7 +87,7 @@ class BlogWritingCrew:
             config=self.tasks_config["publishing_task"],  # type: ignore
             agent=self.devto_publisher(),
             context=[self.final_writing_task()],
-            output_file="output/publication/publishing_{topic}.json",
+            output_file="{output_dir}/publication/publishing_{topic}.json",
         )
     
     @task
@@ -106,7 +96,7 @@ class BlogWritingCrew:
             config=self.tasks_config["social_media_post_task"],  # type: ignore
             agent=self.social_media_post_creator(),
             context=[self.draft_creation_task(),self.publishing_task()],
-            output_file="output/social_media/linkedin_post_{topic}.txt",
+            output_file="{output_dir}/social_media/linkedin_post_{topic}.txt",
         )
 
 
@@ -118,7 +108,9 @@ class BlogWritingCrew:
             process=Process.sequential,
             verbose=True,
             memory=False,
-            max_rpm=40,            
             language="en",  # type: ignore
+            # Task and agent-step boundaries become spans when a tracer is active
+            step_callback=tracing.step_callback,
+            task_callback=tracing.task_callback,
         )
  
\ No newline at end of file
@@ -0,0 +1,119 @@
+import os
+import json
+import time
+import threading
+from typing import Any
+from crewai import LLM
+from dotenv import load_dotenv
+from utils.rate_limiter import get_rate_limiter, is_rate_limit_error, retry_after_seconds
+from utils.tracing import span
+from utils.ledger import record_llm_call
+load_dotenv()
+
+GEMINI_MODEL = "gemini/gemini-2.5-flash"
+
+
+def estimate_tokens(payload: Any) -> int:
+    """Rough token count (~4 characters per token) for rate limiting"""
+    text = payload if isinstance(payload, str) else json.dumps(payload, default=str)
+    return len(text) // 4 + 1
+
+
+class _UsageCapture:
+    """
+    Callback that keeps the provider-reported usage of one completion.
+    crewai also installs call callbacks on the global `litellm.callbacks`, so
+    with concurrent flows litellm may hand this capture another call's
+    response from its logging thread. Only crewai's own report of this call
+    counts: it is made in the calling thread, with the usage in a plain dict.
+    """
+
+    def __init__(self):
+        self.usage = None
+        self._thread = threading.get_ident()
+
+    def log_success_event(self, kwargs, response_obj, start_time, end_time) -> None:
+        if threading.get_ident() != self._thread or not isinstance(response_obj, dict):
+            return
+        self.usage = response_obj.get("usage")
+
+
+def _usage_counts(usage: Any) -> tuple:
+    """(prompt, completion, cached prompt) tokens from a litellm Usage object or dict"""
+    get = usage.get if isinstance(usage, dict) else lambda key: getattr(usage, key, None)
+    details = get("prompt_tokens_details")
+    cached = details.get("cached_tokens") if isinstance(details, dict) else getattr(details, "cached_tokens", None)
+    return int(get("prompt_tokens") or 0), int(get("completion_tokens") or 0), int(cached or 0)
+
+
+class RateLimitedLLM(LLM):
+    """
+    LLM whose calls go through the process-wide limiter for its model, so every
+    crew and concurrent flow shares one requests/tokens-per-minute budget.
+    Throttling errors shrink the budget and are retried after a pause.
+    """
+
+    def __init__(self, *args: Any, max_rpm: float = 10, max_tpm: float = 250_000,
+                 max_rate_limit_retries: int = 5, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.rate_limiter = get_rate_limiter(self.model, max_rpm=max_rpm, max_tpm=max_tpm)
+        self.max_rate_limit_retries = max_rate_limit_retries
+
+    def call(self, messages, *args: Any, **kwargs: Any):
+        prompt_tokens = estimate_tokens(messages)
+        # Capture the real usage next to crewai's own token counter
+        capture = _UsageCapture()
+        if len(args) >= 2:
+            args = (args[0], [*(args[1] or []), capture], *args[2:])
+        else:
+            kwargs["callbacks"] = [*(kwargs.get("callbacks") or []), capture]
+        with span(f"llm:{self.model}", "llm", prompt_tokens_est=prompt_tokens) as s:
+            for attempt in range(self.max_rate_limit_retries + 1):
+                waited = self.rate_limiter.acquire(prompt_tokens)
+                s.set(attempts=attempt + 1, rate_limit_wait_s=round(waited, 3))
+                started = time.perf_counter()
+                try:
+                    response = super().call(messages, *args, **kwargs)
+                except Exception as e:
+                    if not is_rate_limit_error(e) or attempt == self.max_rate_limit_retries:
+                        raise
+                    pause = self.rate_limiter.on_rate_limit(retry_after_seconds(e))
+                    print(f"⏳ {self.model} rate limited, retrying in {pause:.1f}s "
+                          f"(attempt {attempt + 1}/{self.max_rate_limit_retries}, "
+                          f"rate now {self.rate_limiter.fraction:.0%} of limit)")
+                    continue
+                # The prompt was charged up front; charge the completion now
+                completion_tokens = estimate_tokens(response) if isinstance(response, str) else 0
+                s.set(completion_tokens_est=completion_tokens)
+                self.rate_limiter.record_tokens(completion_tokens)
+                self.rate_limiter.on_success()
+                self._record_usage(capture.usage, prompt_tokens, completion_tokens,
+                                   time.perf_counter() - started, kwargs.get("from_task"), kwargs.get("from_agent"))
+                return response
+
+    def _record_usage(self, usage: Any, prompt_estimate: int, completion_estimate: int, seconds: float,
+                      from_task: Any, from_agent: Any) -> None:
+        """Ledger row for one call, falling back to the ~4 chars/token estimate without provider usage"""
+        if usage:
+            prompt, completion, cached = _usage_counts(usage)
+        else:
+            prompt, completion, cached = prompt_estimate, completion_estimate, 0
+        agent = from_agent or getattr(from_task, "agent", None)
+        record_llm_call(
+            self.model, prompt, completion, cached,
+            estimated=not usage,
+            seconds=round(seconds, 3),
+            task=getattr(from_task, "name", None) or None,
+            agent=(getattr(agent, "role", None) or "").strip() or None,
+        )
+
+def build_gemini_flash() -> LLM:
+    """Gemini 2.5 Flash client shared by the research and blog writing crews"""
+    return RateLimitedLLM(
+        model=GEMINI_MODEL,
+        api_key=os.getenv("GEMINI_API_KEY"),
+        temperature=0.01,
+        # Defaults match the Gemini 2.5 Flash free tier; raise them for paid quotas
+        max_rpm=float(os.getenv("GEMINI_MAX_RPM", "10")),
+        max_tpm=float(os.getenv("GEMINI_MAX_TPM", "250000")),
+    )
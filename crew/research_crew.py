@@ -1,9 +1,9 @@
-import os
 import warnings
 warnings.filterwarnings('ignore')
-from crewai import LLM, Agent, Crew, Process, Task # noqa: E402
+from crewai import Agent, Crew, Process, Task # noqa: E402
 from crewai.project import CrewBase, agent, crew, task # noqa: E402
-from tools.search_and_emb import search_and_emb_tool# noqa: E402
+from utils.registry import registry # noqa: E402
+from utils import tracing # noqa: E402
 from dotenv import load_dotenv # noqa: E402
 
 load_dotenv()
@@ -15,20 +15,14 @@ class ResearchCrew:
     agents_config = "config/research_agents.yaml"
     tasks_config = "config/research_tasks.yaml"
 
-    def __init__(self):
-        self.search_and_emb_tool = search_and_emb_tool
-        self.gemini_flash = LLM(
-            model="gemini/gemini-2.5-flash",
-            api_key=os.getenv("GEMINI_API_KEY"),
-            temperature=0.01,
-        )
+    # Tools and the LLM come from the shared registry and are built on first use
 
     @agent
     def research_specialist(self) -> Agent:
         return Agent(
             config=self.agents_config["research_specialist"],
-            tools=[self.search_and_emb_tool],
-            llm=self.gemini_flash,
+            tools=[registry.get("search_and_emb_tool")],
+            llm=registry.get("gemini_flash"),
             verbose=True,
             allow_delegation=False,
             max_iter=1,
@@ -39,7 +33,7 @@ class ResearchCrew:
         return Task(
             config=self.tasks_config["research_and_embed_task"],
             agent=self.research_specialist(),
-            output_file="output/research/research_report_{topic}.md",
+            output_file="{output_dir}/research/research_report_{topic}.md",
         )
 
     @crew
@@ -50,6 +44,8 @@ class ResearchCrew:
             process=Process.sequential,
             verbose=True,
             memory=False,
-            max_rpm=10,
             language="en",
+            # Task and agent-step boundaries become spans when a tracer is active
+            step_callback=tracing.step_callback,
+            task_callback=tracing.task_callback,
         )
@@ -0,0 +1,137 @@
+# flow/batch_runner.py
+"""
+Non-interactive batch mode: run many BlogWritingFlow instances concurrently.
+Each flow is its own run: its RAG namespace and its output files (under
+output/runs/{run_id}/) never collide with another flow's, even for the
+same topic. Duplicate topics are still run, with a warning.
+"""
+
+import math
+import time
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from tools.rag_adapter import namespace_for
+
+DEFAULT_WORD_COUNT = "1200"
+DEFAULT_READ_TIME = "6"
+
+
+def load_topics(path: str) -> List[Dict[str, str]]:
+    """
+    Read a topics file with one `topic | word_count | read_time` per line.
+    word_count and read_time are optional; blank lines and `#` comments are ignored.
+    """
+    topics = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            parts = [p.strip() for p in line.split("|")]
+            topics.append({
+                "topic": parts[0],
+                "word_count": parts[1] if len(parts) > 1 and parts[1] else DEFAULT_WORD_COUNT,
+                "read_time": parts[2] if len(parts) > 2 and parts[2] else DEFAULT_READ_TIME,
+            })
+    return topics
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile (0 for an empty list)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def run_batch(topics: List[Dict[str, str]], concurrency: int = 2, batch_id: Optional[str] = None,
+              printer: Callable[[str], None] = print) -> Dict[str, Any]:
+    """Run one flow per topic with at most `concurrency` flows at a time"""
+    from flow.blog_flow import BlogWritingFlow
+
+    batch_id = batch_id or time.strftime("%Y%m%d-%H%M%S")
+    counts = Counter(item["topic"].strip().lower() for item in topics)
+    duplicates = sorted({item["topic"] for item in topics if counts[item["topic"].strip().lower()] > 1})
+
+    print_lock = threading.Lock()
+
+    def run_one(index: int, item: Dict[str, str]) -> Dict[str, Any]:
+        started = time.perf_counter()
+        flow = None
+        # One run id per flow: traces, checkpoints, output files and the RAG namespace are per run
+        run_id = f"{batch_id}-{index:02d}"
+        try:
+            flow = BlogWritingFlow(
+                topic=item["topic"],
+                word_count=item["word_count"],
+                read_time=item["read_time"],
+                run_id=run_id,
+                namespace=namespace_for(item["topic"], run_id),
+            )
+            flow.kickoff()
+            status, error = "completed", None
+        except Exception as e:
+            status, error = "failed", str(e)
+        seconds = time.perf_counter() - started
+        usage = flow.ledger.run_summary(flow.run_id) if flow is not None and flow.ledger is not None else None
+        with print_lock:
+            icon = "✅" if status == "completed" else "❌"
+            printer(f"{icon} {item['topic']} ({seconds:.1f}s){'' if error is None else ': ' + error}")
+        return {
+            **item, "status": status, "seconds": round(seconds, 2), "error": error,
+            "run_id": flow.run_id if flow is not None else None,
+            "total_tokens": usage["total_tokens"] if usage else 0,
+            "cost_usd": usage["cost_usd"] if usage else 0.0,
+        }
+
+    printer(f"📦 Batch {batch_id}: {len(topics)} topics, concurrency {concurrency}")
+    if duplicates:
+        printer(f"⚠️ Topics listed more than once run as separate runs: {', '.join(duplicates)}")
+    started = time.perf_counter()
+    results = []
+    if topics:
+        with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(topics)))) as pool:
+            futures = [pool.submit(run_one, i, item) for i, item in enumerate(topics, 1)]
+            # Report in input order, not completion order
+            results = [future.result() for future in futures]
+    wall = time.perf_counter() - started
+
+    durations = [r["seconds"] for r in results if r["status"] == "completed"]
+    completed = len(durations)
+    return {
+        "batch_id": batch_id,
+        "topics": len(topics),
+        "completed": completed,
+        "failed": len(results) - completed,
+        "duplicate_topics": duplicates,
+        "concurrency": concurrency,
+        "wall_seconds": round(wall, 2),
+        "topics_per_hour": round(completed / wall * 3600, 2) if wall > 0 else 0.0,
+        "p50_seconds": round(percentile(durations, 50), 2),
+        "p95_seconds": round(percentile(durations, 95), 2),
+        "total_tokens": sum(r["total_tokens"] for r in results),
+        "cost_usd": round(sum(r["cost_usd"] for r in results), 6),
+        "results": results,
+    }
+
+
+def print_batch_report(report: Dict[str, Any], printer: Callable[[str], None] = print) -> None:
+    printer("=" * 60)
+    printer(f"📦 BATCH {report['batch_id']} REPORT")
+    printer("=" * 60)
+    printer(f"  Topics: {report['topics']} (completed {report['completed']}, failed {report['failed']})")
+    if report["duplicate_topics"]:
+        printer(f"  Duplicate topics (run separately): {', '.join(report['duplicate_topics'])}")
+    printer(f"  Concurrency: {report['concurrency']}")
+    printer(f"  Wall time: {report['wall_seconds']:.1f}s")
+    printer(f"  Throughput: {report['topics_per_hour']:.2f} topics/hour")
+    printer(f"  Time per topic: p50 {report['p50_seconds']:.1f}s, p95 {report['p95_seconds']:.1f}s")
+    printer(f"  Tokens: {report['total_tokens']:,} (estimated cost ${report['cost_usd']:.4f})")
+    for r in report["results"]:
+        if r["status"] == "failed":
+            printer(f"  ❌ {r['topic']}: {r['error']}")
+    printer("=" * 60)
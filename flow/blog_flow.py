@@ -1,7 +1,14 @@
+import time
+from contextlib import contextmanager, ExitStack
 from typing import Dict, Any
 from crewai.flow.flow import Flow, listen, start
 from crew.research_crew import ResearchCrew
 from crew.blog_crew import BlogWritingCrew
+from tools.rag_adapter import namespace_for
+from utils.registry import registry
+from utils import tracing
+from utils.ledger import attribute_to, count_words
+from flow.checkpoints import RunCheckpoint
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -10,15 +17,45 @@ class BlogWritingFlow(Flow):
     """
     Flow for automated blog writing with separated research and content creation crews.
     """
-    def __init__(self, topic: str = None, word_count: str = None, read_time: str = None):
+    def __init__(self, topic: str = None, word_count: str = None, read_time: str = None,
+                 run_id: str = None, namespace: str = None, search_all_namespaces: bool = False,
+                 trace: bool = True, record_usage: bool = True):
         super().__init__()
         # Store inputs as instance variables
         self.topic = topic or "The impact of AI on education"
         self.word_count = word_count or "1200"
         self.read_time = read_time or "6"
+        self.run_id = run_id or time.strftime("%Y%m%d-%H%M%S")
+        # RAG namespace for this run; re-runs of a topic share it unless one is given
+        self.namespace = namespace or namespace_for(self.topic)
+        self.search_all_namespaces = search_all_namespaces
+        # Spans for every phase, crew, task, agent step and tool call of this run
+        self.tracer = tracing.Tracer(self.run_id) if trace else None
+        # Token/cost ledger: per-call rows plus exact crew totals per phase
+        self.ledger = registry.get("ledger") if record_usage else None
+        self.usage: Dict[str, Dict[str, Any]] = {}
+        # Finished steps and blog-crew tasks, kept under output/runs/{run_id}/
+        self.checkpoint = RunCheckpoint(self.run_id)
         self.research_crew = ResearchCrew()
         self.blog_crew = BlogWritingCrew()
 
+    @classmethod
+    def resume(cls, run_id: str, **kwargs: Any) -> "BlogWritingFlow":
+        """
+        Rebuild a checkpointed run with its original inputs and RAG namespace;
+        kicking it off skips every step and task that already finished.
+        """
+        inputs = RunCheckpoint.load(run_id).inputs
+        return cls(
+            topic=inputs["topic"],
+            word_count=inputs["word_count"],
+            read_time=inputs["read_time"],
+            run_id=run_id,
+            namespace=inputs["namespace"],
+            search_all_namespaces=inputs.get("search_all_namespaces", False),
+            **kwargs,
+        )
+
     @start()
     def initiate_blog_creation(self) -> Dict[str, Any]:
         """
@@ -27,9 +64,20 @@ class BlogWritingFlow(Flow):
         inputs = {
             "topic": self.topic,
             "word_count": self.word_count,
-            "read_time": self.read_time
+            "read_time": self.read_time,
+            # Task output files go under the run's directory, so runs never overwrite each other
+            "output_dir": self.checkpoint.dir,
         }
-        print(f"🚀 Starting blog creation flow for: {inputs['topic']}")
+        resuming = self.checkpoint.exists
+        print(f"🚀 {'Resuming' if resuming else 'Starting'} blog creation flow for: {inputs['topic']} "
+              f"(run {self.run_id}, namespace '{self.namespace}')")
+        self.checkpoint.save_inputs({
+            **inputs,
+            "namespace": self.namespace,
+            "search_all_namespaces": self.search_all_namespaces,
+        })
+        if self.ledger is not None:
+            self.ledger.start_run(self.run_id, self.topic, self.namespace)
         return inputs
 
     @listen(initiate_blog_creation)
@@ -37,32 +85,124 @@ class BlogWritingFlow(Flow):
         """
         Phase 1: Research and populate RAG knowledge base
         """
+        if self.checkpoint.step_done("research_phase"):
+            # The RAG namespace was populated by the earlier attempt
+            print(f"⏭️ Phase 1: Reusing research checkpoint for '{inputs['topic']}'")
+            return self.checkpoint.step_result("research_phase")
+
         print(f"🔍 Phase 1: Research and Knowledge Gathering for '{inputs['topic']}'")
         # Execute research crew
-        research_result = self.research_crew.crew().kickoff(inputs=inputs)
+        with self._phase("research_phase"), self._rag_scope():
+            research_result = self._kickoff(self.research_crew.crew(), "research_phase", inputs)
         print("✅ Research phase completed!")
         print(f"📊 Research summary: {research_result}")
-        return {
+        result = {
             **inputs,
             "research_completed": True,
             "research_result": str(research_result)
         }
+        self.checkpoint.complete_step("research_phase", result)
+        return result
 
     @listen(research_phase)
     def content_creation_phase(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
         """
         Phase 2: Create content, publish, and generate social media post.
         """
+        if self.checkpoint.step_done("content_creation_phase"):
+            print(f"⏭️ Phase 2: Run {self.run_id} already completed")
+            self.checkpoint.finish("completed")
+            if self.ledger is not None:
+                self.ledger.finish_run(self.run_id, "completed")
+            return self.checkpoint.step_result("content_creation_phase")
+
         print(f"✍️ Phase 2: Content Creation, Publishing & Social Media for '{inputs['topic']}'")
-        # Execute blog writing crew
-        blog_result = self.blog_crew.crew().kickoff(inputs=inputs)
+        # Execute blog writing crew; tasks finished in an earlier attempt are skipped
+        with self._phase("content_creation_phase"), self._rag_scope():
+            crew = self.blog_crew.crew()
+            last_task = crew.tasks[-1].name
+            skipped = self.checkpoint.prepare_crew(crew, on_task_done=tracing.task_callback)
+            if skipped:
+                print(f"⏭️ Reusing checkpointed tasks: {', '.join(skipped)}")
+            crew_result = self._kickoff(crew, "content_creation_phase", inputs) if crew.tasks else None
         print("✅ Content creation phase completed!")
-        return {
+        # The crew's final output is its last task's, which may come from the checkpoint;
+        # if its checkpoint was never written, the crew result still has it
+        last_output = self.checkpoint.task_output(last_task)
+        if last_output is not None:
+            blog_result = last_output.raw
+        else:
+            blog_result = getattr(crew_result, "raw", "") or ""
+        result = {
             **inputs,
             "content_completed": True,
-            "blog_result": str(blog_result),
-            "final_output": str(blog_result)
+            "blog_result": blog_result,
+            "final_output": blog_result
         }
+        self.checkpoint.complete_step("content_creation_phase", result)
+        self.checkpoint.finish("completed")
+        if self.ledger is not None:
+            self.ledger.finish_run(self.run_id, "completed", published_words=self._published_words())
+        return result
+
+    @contextmanager
+    def _phase(self, name: str):
+        """
+        Trace a flow phase and attribute its LLM calls in the ledger. Phases run
+        in worker threads, so both are activated per phase; the trace file is
+        rewritten after each one.
+        """
+        with ExitStack() as stack:
+            if self.ledger is not None:
+                stack.enter_context(attribute_to(self.ledger, self.run_id, name))
+            if self.tracer is not None:
+                stack.enter_context(self.tracer.activate())
+                stack.callback(self._export_trace)
+            try:
+                with tracing.span(f"phase:{name}", "flow", topic=self.topic, namespace=self.namespace):
+                    yield
+            except Exception:
+                self.checkpoint.finish("failed")
+                if self.ledger is not None:
+                    self.ledger.finish_run(self.run_id, "failed")
+                print(f"💾 Progress saved; continue with: python main.py --resume {self.run_id}")
+                raise
+
+    def _export_trace(self) -> None:
+        path = self.tracer.export()
+        print(f"🧭 Trace written to {path}")
+
+    def _kickoff(self, crew, phase: str, inputs: Dict[str, Any]):
+        """Run a crew inside its phase and keep the crew's exact token totals"""
+        with tracing.span(f"crew:{phase}", "crew", tasks=len(crew.tasks), agents=len(crew.agents)) as s:
+            tracing.start_crew_boundaries()
+            result = crew.kickoff(inputs=inputs)
+            usage = result.token_usage.model_dump() if result.token_usage else {}
+            s.set(**{k: v for k, v in usage.items() if isinstance(v, int)})
+        self.usage[phase] = usage
+        if self.ledger is not None:
+            llm = crew.agents[0].llm if crew.agents else None
+            self.ledger.record_phase(self.run_id, phase, usage, model=getattr(llm, "model", None))
+        return result
+
+    def _published_words(self) -> int:
+        """Length of the final article (the final writing task's output)"""
+        output = self.checkpoint.task_output("final_writing_task")
+        return count_words(output.raw or "") if output else 0
+
+    def _rag_scope(self):
+        """Limit RAG ingestion and queries in a phase to this run's namespace"""
+        also_search = "*" if self.search_all_namespaces else None
+        return registry.get("rag_tool").use_namespace(self.namespace, also_search=also_search)
+
+_default_flow = None
+
 
-# Create flow instance for import
-blog_writing_flow = BlogWritingFlow()
+def __getattr__(name: str):
+    # `blog_writing_flow` is created on first access instead of at import time
+    global _default_flow
+    if name == "blog_writing_flow":
+        if _default_flow is None:
+            _default_flow = BlogWritingFlow()
+        return _default_flow
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
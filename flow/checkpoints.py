@@ -0,0 +1,146 @@
+# flow/checkpoints.py
+"""
+Durable checkpoints for BlogWritingFlow runs.
+Each run keeps its inputs, finished flow steps and every finished blog-crew
+task output under output/runs/{run_id}/, written atomically as they
+complete. Resuming a run skips finished steps and hands saved task outputs
+to the tasks that depend on them, so only the remaining work is repeated.
+"""
+
+import os
+import json
+import time
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+from crewai import Crew
+from crewai.tasks.task_output import TaskOutput
+
+RUNS_DIR = "output/runs"
+
+
+def _write_json(path: str, data: Any) -> None:
+    """Write via a temp file and rename, so a crash never leaves half a checkpoint"""
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def list_runs(root: str = RUNS_DIR) -> List[Dict[str, Any]]:
+    """Checkpointed runs, newest first"""
+    if not os.path.isdir(root):
+        return []
+    runs = []
+    for run_id in os.listdir(root):
+        state_path = os.path.join(root, run_id, "state.json")
+        if os.path.isfile(state_path):
+            with open(state_path, "r", encoding="utf-8") as f:
+                runs.append(json.load(f))
+    return sorted(runs, key=lambda r: r.get("updated_at", 0), reverse=True)
+
+
+class RunCheckpoint:
+    """Inputs, finished steps and finished task outputs of one run"""
+
+    def __init__(self, run_id: str, root: str = RUNS_DIR):
+        self.run_id = run_id
+        self.dir = os.path.join(root, run_id)
+        self.tasks_dir = os.path.join(self.dir, "tasks")
+        self.state_path = os.path.join(self.dir, "state.json")
+        self._lock = threading.Lock()
+        self.state: Dict[str, Any] = {}
+        if os.path.isfile(self.state_path):
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                self.state = json.load(f)
+
+    @property
+    def exists(self) -> bool:
+        return bool(self.state)
+
+    @classmethod
+    def load(cls, run_id: str, root: str = RUNS_DIR) -> "RunCheckpoint":
+        checkpoint = cls(run_id, root)
+        if not checkpoint.exists:
+            raise FileNotFoundError(f"No checkpoint for run '{run_id}' in {root}")
+        return checkpoint
+
+    # ------------------------------------------------------------------ #
+    # Flow steps
+    # ------------------------------------------------------------------ #
+    def save_inputs(self, inputs: Dict[str, Any]) -> None:
+        """Record the run's inputs; a resumed run keeps its original ones"""
+        with self._lock:
+            if not self.state:
+                self.state = {"run_id": self.run_id, "inputs": inputs, "steps": {}, "created_at": time.time()}
+            self.state["status"] = "running"
+            self._save_state()
+
+    @property
+    def inputs(self) -> Dict[str, Any]:
+        return self.state.get("inputs", {})
+
+    def step_done(self, step: str) -> bool:
+        return step in self.state.get("steps", {})
+
+    def step_result(self, step: str) -> Dict[str, Any]:
+        return self.state["steps"][step]["result"]
+
+    def complete_step(self, step: str, result: Dict[str, Any]) -> None:
+        with self._lock:
+            self.state.setdefault("steps", {})[step] = {"completed_at": time.time(), "result": result}
+            self._save_state()
+
+    def finish(self, status: str) -> None:
+        with self._lock:
+            if self.state:
+                self.state["status"] = status
+                self._save_state()
+
+    def _save_state(self) -> None:
+        os.makedirs(self.dir, exist_ok=True)
+        self.state["updated_at"] = time.time()
+        _write_json(self.state_path, self.state)
+
+    # ------------------------------------------------------------------ #
+    # Crew tasks
+    # ------------------------------------------------------------------ #
+    def save_task_output(self, output: TaskOutput) -> None:
+        os.makedirs(self.tasks_dir, exist_ok=True)
+        data = output.model_dump(mode="json", exclude={"pydantic"})
+        _write_json(os.path.join(self.tasks_dir, f"{output.name}.json"), data)
+
+    def task_output(self, name: str) -> Optional[TaskOutput]:
+        path = os.path.join(self.tasks_dir, f"{name}.json")
+        if not os.path.isfile(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return TaskOutput(**json.load(f))
+
+    def task_outputs(self) -> Dict[str, TaskOutput]:
+        if not os.path.isdir(self.tasks_dir):
+            return {}
+        names = [f[:-5] for f in os.listdir(self.tasks_dir) if f.endswith(".json")]
+        return {name: self.task_output(name) for name in names}
+
+    def prepare_crew(self, crew: Crew, on_task_done: Optional[Callable[[TaskOutput], None]] = None) -> List[str]:
+        """
+        Checkpoint every task of `crew` as it finishes and drop the tasks that
+        already finished in an earlier attempt. Their saved outputs are put
+        back on the Task objects, so later tasks still get them as context.
+        Returns the names of the skipped tasks.
+        """
+        saved = self.task_outputs()
+        for task in crew.tasks:
+            if task.name in saved:
+                task.output = saved[task.name]
+        skipped = [task.name for task in crew.tasks if task.name in saved]
+        crew.tasks = [task for task in crew.tasks if task.name not in saved]
+
+        def checkpoint_task(output: TaskOutput) -> None:
+            if on_task_done is not None:
+                on_task_done(output)
+            self.save_task_output(output)
+
+        crew.task_callback = checkpoint_task
+        return skipped
@@ -1,25 +1,159 @@
+import sys
+import argparse
 import warnings
 warnings.filterwarnings('ignore')
 from rich import print # noqa: E402
-from flow.blog_flow import BlogWritingFlow # noqa: E402
+from utils.registry import registry # noqa: E402
+
+BlogWritingFlow = registry.timed_import("flow.blog_flow:BlogWritingFlow")
+
+
+def print_rate_limits() -> None:
+    from utils.rate_limiter import rate_limiter_stats
+
+    for model, stats in rate_limiter_stats().items():
+        print(f"\n[bold blue]🚦 RATE LIMITER ({model})[/bold blue]")
+        print("=" * 40)
+        print(f"  Requests: {stats['requests']} (throttled {stats['throttled']}, waited {stats['waited_seconds']:.1f}s)")
+        print(f"  Rate limit errors: {stats['rate_limited']}")
+        print(f"  Current limit: {stats['rpm']:g}/{stats['max_rpm']:g} RPM, {stats['tpm']:,}/{stats['max_tpm']:,.0f} TPM")
+        print("=" * 40)
+
+
+def print_cache_stats() -> None:
+    from utils.cache import cache_stats
+
+    for name, stats in cache_stats().items():
+        print(f"\n[bold blue]🗄️ RESULT CACHE ({name})[/bold blue]")
+        print("=" * 40)
+        print(f"  Hits: {stats['hits']} fresh, {stats['stale_hits']} stale (refreshed in background)")
+        print(f"  Misses: {stats['misses']}")
+        if stats["revalidated"]:
+            print(f"  Revalidated (304 Not Modified): {stats['revalidated']}")
+        print(f"  Hit Rate: {stats['hit_rate']:.1%}   Entries: {stats['entries']}")
+        print("=" * 40)
+
+
+def print_http_stats() -> None:
+    from utils.http_client import http_stats
+
+    hosts = http_stats()
+    if not hosts:
+        return
+    print("\n[bold blue]🌐 HTTP TRANSPORT[/bold blue]")
+    print("=" * 40)
+    for host, stats in hosts.items():
+        print(f"  {host}: {stats['requests']} requests, {stats['retries']} retries, {stats['errors']} errors")
+        print(f"    p50 {stats['p50_ms']:.0f} ms, p95 {stats['p95_ms']:.0f} ms, "
+              f"{stats['bytes_received'] / 1024:,.1f} KiB in, {stats['bytes_sent'] / 1024:,.1f} KiB out")
+    print("=" * 40)
+
+
+def print_youtube_quota() -> None:
+    from tools.youtube_cache import QuotaLedger
+
+    quota = QuotaLedger().stats()
+    if not quota["methods"]:
+        return
+    print(f"\n[bold blue]📺 YOUTUBE QUOTA ({quota['day']}, Pacific time)[/bold blue]")
+    print("=" * 40)
+    for method, row in quota["methods"].items():
+        print(f"  {method}: {row['requests']} requests, {row['units']:,} units")
+    print(f"  Used: {quota['used']:,}/{quota['limit']:,} units ({quota['remaining']:,} left)")
+    print("=" * 40)
+
+
+def print_usage(flow) -> None:
+    """Per-phase token usage of a finished flow plus its ledger totals"""
+    print("\n[bold blue]📊 USAGE METRICS[/bold blue]")
+    print("=" * 40)
+    for phase, metrics in flow.usage.items():
+        print(f"[bold cyan]{phase.replace('_', ' ').title()}:[/bold cyan]")
+        print(f"  Total Tokens: {metrics.get('total_tokens', 0):,}")
+        print(f"  Prompt Tokens: {metrics.get('prompt_tokens', 0):,}")
+        print(f"  Completion Tokens: {metrics.get('completion_tokens', 0):,}")
+        print(f"  Cached Prompt Tokens: {metrics.get('cached_prompt_tokens', 0):,}")
+        print(f"  Successful Requests: {metrics.get('successful_requests', 0)}")
+        print()
+
+    summary = flow.ledger.run_summary(flow.run_id) if flow.ledger is not None else None
+    if summary is None:
+        print("=" * 40)
+        return
+    print("[bold green]Overall Total:[/bold green]")
+    print(f"  Combined Total Tokens: {summary['total_tokens']:,}")
+    print(f"  Combined LLM Requests: {summary['requests']}")
+    print(f"  Estimated Cost: ${summary['cost_usd']:.4f}")
+    if summary["tokens_per_word"] is not None:
+        print(f"  Tokens per Published Word: {summary['tokens_per_word']:,.1f} ({summary['published_words']} words)")
+    print(f"  Ledger: python -m utils.ledger show {flow.run_id}")
+    print("=" * 40)
+
+
+def run_batch_mode(path: str, concurrency: int) -> int:
+    """Run every topic in `path` without prompts; returns the process exit code"""
+    from flow.batch_runner import load_topics, run_batch, print_batch_report
+
+    topics = load_topics(path)
+    if not topics:
+        print(f"[bold red]❌ No topics found in {path}[/bold red]")
+        return 1
+
+    print(f"\n[bold yellow]Starting batch of {len(topics)} topics from {path}[/bold yellow]\n")
+    report = run_batch(topics, concurrency=concurrency, printer=print)
+    print()
+    print_batch_report(report, print)
+    print_cache_stats()
+    print_youtube_quota()
+    print_http_stats()
+    print_rate_limits()
+
+    print("\n[bold blue]⏱️ STARTUP COST[/bold blue]")
+    print("=" * 40)
+    registry.print_report(print)
+    print("=" * 40)
+    return 1 if report["failed"] else 0
 
 
 def main():
     """Main function using CrewAI Flow with input parameters and usage tracking"""
-    
-    # Get user inputs
-    print("\n[bold yellow]🚀 Blog Creation Setup[/bold yellow]")
-    topic = input("Enter blog topic: ") or "The impact of AI on education"
-    word_count = input("Enter approximate word count: ") or "1200"
-    read_time = input("Enter approximate read time in minutes: ") or "6"
-    
-    print("\n[bold yellow]Starting Automated Blog Creation Flow[/bold yellow]")
-    print(f"[bold cyan]Topic: {topic}[/bold cyan]")
-    print(f"[bold cyan]Target: {word_count} words, {read_time} min read[/bold cyan]\n")
-    
-    # Create flow with inputs passed to constructor
-    try:
+    parser = argparse.ArgumentParser(description="Automated blog creation flow")
+    parser.add_argument("--batch", metavar="FILE",
+                        help="Run non-interactively for every 'topic | word_count | read_time' line in FILE")
+    parser.add_argument("--concurrency", type=int, default=2, help="Flows to run at once in batch mode")
+    parser.add_argument("--resume", metavar="RUN_ID",
+                        help="Continue a checkpointed run from the first step or task that did not finish")
+    args = parser.parse_args()
+    if args.batch:
+        sys.exit(run_batch_mode(args.batch, args.concurrency))
+
+    if args.resume:
+        try:
+            flow = BlogWritingFlow.resume(args.resume)
+        except FileNotFoundError as e:
+            from flow.checkpoints import list_runs
+
+            print(f"[bold red]❌ {e}[/bold red]")
+            for run in list_runs()[:10]:
+                print(f"  {run['run_id']}  {run.get('status', '?'):<10} {run['inputs'].get('topic', '')}")
+            sys.exit(1)
+        print(f"\n[bold yellow]Resuming run {flow.run_id}[/bold yellow]")
+        print(f"[bold cyan]Topic: {flow.topic}[/bold cyan]\n")
+    else:
+        # Get user inputs
+        print("\n[bold yellow]🚀 Blog Creation Setup[/bold yellow]")
+        topic = input("Enter blog topic: ") or "The impact of AI on education"
+        word_count = input("Enter approximate word count: ") or "1200"
+        read_time = input("Enter approximate read time in minutes: ") or "6"
+
+        print("\n[bold yellow]Starting Automated Blog Creation Flow[/bold yellow]")
+        print(f"[bold cyan]Topic: {topic}[/bold cyan]")
+        print(f"[bold cyan]Target: {word_count} words, {read_time} min read[/bold cyan]\n")
+
+        # Create flow with inputs passed to constructor
         flow = BlogWritingFlow(topic=topic, word_count=word_count, read_time=read_time)
+
+    try:
         result = flow.kickoff()
         
         print("\n" + "=" * 60)
@@ -29,45 +163,55 @@ def main():
         print(result.get('final_output', 'No output generated'))
         print("=" * 60)
         
-        # Display token usage metrics
-        print("\n[bold blue]📊 USAGE METRICS[/bold blue]")
+        # Token usage recorded while the flow ran (exact crew totals per phase)
+        print_usage(flow)
+
+        # Retrieval cache effectiveness across both crews
+        cache_stats = registry.get("rag_tool").query_cache_stats()
+        if cache_stats:
+            print("\n[bold blue]🔁 RAG QUERY CACHE[/bold blue]")
+            print("=" * 40)
+            print(f"  Exact Hits: {cache_stats['exact_hits']}")
+            print(f"  Semantic Hits: {cache_stats['semantic_hits']}")
+            print(f"  Misses: {cache_stats['misses']}")
+            print(f"  Hit Rate: {cache_stats['hit_rate']:.1%}")
+            print("=" * 40)
+
+        # Tokens of RAG results before/after dedupe, MMR and sentence selection
+        compression = registry.get("rag_tool").compression_stats()
+        if compression.get("queries"):
+            print("\n[bold blue]✂️ RAG CONTEXT COMPRESSION[/bold blue]")
+            print("=" * 40)
+            print(f"  Queries: {compression['queries']}")
+            print(f"  Tokens: {compression['tokens_before']:,} -> {compression['tokens_after']:,} "
+                  f"({compression['saved_fraction']:.1%} saved)")
+            print(f"  Repeated Chunks Left Out: {compression['repeated_chunks']}")
+            print("=" * 40)
+
+        # Per-leg latency of hybrid (dense + BM25) retrieval
+        latency = registry.get("rag_tool").search_latency_stats()
+        if latency:
+            print("\n[bold blue]🔎 RAG SEARCH LATENCY[/bold blue]")
+            print("=" * 40)
+            for leg, stats in latency.items():
+                print(f"  {leg.title()}: {stats['queries']} searches, p50 {stats['p50_ms']:.2f} ms, "
+                      f"p95 {stats['p95_ms']:.2f} ms")
+            print("=" * 40)
+
+        # Cached external API results (search results, metadata)
+        print_cache_stats()
+        print_youtube_quota()
+
+        # Requests, retries and bytes per host through the shared HTTP transport
+        print_http_stats()
+
+        # Shared Gemini rate limiter (requests/tokens per minute across crews)
+        print_rate_limits()
+
+        # Import and init cost of every lazily built component
+        print("\n[bold blue]⏱️ STARTUP COST[/bold blue]")
         print("=" * 40)
-        
-        # Get usage metrics from research crew
-        research_crew = flow.research_crew.crew()
-        if hasattr(research_crew, 'usage_metrics'):
-            research_metrics = research_crew.usage_metrics
-            print("[bold cyan]Research Phase:[/bold cyan]")
-            print(f"  Total Tokens: {research_metrics.total_tokens:,}")
-            print(f"  Prompt Tokens: {research_metrics.prompt_tokens:,}")
-            print(f"  Completion Tokens: {research_metrics.completion_tokens:,}")
-            print(f"  Successful Requests: {research_metrics.successful_requests}")
-            if hasattr(research_metrics, 'cached_prompt_tokens'):
-                print(f"  Cached Prompt Tokens: {research_metrics.cached_prompt_tokens:,}")
-            print()
-        
-        # Get usage metrics from blog writing crew
-        blog_crew = flow.blog_crew.crew()
-        if hasattr(blog_crew, 'usage_metrics'):
-            blog_metrics = blog_crew.usage_metrics
-            print("[bold cyan]Content Creation Phase:[/bold cyan]")
-            print(f"  Total Tokens: {blog_metrics.total_tokens:,}")
-            print(f"  Prompt Tokens: {blog_metrics.prompt_tokens:,}")
-            print(f"  Completion Tokens: {blog_metrics.completion_tokens:,}")
-            print(f"  Successful Requests: {blog_metrics.successful_requests}")
-            if hasattr(blog_metrics, 'cached_prompt_tokens'):
-                print(f"  Cached Prompt Tokens: {blog_metrics.cached_prompt_tokens:,}")
-            print()
-        
-        # Calculate and display total metrics
-        total_tokens = (research_metrics.total_tokens if 'research_metrics' in locals() else 0) + \
-                      (blog_metrics.total_tokens if 'blog_metrics' in locals() else 0)
-        total_requests = (research_metrics.successful_requests if 'research_metrics' in locals() else 0) + \
-                        (blog_metrics.successful_requests if 'blog_metrics' in locals() else 0)
-        
-        print("[bold green]Overall Total:[/bold green]")
-        print(f"  Combined Total Tokens: {total_tokens:,}")
-        print(f"  Combined LLM Requests: {total_requests}")
+        registry.print_report(print)
         print("=" * 40)
         
     except Exception as e:
@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+"""
+Offline end-to-end benchmark of BlogWritingFlow.
+
+Runs the real flow, crews and tools for N topics against the local stand-ins
+in scripts/offline_services.py (no network, no API keys) and reports:
+- per-phase latency (research / content creation)
+- per-tool latency (calls, total, mean, max)
+- embedding throughput (texts/s, chunks/s from RAG ingestion)
+- peak memory (RSS, and Python heap with --tracemalloc)
+
+Usage (from the repo root):
+    python scripts/benchmark_pipeline.py --topics 3
+    python scripts/benchmark_pipeline.py --topic "Vector databases" --fake-embedder --json out.json
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import functools
+import resource
+import tempfile
+import threading
+import tracemalloc
+from collections import defaultdict
+from typing import Any, Callable, Dict, List
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_TOPICS = [
+    "Small language models on edge devices",
+    "Retrieval augmented generation in production",
+    "Vector databases compared",
+    "Agentic workflows with CrewAI",
+    "Evaluating LLM applications",
+]
+
+
+class Recorder:
+    """Thread-safe latency samples grouped by label"""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+        self.counters: Dict[str, float] = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def add(self, label: str, seconds: float) -> None:
+        with self._lock:
+            self.samples[label].append(seconds)
+
+    def count(self, label: str, value: float) -> None:
+        with self._lock:
+            self.counters[label] += value
+
+    def wrap(self, owner: Any, method: str, label: str) -> None:
+        """Replace owner.method with a timed version"""
+        original = getattr(owner, method)
+
+        # wraps() keeps the signature and annotations CrewAI reads to build tool schemas
+        @functools.wraps(original)
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                self.add(label, time.perf_counter() - started)
+
+        setattr(owner, method, timed)
+
+    def summary(self, prefix: str) -> Dict[str, Dict[str, float]]:
+        rows = {}
+        for label, values in sorted(self.samples.items()):
+            if label.startswith(prefix):
+                rows[label[len(prefix):]] = {
+                    "calls": len(values),
+                    "total_s": round(sum(values), 3),
+                    "mean_s": round(sum(values) / len(values), 4),
+                    "max_s": round(max(values), 4),
+                }
+        return rows
+
+
+def block_network() -> None:
+    """Fail fast on any connection that is not to this machine"""
+    original = socket.socket.connect
+
+    def connect(sock, address):
+        host = address[0] if isinstance(address, tuple) else address
+        if isinstance(host, str) and host not in ("127.0.0.1", "localhost", "::1") and not host.startswith("/"):
+            raise ConnectionRefusedError(f"Network access blocked during offline benchmark: {address}")
+        return original(sock, address)
+
+    socket.socket.connect = connect
+
+
+def configure_environment(workdir: str, server, args: argparse.Namespace) -> None:
+    os.environ.update(server.env())
+    for key in ("TAVILY_API_KEY", "YOUTUBE_API_KEY", "PEXELS_API_KEY", "DEVTO_API_KEY", "GEMINI_API_KEY"):
+        os.environ[key] = "offline-benchmark"
+    os.environ["EMBEDDING_CACHE_PATH"] = os.path.join(workdir, "embedding_cache.db")
+    # Same cover-image queries on every run, so reruns are comparable
+    os.environ.setdefault("PEXELS_SELECTION_SEED", "0")
+    os.environ.setdefault("CREWAI_DISABLE_TELEMETRY", "true")
+    # Skips CrewAI's interactive first-run trace prompt, which waits 20s for input
+    os.environ.setdefault("CREWAI_TESTING", "true")
+    os.environ.setdefault("CREWAI_TRACING_ENABLED", "false")
+    os.environ.setdefault("OTEL_SDK_DISABLED", "true")
+    os.environ.setdefault("HF_HUB_OFFLINE", "1")
+    os.chdir(workdir)
+
+
+def install_stand_ins(server, topics: List[str], args: argparse.Namespace):
+    """Swap the LLM, Tavily, transcripts (and optionally the embedder) for local fakes"""
+    from utils.registry import registry
+    from offline_services import OfflineLLM, FakeTavily, FakeTranscriptApi, HashEmbedder
+    import tools.youtube_tool as youtube_tool
+
+    llm = OfflineLLM(topics, rag_queries=args.rag_queries, latency_ms=args.llm_latency_ms)
+    registry.register("gemini_flash", lambda: llm)
+
+    FakeTranscriptApi.words = args.transcript_words
+    FakeTranscriptApi.latency_ms = args.service_latency_ms
+    youtube_tool.YouTubeTranscriptApi = FakeTranscriptApi
+
+    if args.fake_embedder:
+        registry.register("embedding_model:sentence-transformers/all-MiniLM-L6-v2", HashEmbedder)
+
+    search_tool = registry.get("search_and_emb_tool")
+    search_tool._tavily = FakeTavily(server)
+    return llm
+
+
+def instrument(recorder: Recorder) -> None:
+    """Time crews, tools, tool internals and embedding batches"""
+    from crewai import Crew
+    from tools.search_and_emb import SearchAndEmbeddingTool
+    from tools.rag_tool import KnowledgeBaseTool
+    from tools.image_search_tool import PexelsCoverImageTool
+    from tools.devto_publisher_tool import DevToPublisherTool
+    from tools.youtube_tool import YouTubeSearchTool, YouTubeTranscriptTool
+    from tools.rag_adapter import LocalRagAdapter
+    import tools.rag_adapter as rag_adapter
+    import tools.search_and_emb as search_and_emb
+
+    original_kickoff = Crew.kickoff
+
+    def kickoff(crew, *args, **kwargs):
+        names = [getattr(t, "name", None) or "" for t in crew.tasks]
+        phase = "research" if any("research" in n for n in names) else "content_creation"
+        started = time.perf_counter()
+        try:
+            return original_kickoff(crew, *args, **kwargs)
+        finally:
+            recorder.add(f"phase:{phase}", time.perf_counter() - started)
+
+    Crew.kickoff = kickoff
+
+    for cls, label in [
+        (SearchAndEmbeddingTool, "Search & Embed"),
+        (KnowledgeBaseTool, "RAG query"),
+        (PexelsCoverImageTool, "Cover image"),
+        (DevToPublisherTool, "Dev.to publish"),
+    ]:
+        recorder.wrap(cls, "_run", f"tool:{label}")
+
+    for cls, method, label in [
+        (SearchAndEmbeddingTool, "_search_web_and_embed", "web search + ingest"),
+        (SearchAndEmbeddingTool, "_search_youtube_and_transcribe", "youtube search + transcripts"),
+        (SearchAndEmbeddingTool, "_index_transcripts", "transcript indexing"),
+        (YouTubeSearchTool, "_run", "youtube search"),
+        (YouTubeTranscriptTool, "_extract_transcript", "transcript fetch"),
+        (LocalRagAdapter, "add_many", "rag add_many"),
+        (LocalRagAdapter, "search", "rag search"),
+    ]:
+        recorder.wrap(cls, method, f"step:{label}")
+
+    # fetch_page_text is imported by name, so wrap it where it is used
+    recorder.wrap(search_and_emb, "fetch_page_text", "step:page fetch")
+    recorder.wrap(rag_adapter, "fetch_page_text", "step:page fetch (adapter)")
+
+    original_embed = LocalRagAdapter._embed
+
+    def embed(adapter, texts):
+        started = time.perf_counter()
+        vectors = original_embed(adapter, texts)
+        recorder.add("embed:batch", time.perf_counter() - started)
+        recorder.count("embed:texts", len(texts))
+        return vectors
+
+    LocalRagAdapter._embed = embed
+
+
+def run_topics(topics: List[str], args: argparse.Namespace, recorder: Recorder) -> List[Dict[str, Any]]:
+    from flow.blog_flow import BlogWritingFlow
+
+    runs = []
+    # Fresh run ids, so a reused --workdir never resumes an earlier benchmark's checkpoints
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    for index, topic in enumerate(topics, 1):
+        print(f"▶️  [{index}/{len(topics)}] {topic}")
+        started = time.perf_counter()
+        status, error = "ok", None
+        try:
+            BlogWritingFlow(topic=topic, word_count=str(args.word_count), read_time="5",
+                            run_id=f"bench-{stamp}-{index:02d}").kickoff()
+        except Exception as e:
+            status, error = "failed", str(e)
+        elapsed = time.perf_counter() - started
+        recorder.add("flow:total", elapsed)
+        runs.append({"topic": topic, "status": status, "seconds": round(elapsed, 3), "error": error})
+        print(f"   {'✅' if status == 'ok' else '❌'} {elapsed:.2f}s{'' if error is None else ' - ' + error}")
+    return runs
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def build_report(runs, recorder: Recorder, server, llm, wall_seconds: float, traced_peak) -> Dict[str, Any]:
+    from utils.cache import cache_stats
+    from tools.youtube_cache import QuotaLedger
+    from utils.http_client import http_stats
+    from utils.registry import registry
+
+    embed_seconds = sum(recorder.samples.get("embed:batch", []))
+    embed_texts = recorder.counters.get("embed:texts", 0)
+    return {
+        "topics": len(runs),
+        "failures": sum(1 for r in runs if r["status"] != "ok"),
+        "wall_seconds": round(wall_seconds, 3),
+        "runs": runs,
+        "phases": recorder.summary("phase:"),
+        "tools": recorder.summary("tool:"),
+        "steps": recorder.summary("step:"),
+        "embedding": {
+            "batches": len(recorder.samples.get("embed:batch", [])),
+            "texts": int(embed_texts),
+            "seconds": round(embed_seconds, 3),
+            "texts_per_sec": round(embed_texts / embed_seconds, 1) if embed_seconds else 0.0,
+        },
+        "llm_calls": llm.calls,
+        "service_requests": server.requests,
+        "published_articles": len(server.published),
+        "result_caches": cache_stats(),
+        "youtube_quota": QuotaLedger().stats(),
+        "http": http_stats(),
+        "rag_compression": registry.get("rag_tool").compression_stats(),
+        "rag_search_latency": registry.get("rag_tool").search_latency_stats(),
+        "memory": {
+            "peak_rss_mb": peak_rss_mb(),
+            "peak_python_heap_mb": round(traced_peak / (1024 * 1024), 1) if traced_peak is not None else None,
+        },
+    }
+
+
+def print_report(report: Dict[str, Any], printer: Callable[[str], None] = print) -> None:
+    printer("\n" + "=" * 72)
+    printer(f"📊 OFFLINE BENCHMARK: {report['topics']} topics, {report['failures']} failed, "
+            f"{report['wall_seconds']:.2f}s wall")
+    printer("=" * 72)
+    for title, key in (("Phase", "phases"), ("Tool", "tools"), ("Step", "steps")):
+        printer(f"\n{title:<36} {'calls':>6} {'total s':>9} {'mean s':>9} {'max s':>9}")
+        for label, row in report[key].items():
+            printer(f"{label:<36} {row['calls']:>6} {row['total_s']:>9.3f} {row['mean_s']:>9.4f} {row['max_s']:>9.4f}")
+    emb = report["embedding"]
+    printer(f"\n🧮 Embedding: {emb['texts']} texts in {emb['batches']} batches, "
+            f"{emb['seconds']:.2f}s ({emb['texts_per_sec']} texts/s)")
+    printer(f"🤖 LLM calls: {report['llm_calls']}   🌐 Service requests: {report['service_requests']}   "
+            f"📰 Published: {report['published_articles']}")
+    for name, stats in report["result_caches"].items():
+        printer(f"🗄️ {name} cache: {stats['hits']} hits, {stats['stale_hits']} stale, "
+                f"{stats['misses']} misses ({stats['hit_rate']:.0%})")
+    for host, stats in report["http"].items():
+        printer(f"🌐 {host}: {stats['requests']} requests, {stats['retries']} retries, "
+                f"p50 {stats['p50_ms']} ms, p95 {stats['p95_ms']} ms, {stats['bytes_received']:,} bytes")
+    compression = report["rag_compression"]
+    if compression:
+        printer(f"✂️ RAG context: {compression['queries']} queries, {compression['tokens_before']:,} -> "
+                f"{compression['tokens_after']:,} tokens ({compression['saved_fraction']:.0%} saved, "
+                f"{compression['repeated_chunks']} repeated chunks left out)")
+    for leg, stats in report["rag_search_latency"].items():
+        printer(f"🔎 RAG {leg} leg: {stats['queries']} searches, p50 {stats['p50_ms']} ms, p95 {stats['p95_ms']} ms")
+    quota = report["youtube_quota"]
+    printer(f"📺 YouTube quota: {quota['used']:,}/{quota['limit']:,} units used on {quota['day']}")
+    mem = report["memory"]
+    heap = f", Python heap peak {mem['peak_python_heap_mb']} MB" if mem["peak_python_heap_mb"] is not None else ""
+    printer(f"💾 Peak RSS {mem['peak_rss_mb']} MB{heap}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Offline end-to-end benchmark of BlogWritingFlow")
+    parser.add_argument("--topics", type=int, default=1, help="Number of built-in topics to run")
+    parser.add_argument("--topic", action="append", help="Explicit topic (repeatable); overrides --topics")
+    parser.add_argument("--word-count", type=int, default=1200)
+    parser.add_argument("--rag-queries", type=int, default=4, help="RAG queries the fake LLM issues per task")
+    parser.add_argument("--page-words", type=int, default=1500, help="Words per fake web page")
+    parser.add_argument("--transcript-words", type=int, default=3000, help="Words per fake transcript")
+    parser.add_argument("--service-latency-ms", type=float, default=0.0, help="Added latency per fake API request")
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0, help="Added latency per fake LLM call")
+    parser.add_argument("--fake-embedder", action="store_true", help="Use a hashing embedder instead of MiniLM")
+    parser.add_argument("--tracemalloc", action="store_true", help="Also track peak Python heap (slower)")
+    parser.add_argument("--workdir", help="Where output/ is written (default: a fresh temp dir)")
+    parser.add_argument("--allow-network", action="store_true", help="Do not block non-local connections")
+    parser.add_argument("--json", dest="json_path", help="Also write the report as JSON")
+    args = parser.parse_args()
+
+    from offline_services import FakeServiceServer
+
+    topics = args.topic or DEFAULT_TOPICS[:max(1, args.topics)]
+    workdir = os.path.abspath(args.workdir or tempfile.mkdtemp(prefix="blog-bench-"))
+    os.makedirs(workdir, exist_ok=True)
+    json_path = os.path.abspath(args.json_path) if args.json_path else None
+
+    server = FakeServiceServer(latency_ms=args.service_latency_ms, page_words=args.page_words).start()
+    configure_environment(workdir, server, args)
+    if not args.allow_network:
+        block_network()
+    print(f"🧪 Offline benchmark in {workdir} (services at {server.base_url})")
+
+    recorder = Recorder()
+    if args.tracemalloc:
+        tracemalloc.start()
+    try:
+        llm = install_stand_ins(server, topics, args)
+        instrument(recorder)
+        started = time.perf_counter()
+        runs = run_topics(topics, args, recorder)
+        wall = time.perf_counter() - started
+        traced_peak = tracemalloc.get_traced_memory()[1] if args.tracemalloc else None
+    finally:
+        if args.tracemalloc:
+            tracemalloc.stop()
+        server.stop()
+
+    report = build_report(runs, recorder, server, llm, wall, traced_peak)
+    print_report(report)
+    if json_path:
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"📝 Report written to {json_path}")
+    return 1 if report["failures"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,409 @@
+#!/usr/bin/env python3
+"""
+Local stand-ins for every external service the pipeline talks to, so the
+flow can run end to end without network access:
+
+- FakeServiceServer: one local HTTP server serving article pages (Tavily
+  results), the YouTube Data API, the Pexels API and the Dev.to API
+- FakeTavily / FakeTranscriptApi: drop-in objects for the Tavily client and
+  youtube_transcript_api, which have no configurable endpoint
+- OfflineLLM: deterministic ReAct-speaking LLM that calls each available
+  tool a fixed number of times and then writes a final answer
+- HashEmbedder: optional sentence-transformers replacement (no model download)
+
+Content is generated from hashes of the topic, so every run is reproducible.
+"""
+
+import re
+import json
+import time
+import random
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit, parse_qs, quote
+
+import numpy as np
+from crewai import BaseLLM
+
+WORDS = (
+    "model data training inference latency pipeline agent retrieval context token "
+    "benchmark dataset evaluation accuracy architecture transformer attention memory "
+    "deployment scaling research insight practical example production workflow tool "
+    "framework community release performance quality cost hardware optimization"
+).split()
+
+
+def slugify(text: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-") or "topic"
+
+
+def synthetic_text(seed: str, words: int, topic: str = "") -> str:
+    """Deterministic pseudo-prose of roughly `words` words mentioning the topic"""
+    rng = random.Random(hashlib.sha256(seed.encode("utf-8")).hexdigest())
+    sentences, count = [], 0
+    while count < words:
+        length = rng.randint(8, 18)
+        body = [rng.choice(WORDS) for _ in range(length)]
+        if topic and rng.random() < 0.3:
+            body.insert(rng.randrange(len(body)), topic)
+        sentences.append(" ".join(body).capitalize() + ".")
+        count += length
+    return " ".join(sentences)
+
+
+# ---------------------------------------------------------------------- #
+# HTTP stand-ins
+# ---------------------------------------------------------------------- #
+class _Handler(BaseHTTPRequestHandler):
+    server: "FakeServiceServer"
+
+    def log_message(self, format, *args):  # keep benchmark output readable
+        pass
+
+    def do_GET(self):
+        self.server.simulate_latency()
+        parts = urlsplit(self.path)
+        query = {k: v[0] for k, v in parse_qs(parts.query).items()}
+        path = parts.path
+
+        if path.startswith("/pages/"):
+            self._send(200, self.server.page_html(path[len("/pages/"):]), "text/html; charset=utf-8")
+        elif path.endswith("/youtube/v3/search"):
+            self._youtube(self.server.youtube_search(query))
+        elif path.endswith("/youtube/v3/videos"):
+            self._youtube(self.server.youtube_videos(query))
+        elif path.endswith("/pexels/v1/search"):
+            self._json(200, self.server.pexels_search(query))
+        else:
+            self._json(404, {"error": f"unknown path {path}"})
+
+    def do_POST(self):
+        self.server.simulate_latency()
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length) or b"{}")
+        if urlsplit(self.path).path.endswith("/devto/api/articles"):
+            self._json(201, self.server.devto_publish(body))
+        else:
+            self._json(404, {"error": f"unknown path {self.path}"})
+
+    def _youtube(self, payload: Dict[str, Any]) -> None:
+        """Like the Data API: every response carries an ETag and honors If-None-Match"""
+        payload["etag"] = hashlib.md5(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+        if self.headers.get("If-None-Match") == payload["etag"]:
+            self.send_response(304)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self._json(200, payload)
+
+    def _json(self, status: int, payload: Dict[str, Any]) -> None:
+        self._send(status, json.dumps(payload), "application/json")
+
+    def _send(self, status: int, body: str, content_type: str) -> None:
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class FakeServiceServer(ThreadingHTTPServer):
+    """Local HTTP server answering like the web, YouTube, Pexels and Dev.to"""
+
+    daemon_threads = True
+
+    def __init__(self, latency_ms: float = 0.0, page_words: int = 1500, videos_per_search: int = 5):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.latency_ms = latency_ms
+        self.page_words = page_words
+        self.videos_per_search = videos_per_search
+        self.requests = 0
+        self.published: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def env(self) -> Dict[str, str]:
+        """Environment variables that point the tools at this server"""
+        return {
+            "YOUTUBE_API_BASE": f"{self.base_url}/",
+            "PEXELS_API_BASE": f"{self.base_url}/pexels/v1",
+            "DEVTO_API_BASE": f"{self.base_url}/devto/api",
+        }
+
+    def start(self) -> "FakeServiceServer":
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+    def simulate_latency(self) -> None:
+        with self._lock:
+            self.requests += 1
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000.0)
+
+    def page_url(self, topic: str, index: int) -> str:
+        return f"{self.base_url}/pages/{slugify(topic)}/{index}"
+
+    def page_html(self, page_path: str) -> str:
+        topic = page_path.rsplit("/", 1)[0].replace("-", " ")
+        paragraphs = [
+            f"<p>{synthetic_text(f'{page_path}:{i}', self.page_words // 6, topic)}</p>" for i in range(6)
+        ]
+        return (
+            f"<html><head><title>{topic}</title><script>var x = 1;</script></head><body>"
+            f"<nav>Home | About</nav><article><h1>{topic}</h1>{''.join(paragraphs)}</article>"
+            "<footer>Copyright</footer></body></html>"
+        )
+
+    def youtube_search(self, query: Dict[str, str]) -> Dict[str, Any]:
+        topic = query.get("q", "")
+        count = min(int(query.get("maxResults", 5)), self.videos_per_search)
+        return {"items": [{"id": {"kind": "youtube#video", "videoId": self._video_id(topic, i)}} for i in range(count)]}
+
+    def youtube_videos(self, query: Dict[str, str]) -> Dict[str, Any]:
+        items = []
+        for video_id in query.get("id", "").split(","):
+            rng = random.Random(video_id)
+            items.append({
+                "id": video_id,
+                "snippet": {
+                    "title": f"Deep dive {video_id}",
+                    "description": synthetic_text(f"desc:{video_id}", 80),
+                    "publishedAt": "2025-01-01T00:00:00Z",
+                    "channelTitle": f"Channel {rng.randint(1, 20)}",
+                    "channelId": f"UC{video_id}",
+                    "tags": ["ai", "tutorial"],
+                    "thumbnails": {"high": {"url": f"{self.base_url}/thumb/{video_id}.jpg"}},
+                },
+                "statistics": {
+                    "viewCount": str(rng.randint(1_000, 2_000_000)),
+                    "likeCount": str(rng.randint(10, 50_000)),
+                    "commentCount": str(rng.randint(0, 5_000)),
+                },
+                "contentDetails": {"duration": f"PT{rng.randint(6, 40)}M{rng.randint(0, 59)}S"},
+            })
+        return {"items": items}
+
+    def pexels_search(self, query: Dict[str, str]) -> Dict[str, Any]:
+        term = query.get("query", "")
+        photos = []
+        for i in range(int(query.get("per_page", 15))):
+            photo_id = int(hashlib.md5(f"{term}:{i}".encode()).hexdigest()[:8], 16)
+            photos.append({
+                "id": photo_id,
+                "width": 1600,
+                "height": 900 if i % 2 else 420,
+                "url": f"{self.base_url}/photo/{photo_id}",
+                "photographer": "Google DeepMind" if i % 3 == 0 else f"Photographer {i}",
+                "photographer_url": f"{self.base_url}/@{i}",
+                "alt": f"{term} {i}",
+                "src": {"large2x": f"{self.base_url}/photo/{photo_id}/large2x.jpg"},
+            })
+        return {"photos": photos, "total_results": len(photos)}
+
+    def devto_publish(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        article = body.get("article", {})
+        with self._lock:
+            self.published.append(article)
+            article_id = len(self.published)
+        return {"id": article_id, "url": f"{self.base_url}/devto/{slugify(article.get('title', 'post'))}"}
+
+    @staticmethod
+    def _video_id(topic: str, index: int) -> str:
+        return hashlib.md5(f"{topic}:{index}".encode()).hexdigest()[:11]
+
+
+# ---------------------------------------------------------------------- #
+# In-process stand-ins
+# ---------------------------------------------------------------------- #
+class FakeTavily:
+    """Replaces TavilySearchTool: results point at pages on the fake server"""
+
+    def __init__(self, server: FakeServiceServer, max_results: int = 5):
+        self.server = server
+        self.search_depth = "basic"
+        self.max_results = max_results
+
+    def run(self, query: str) -> Dict[str, Any]:
+        self.server.simulate_latency()
+        return {
+            "query": query,
+            "results": [
+                {
+                    "url": self.server.page_url(query, i),
+                    "title": f"{query} - article {i}",
+                    "content": synthetic_text(f"snippet:{query}:{i}", 40, query),
+                    "score": round(1.0 - i * 0.1, 2),
+                }
+                for i in range(self.max_results)
+            ],
+        }
+
+
+class _FakeSnippet:
+    def __init__(self, text: str, start: float, duration: float):
+        self.text = text
+        self.start = start
+        self.duration = duration
+
+
+class _FakeFetchedTranscript:
+    def __init__(self, snippets: List[Dict[str, Any]]):
+        self._snippets = snippets
+
+    def __iter__(self):
+        return (_FakeSnippet(**snippet) for snippet in self._snippets)
+
+    def to_raw_data(self) -> List[Dict[str, Any]]:
+        return self._snippets
+
+
+class _FakeTranscript:
+    def __init__(self, video_id: str, words: int):
+        self.video_id = video_id
+        self.words = words
+        self.language_code = "en"
+        self.is_generated = True
+
+    def fetch(self) -> _FakeFetchedTranscript:
+        text = re.split(r"(?<=\.) ", synthetic_text(f"transcript:{self.video_id}", self.words))
+        snippets, start = [], 0.0
+        for i, sentence in enumerate(text):
+            snippets.append({"text": ("[Music] " if i % 25 == 0 else "") + sentence, "start": start, "duration": 3.5})
+            start += 3.5
+        return _FakeFetchedTranscript(snippets)
+
+
+class _FakeTranscriptList:
+    def __init__(self, video_id: str, words: int):
+        self._transcript = _FakeTranscript(video_id, words)
+
+    def find_transcript(self, languages: List[str]) -> _FakeTranscript:
+        return self._transcript
+
+    def find_generated_transcript(self, languages: List[str]) -> _FakeTranscript:
+        return self._transcript
+
+
+class FakeTranscriptApi:
+    """Replaces youtube_transcript_api.YouTubeTranscriptApi"""
+
+    words = 3000
+    latency_ms = 0.0
+
+    def list(self, video_id: str) -> _FakeTranscriptList:
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000.0)
+        return _FakeTranscriptList(video_id, self.words)
+
+
+class HashEmbedder:
+    """Bag-of-words hashing embedder with the sentence-transformers encode() signature"""
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+
+    def encode(self, texts: List[str], batch_size: int = 32, normalize_embeddings: bool = True, **kwargs) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in re.findall(r"\w+", text.lower()):
+                vectors[row, int(hashlib.md5(word.encode()).hexdigest()[:8], 16) % self.dim] += 1.0
+        if normalize_embeddings:
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            vectors = vectors / np.where(norms == 0, 1.0, norms)
+        return vectors
+
+
+# ---------------------------------------------------------------------- #
+# Deterministic LLM
+# ---------------------------------------------------------------------- #
+class OfflineLLM(BaseLLM):
+    """
+    Speaks CrewAI's ReAct format without a model. For every task it calls each
+    tool listed in the prompt (the RAG tool `rag_queries` times, the others once)
+    and then returns a markdown final answer sized to the requested word count.
+    """
+
+    ACTION_MARKER = "Thought: I should use"
+
+    def __init__(self, topics: List[str], rag_queries: int = 4, latency_ms: float = 0.0):
+        super().__init__(model="offline/deterministic", temperature=0.0)
+        # Longest first so "AI agents in 2025" wins over "AI agents"
+        self.topics = sorted(topics, key=len, reverse=True)
+        self.rag_queries = rag_queries
+        self.latency_ms = latency_ms
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None,
+             from_task=None, from_agent=None, **kwargs) -> str:
+        with self._lock:
+            self.calls += 1
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000.0)
+
+        text = messages if isinstance(messages, str) else "\n".join(str(m.get("content", "")) for m in messages)
+        topic = next((t for t in self.topics if t in text), self.topics[0] if self.topics else "topic")
+        plan = self._plan(text, topic)
+        # Every earlier action of this task is echoed back as an assistant message
+        step = 0 if isinstance(messages, str) else sum(
+            str(m.get("content", "")).count(self.ACTION_MARKER) for m in messages if m.get("role") == "assistant"
+        )
+        if step < len(plan):
+            tool, args = plan[step]
+            return f"{self.ACTION_MARKER} {tool}\nAction: {tool}\nAction Input: {json.dumps(args)}"
+        return f"Thought: I now can give a great answer\nFinal Answer: {self._final_answer(text, topic)}"
+
+    def supports_function_calling(self) -> bool:
+        return False
+
+    def supports_stop_words(self) -> bool:
+        return True
+
+    def get_context_window_size(self) -> int:
+        return 1_000_000
+
+    def _plan(self, text: str, topic: str) -> List[tuple]:
+        plan, seen = [], set()
+        for name, args_schema in re.findall(r"Tool Name: (.+)\nTool Arguments: (.+)", text):
+            name = name.strip()
+            # Tool errors repeat the tool list, so only the first listing of each tool counts
+            if name in seen:
+                continue
+            seen.add(name)
+            if "Search & Embed" in name:
+                plan.append((name, {"query": topic}))
+            elif "Cover Image" in name:
+                plan.append((name, {"topic": topic, "attempts": 2}))
+            elif "Publisher" in name:
+                plan.append((name, {"markdown_content": self._article(topic, 300), "published": True}))
+            elif "query" in args_schema:
+                angles = ["overview", "key benefits", "challenges", "real world examples", "future trends", "best practices"]
+                plan.extend((name, {"query": f"{angles[i % len(angles)]} of {topic}"}) for i in range(self.rag_queries))
+        return plan
+
+    def _final_answer(self, text: str, topic: str) -> str:
+        match = re.search(r"(\d{3,5})[- ]word", text)
+        return self._article(topic, int(match.group(1)) if match else 800)
+
+    def _article(self, topic: str, words: int) -> str:
+        sections = ["Introduction", "Background", "How it works", "Benefits", "Challenges", "Conclusion"]
+        per_section = max(20, words // len(sections))
+        body = "\n\n".join(
+            f"## {title}\n\n{synthetic_text(f'{topic}:{title}', per_section, topic)}" for title in sections
+        )
+        return (
+            f"---\ntitle: {topic.title()}\npublished: true\ntags: ai, machinelearning, tutorial, benchmark\n"
+            f"cover_image: https://example.invalid/{quote(slugify(topic))}.jpg\n---\n\n# {topic.title()}\n\n{body}"
+        )
@@ -0,0 +1,69 @@
+import os
+import sys
+import time
+
+# Ensure we can import the package modules when run as a script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("CREWAI_DISABLE_TELEMETRY", "true")
+os.environ.setdefault("CREWAI_TESTING", "true")
+os.environ.setdefault("CREWAI_TRACING_ENABLED", "false")
+os.environ.setdefault("OTEL_SDK_DISABLED", "true")
+
+import flow.blog_flow as blog_flow  # noqa: E402
+from flow.batch_runner import percentile, print_batch_report, run_batch  # noqa: E402
+
+# topic -> seconds its stub flow takes; "outage" fails after the longest time
+DURATIONS = {"a": 0.1, "b": 0.2, "c": 0.3, "d": 0.4, "e": 0.5, "outage": 1.0}
+
+
+class StubFlow:
+    """Stands in for BlogWritingFlow: sleeps for the topic's duration and records no tokens"""
+
+    def __init__(self, topic, word_count, read_time, run_id, namespace):
+        self.topic, self.run_id, self.namespace = topic, run_id, namespace
+        self.ledger = None
+
+    def kickoff(self):
+        time.sleep(DURATIONS[self.topic.lower()])
+        if self.topic == "outage":
+            raise RuntimeError("simulated LLM outage")
+
+
+def check_percentile() -> None:
+    assert percentile([], 95) == 0.0
+    assert percentile([7.0], 50) == percentile([7.0], 95) == 7.0
+    values = [float(v) for v in range(1, 21)]  # 1..20, shuffled order must not matter
+    values = values[::2] + values[1::2]
+    assert percentile(values, 50) == 10.0 and percentile(values, 95) == 19.0 and percentile(values, 100) == 20.0
+    assert percentile([3.0, 1.0, 2.0, 4.0], 50) == 2.0 and percentile([3.0, 1.0, 2.0, 4.0], 95) == 4.0
+    print("✅ Nearest-rank percentiles: p50/p95 of 1..20 are 10/19")
+
+
+def main():
+    check_percentile()
+
+    blog_flow.BlogWritingFlow = StubFlow
+    topics = [{"topic": t, "word_count": "800", "read_time": "4"} for t in ["e", "outage", "a", "d", "b", "c", "A"]]
+    lines = []
+    report = run_batch(topics, concurrency=len(topics), batch_id="check", printer=lines.append)
+
+    assert [r["topic"] for r in report["results"]] == [t["topic"] for t in topics], "results not in input order"
+    assert [r["run_id"] for r in report["results"]] == [f"check-{i:02d}" for i in range(1, len(topics) + 1)]
+    assert (report["completed"], report["failed"]) == (6, 1)
+    assert report["duplicate_topics"] == ["A", "a"], report["duplicate_topics"]
+    # Completed runs only: 0.1, 0.1, 0.2, 0.3, 0.4, 0.5 -> p50 0.2, p95 0.5; the 1.0s failure is excluded
+    assert abs(report["p50_seconds"] - 0.2) < 0.05, report["p50_seconds"]
+    assert abs(report["p95_seconds"] - 0.5) < 0.05, report["p95_seconds"]
+    assert report["wall_seconds"] < sum(DURATIONS.values()), "flows did not run concurrently"
+    print(f"✅ Batch report: p50 {report['p50_seconds']}s, p95 {report['p95_seconds']}s over completed runs, "
+          f"{report['topics_per_hour']:.0f} topics/hour, results in input order")
+
+    print_batch_report(report, printer=lines.append)
+    assert any("simulated LLM outage" in line for line in lines)
+    assert any("Duplicate topics (run separately): A, a" in line for line in lines)
+    print("✅ Printed report lists the failure and the duplicate topics")
+
+
+if __name__ == "__main__":
+    main()
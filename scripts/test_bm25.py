@@ -0,0 +1,101 @@
+import os
+import sys
+import sqlite3
+import tempfile
+
+import numpy as np
+
+# Ensure we can import tools from the package root and the offline stand-ins when run as a script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from offline_services import HashEmbedder, synthetic_text
+from utils.registry import registry
+from tools.bm25_index import Bm25Index, reciprocal_rank_fusion, tokenize
+from tools.rag_adapter import LocalRagAdapter
+
+MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+DOCS = {
+    1: "Gemma-3-270m runs on a phone after int4 quantization.",
+    2: "Latency of the model depends on the hardware and the batch size.",
+    3: "Gemma models are released by Google; gemma gemma gemma.",
+    4: "Retrieval pipelines fuse dense and lexical rankings.",
+}
+
+
+def check_rrf() -> None:
+    fused = reciprocal_rank_fusion([[10, 20, 30], [30, 40]], k=60)
+    expected = {10: 1 / 61, 20: 1 / 62, 30: 1 / 63 + 1 / 61, 40: 1 / 62}
+    assert fused.keys() == expected.keys() and all(abs(fused[i] - expected[i]) < 1e-12 for i in expected), fused
+    assert max(fused, key=fused.get) == 30, "an id ranked by both lists should win"
+    print("✅ RRF sums 1 / (k + rank) per ranking; agreement beats a single first place")
+
+
+def check_index() -> None:
+    assert tokenize("The Gemma-3-270m model") == ["gemma-3-270m", "gemma", "3", "270m", "model"]
+
+    conn = sqlite3.connect(os.path.join(tempfile.mkdtemp(), "bm25.db"))
+    conn.execute("CREATE TABLE chunks (id INTEGER PRIMARY KEY, content TEXT NOT NULL)")
+    conn.executemany("INSERT INTO chunks (id, content) VALUES (?, ?)", DOCS.items())
+    index = Bm25Index()
+    index.init_schema(conn)
+    conn.commit()
+
+    ranked = [cid for cid, _ in index.search(conn, "gemma 3 270m", None, 10)]
+    assert ranked[0] == 1 and set(ranked) == {1, 3}, f"gemma 3 270m ranked {ranked}"
+    scoped = [cid for cid, _ in index.search(conn, "gemma 3 270m", np.array([2, 3]), 10)]
+    assert scoped == [3], f"scope [2, 3] returned {scoped}"
+    print(f"✅ BM25 ranks the exact model name first ({ranked}); scopes restrict results ({scoped})")
+
+    # A rolled-back insert must not reach the cached postings
+    try:
+        with conn:
+            conn.execute("INSERT INTO chunks (id, content) VALUES (5, 'gemma-3-270m benchmark')")
+            index.add(conn, [(5, "gemma-3-270m benchmark")])
+            raise RuntimeError("simulated ingest failure")
+    except RuntimeError:
+        pass
+    ranked = [cid for cid, _ in index.search(conn, "gemma 3 270m", None, 10)]
+    assert 5 not in ranked, f"rolled-back chunk returned: {ranked}"
+    with conn:
+        conn.execute("INSERT INTO chunks (id, content) VALUES (5, 'gemma-3-270m benchmark')")
+        update = index.add(conn, [(5, "gemma-3-270m benchmark")])
+    index.apply(update)
+    ids = index._term_postings(conn, "270m")[0]
+    assert sorted(ids.tolist()) == [1, 5], f"postings of 270m after commit: {ids}"
+    print("✅ Cached postings follow commits only, without duplicates")
+
+
+def check_hybrid() -> None:
+    """A chunk only BM25 finds (below the dense threshold) still reaches the fused results"""
+    registry.register(f"embedding_model:{MODEL}", HashEmbedder)
+    workdir = tempfile.mkdtemp()
+    results = {}
+    for hybrid in (False, True):
+        rag = LocalRagAdapter(
+            embedding_model=MODEL,
+            db_path=os.path.join(workdir, f"rag-{hybrid}.db"),
+            embedding_cache_path=os.path.join(workdir, "embeddings.db"),
+            hybrid_search=hybrid,
+        )
+        rag.add_many([{"content": synthetic_text(f"filler-{i}", 120, "edge inference"), "data_type": "text"}
+                      for i in range(5)] +
+                     [{"content": synthetic_text("needle", 120) + " It ships as gemma-3-270m.", "data_type": "text"}])
+        results[hybrid] = rag.search("gemma-3-270m edge inference", limit=5, similarity_threshold=0.5)
+
+    assert not any("gemma-3-270m" in hit["content"] for hit in results[False]), "dense leg alone should miss it"
+    needle = [hit for hit in results[True] if "gemma-3-270m" in hit["content"]]
+    assert needle and needle[0]["bm25"] > 0 and needle[0]["fused"] > 0, results[True]
+    assert [hit["fused"] for hit in results[True]] == sorted((hit["fused"] for hit in results[True]), reverse=True)
+    print(f"✅ Hybrid search finds the exact-term chunk (bm25 {needle[0]['bm25']}, fused {needle[0]['fused']}); "
+          "dense search alone does not")
+
+
+def main():
+    check_rrf()
+    check_index()
+    check_hybrid()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+import os
+import sys
+import tempfile
+
+# Ensure we can import the package modules and the offline stand-ins when run as a script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+os.environ.setdefault("CREWAI_DISABLE_TELEMETRY", "true")
+os.environ.setdefault("CREWAI_TESTING", "true")
+os.environ.setdefault("CREWAI_TRACING_ENABLED", "false")
+os.environ.setdefault("OTEL_SDK_DISABLED", "true")
+
+from crewai import Agent, Crew, Process, Task  # noqa: E402
+from offline_services import OfflineLLM  # noqa: E402
+from flow.checkpoints import RunCheckpoint, list_runs  # noqa: E402
+
+TOPIC = "small language models"
+TASKS = ["outline_task", "draft_task", "edit_task"]
+
+
+class FlakyLLM(OfflineLLM):
+    """OfflineLLM that records the prompt of every call and fails the task named in `fail_on`"""
+
+    def __init__(self, fail_on=None):
+        super().__init__([TOPIC])
+        self.fail_on = fail_on
+        self.prompts = []
+
+    def call(self, messages, *args, **kwargs):
+        text = messages if isinstance(messages, str) else "\n".join(str(m.get("content", "")) for m in messages)
+        self.prompts.append(text)
+        if self.fail_on and f"Step {self.fail_on}" in text:
+            raise RuntimeError(f"simulated outage during {self.fail_on}")
+        return super().call(messages, *args, **kwargs)
+
+
+def build_crew(llm: FlakyLLM) -> Crew:
+    agent = Agent(role="Writer", goal=f"Write about {TOPIC}", backstory="Offline check", llm=llm, max_iter=1)
+    tasks = []
+    for name in TASKS:
+        tasks.append(Task(name=name, description=f"Step {name}: a 100-word piece on {TOPIC}",
+                          expected_output="markdown", agent=agent, context=tasks[-1:]))
+    return Crew(agents=[agent], tasks=tasks, process=Process.sequential, verbose=False)
+
+
+def check_steps(root: str) -> None:
+    """Finished flow steps survive a reload; a fresh checkpoint has none"""
+    checkpoint = RunCheckpoint("run-steps", root)
+    assert not checkpoint.exists and not checkpoint.step_done("research_phase")
+    checkpoint.save_inputs({"topic": TOPIC})
+    checkpoint.complete_step("research_phase", {"topic": TOPIC, "sources": 3})
+
+    resumed = RunCheckpoint.load("run-steps", root)
+    assert resumed.step_done("research_phase") and not resumed.step_done("content_creation_phase")
+    assert resumed.step_result("research_phase") == {"topic": TOPIC, "sources": 3}
+    resumed.save_inputs({"topic": "something else"})
+    assert resumed.inputs == {"topic": TOPIC}, "a resumed run must keep its original inputs"
+    print("✅ Finished flow steps and original inputs survive a reload")
+
+
+def main():
+    root = tempfile.mkdtemp()
+    check_steps(root)
+
+    # First attempt: the second task fails, so only the first is checkpointed
+    checkpoint = RunCheckpoint("run-tasks", root)
+    checkpoint.save_inputs({"topic": TOPIC})
+    crew = build_crew(FlakyLLM(fail_on="draft_task"))
+    assert checkpoint.prepare_crew(crew) == []
+    try:
+        crew.kickoff()
+        raise AssertionError("the first attempt should fail")
+    except RuntimeError:
+        pass
+    checkpoint.finish("failed")
+    saved = RunCheckpoint.load("run-tasks", root).task_outputs()
+    assert list(saved) == ["outline_task"], f"checkpointed tasks after the failure: {list(saved)}"
+    print("✅ Tasks that finished before the failure are checkpointed")
+
+    # Resume: the finished task is skipped, and its saved output is the next task's context
+    resumed = RunCheckpoint.load("run-tasks", root)
+    llm = FlakyLLM()
+    crew = build_crew(llm)
+    skipped = resumed.prepare_crew(crew)
+    assert skipped == ["outline_task"] and [t.name for t in crew.tasks] == TASKS[1:], skipped
+    crew.kickoff()
+    assert not any("Step outline_task" in p for p in llm.prompts), "a checkpointed task ran again"
+    draft_prompt = next(p for p in llm.prompts if "Step draft_task" in p)
+    assert saved["outline_task"].raw[:200] in draft_prompt, "the draft task did not get the saved outline as context"
+    assert sorted(resumed.task_outputs()) == sorted(TASKS)
+    print(f"✅ Resume skipped {skipped} and ran {[t.name for t in crew.tasks]} with the saved output as context")
+
+    assert [r["run_id"] for r in list_runs(root)][0] == "run-tasks"
+
+
+if __name__ == "__main__":
+    main()
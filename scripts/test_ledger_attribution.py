@@ -0,0 +1,100 @@
+import os
+import sys
+import random
+import tempfile
+import threading
+import time
+
+# Ensure we can import the package modules when run as a script
+if "crew" not in "".join(sys.path):
+    sys.path.append(os.path.abspath("."))
+
+os.environ.setdefault("CREWAI_DISABLE_TELEMETRY", "true")
+os.environ.setdefault("CREWAI_TESTING", "true")
+os.environ.setdefault("CREWAI_TRACING_ENABLED", "false")
+os.environ.setdefault("OTEL_SDK_DISABLED", "true")
+
+import litellm  # noqa: E402
+import crewai.llm  # noqa: E402
+from litellm import ModelResponse  # noqa: E402
+from litellm.integrations.custom_logger import CustomLogger  # noqa: E402
+from crewai import Agent, Crew, Process, Task  # noqa: E402
+from crew.llm import RateLimitedLLM, _UsageCapture  # noqa: E402
+from utils.ledger import TokenLedger, attribute_to  # noqa: E402
+
+RUNS = 8
+TASKS_PER_RUN = 4
+
+
+def fake_completion(**params):
+    """Offline litellm.completion that, like litellm, also notifies the global callbacks from a logging thread"""
+    time.sleep(random.uniform(0, 0.01))
+    prompt, completion = random.randint(50, 5000), random.randint(10, 500)
+    response = ModelResponse(
+        model=params.get("model"),
+        choices=[{"message": {"role": "assistant", "content": "Thought: I now know the final answer\nFinal Answer: done"}}],
+        usage={"prompt_tokens": prompt, "completion_tokens": completion, "total_tokens": prompt + completion},
+    )
+    loggers = [cb for cb in list(litellm.callbacks) if isinstance(cb, CustomLogger) or hasattr(cb, "log_success_event")]
+
+    def log_success():
+        # litellm's logging worker runs after the call returns, while other flows are mid-call
+        for delay in [0.0] + [0.001] * 30:
+            time.sleep(delay)
+            for cb in loggers:
+                cb.log_success_event(params, response, 0.0, 0.0)
+
+    threading.Thread(target=log_success, daemon=True).start()
+    return response
+
+
+def run_crew(ledger: TokenLedger, run_id: str, results: dict) -> None:
+    llm = RateLimitedLLM(model="gemini/gemini-2.5-flash", api_key="offline", max_rpm=1e6, max_tpm=1e9)
+    agent = Agent(role=f"Writer {run_id}", goal="Write", backstory="Offline check", llm=llm, max_iter=1)
+    tasks = [Task(name=f"task_{i}", description=f"Step {i} of {run_id}", expected_output="done", agent=agent)
+             for i in range(TASKS_PER_RUN)]
+    ledger.start_run(run_id, run_id)
+    with attribute_to(ledger, run_id, "content_creation_phase"):
+        output = Crew(agents=[agent], tasks=tasks, process=Process.sequential, verbose=False).kickoff()
+    results[run_id] = output.token_usage
+
+
+def check_capture() -> None:
+    """A capture keeps its own call's usage even when litellm delivers another call's response later"""
+    own = {"prompt_tokens": 10, "completion_tokens": 2, "total_tokens": 12}
+    other = ModelResponse(choices=[{"message": {"role": "assistant", "content": "x"}}],
+                          usage={"prompt_tokens": 999, "completion_tokens": 99, "total_tokens": 1098})
+    capture = _UsageCapture()
+    capture.log_success_event({}, {"usage": own}, 0, 0)
+    late = threading.Thread(target=capture.log_success_event, args=({}, {"usage": other.usage}, 0.0, 0.0))
+    late.start()
+    late.join()
+    capture.log_success_event({}, other, 0.0, 0.0)
+    assert capture.usage == own, f"capture picked up another call's usage: {capture.usage}"
+    print("✅ Usage capture ignores responses of other calls")
+
+
+def main():
+    check_capture()
+    crewai.llm.litellm.completion = fake_completion
+    ledger = TokenLedger(os.path.join(tempfile.mkdtemp(), "ledger.db"))
+    results: dict = {}
+    threads = [threading.Thread(target=run_crew, args=(ledger, f"run-{i}", results)) for i in range(RUNS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(results) == RUNS, f"only {len(results)} of {RUNS} crews finished"
+    for run_id, usage in sorted(results.items()):
+        calls = ledger.breakdown(run_id, by="phase")
+        recorded = (sum(c["prompt_tokens"] for c in calls), sum(c["completion_tokens"] for c in calls))
+        expected = (usage.prompt_tokens, usage.completion_tokens)
+        assert recorded == expected, f"{run_id}: ledger {recorded} != crew token_usage {expected}"
+        assert sum(c["requests"] for c in calls) == usage.successful_requests
+        print(f"✅ {run_id}: {recorded[0]:,} prompt + {recorded[1]:,} completion tokens in "
+              f"{usage.successful_requests} calls, matching the crew's token_usage")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+import os
+import sys
+import tempfile
+
+# Ensure we can import tools from the package root and the offline stand-ins when run as a script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from offline_services import HashEmbedder, synthetic_text
+from utils.registry import registry
+from tools.query_cache import scope_key
+from tools.rag_adapter import LocalRagAdapter
+
+MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+QUESTION = "How does quantization change inference latency?"
+
+
+def ask(rag: LocalRagAdapter, namespace: str, also_search=None) -> str:
+    with rag.use_namespace(namespace, also_search):
+        return rag.query(QUESTION)
+
+
+def counts(rag: LocalRagAdapter) -> tuple:
+    stats = rag.query_cache.stats()
+    return stats["exact_hits"], stats["misses"]
+
+
+def check_scopes(rag: LocalRagAdapter) -> None:
+    """invalidate() drops every scope that searches the namespace, and only those"""
+    cache = rag.query_cache
+    vector = HashEmbedder().encode(["scope check"])[0]
+    # "_" and "%" in a namespace are literal characters, not patterns
+    scopes = [scope_key(["gemma_3"]), scope_key(["beta", "gemma_3"]), scope_key(["*"]),
+              scope_key(["beta"]), scope_key(["gemma-3"]), scope_key(["gemma_30"])]
+    for scope in scopes:
+        cache.put(scope, "scope-check", "scope check", vector, {"scope": scope})
+    cache.invalidate("gemma_3")
+    kept = [scope for scope in scopes if cache.get_exact(scope, "scope-check", "scope check") is not None]
+    assert kept == scopes[3:], f"kept after invalidating gemma_3: {kept}"
+    print(f"✅ invalidate('gemma_3') keeps only {', '.join(kept)}")
+
+
+def main():
+    registry.register(f"embedding_model:{MODEL}", HashEmbedder)
+    workdir = tempfile.mkdtemp()
+    rag = LocalRagAdapter(
+        embedding_model=MODEL,
+        db_path=os.path.join(workdir, "rag.db"),
+        embedding_cache_path=os.path.join(workdir, "embeddings.db"),
+        compress_results=False,
+    )
+    with rag.use_namespace("alpha"):
+        rag.add_many([{"content": synthetic_text("alpha", 300, "quantization"), "data_type": "text"}])
+    with rag.use_namespace("beta"):
+        rag.add_many([{"content": synthetic_text("beta", 300, "latency"), "data_type": "text"}])
+
+    # Warm the cache for three scopes, then repeat: all exact hits
+    for namespace, also in [("alpha", None), ("beta", None), ("beta", "*")]:
+        ask(rag, namespace, also)
+    hits, misses = counts(rag)
+    for namespace, also in [("alpha", None), ("beta", None), ("beta", "*")]:
+        ask(rag, namespace, also)
+    assert counts(rag) == (hits + 3, misses), f"repeats were not served from the cache: {counts(rag)}"
+    print("✅ Repeated questions are exact cache hits")
+
+    # New content in alpha: alpha and "*" must search again, beta keeps its answer
+    marker = "Alpha-only addendum about gguf quantization kernels."
+    with rag.use_namespace("alpha"):
+        rag.add_many([{"content": marker * 20, "data_type": "text"}])
+    hits, misses = counts(rag)
+    assert "gguf" in ask(rag, "alpha"), "alpha answer misses content ingested after it was cached"
+    assert counts(rag) == (hits, misses + 1), "alpha was answered from a stale cache entry"
+    ask(rag, "beta", "*")
+    assert counts(rag) == (hits, misses + 2), "the all-namespaces scope was answered from a stale cache entry"
+    ask(rag, "beta")
+    assert counts(rag) == (hits + 1, misses + 2), "ingesting into alpha invalidated beta"
+    print("✅ Ingesting into alpha invalidates alpha and '*' only; beta stays cached")
+
+    check_scopes(rag)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+import os
+import sys
+import random
+
+# Ensure we can import tools from the package root when run as a script
+if "tools" not in "".join(sys.path):
+    sys.path.append(os.path.abspath("."))
+
+from tools.youtube_tool import sentence_segments
+
+WORDS = ["the", "model", "quantization", "latency", "a", "benchmark", "gemma-3-270m", "x" * 45]
+
+
+def timed(words):
+    return [(word, float(i), float(i) + 0.5) for i, word in enumerate(words)]
+
+
+def check(words, max_chars):
+    segments = list(sentence_segments(timed(words), max_chars))
+    for seg in segments:
+        assert len(seg["text"]) <= max_chars, f"{len(seg['text'])} > {max_chars}: {seg['text']!r}"
+    # Every character of the input survives segmentation
+    assert "".join(s["text"].replace(" ", "") for s in segments) == "".join(words)
+    return segments
+
+
+def main():
+    # A cut at a sentence end used to leave too little room for the next word
+    segments = check(["Aaaa", "bbbb.", "cccccccccc", "dddddddd"], 20)
+    print(f"✅ Sentence-end cut: {[s['text'] for s in segments]}")
+
+    # Long punctuation-free input (auto-generated captions)
+    rng = random.Random(0)
+    for max_chars in (20, 50, 200, 1000):
+        words = [rng.choice(WORDS) + ("." if rng.random() < 0.05 else "") for _ in range(5000)]
+        segments = check(words, max_chars)
+        print(f"✅ max_chars={max_chars}: {len(segments)} segments, longest {max(len(s['text']) for s in segments)}")
+
+    segments = check(["unpunctuated"] * 2000, 1000)
+    assert all(s["start"] is not None and s["end"] >= s["start"] for s in segments)
+    print(f"✅ No punctuation: {len(segments)} segments with start/end times")
+
+
+if __name__ == "__main__":
+    main()
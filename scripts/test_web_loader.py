@@ -0,0 +1,51 @@
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Ensure we can import tools from the package root when run as a script
+if "tools" not in "".join(sys.path):
+    sys.path.append(os.path.abspath("."))
+
+from tools.web_loader import fetch_page_text
+
+TEXT = "Café — naïve façade"
+
+# path -> (Content-Type header, body)
+PAGES = {
+    "/no-charset": ("text/html", f"<html><body><p>{TEXT}</p></body></html>".encode("utf-8")),
+    "/meta-charset": ("text/html", f'<html><head><meta charset="utf-8"></head><body><p>{TEXT}</p></body></html>'.encode("utf-8")),
+    "/header-charset": ("text/html; charset=utf-8", f"<html><body><p>{TEXT}</p></body></html>".encode("utf-8")),
+    "/latin-1": ("text/html; charset=ISO-8859-1", "<html><body><p>Café naïve</p></body></html>".encode("latin-1")),
+}
+EXPECTED = {"/latin-1": "Café naïve"}
+
+
+class Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        content_type, body = PAGES[self.path]
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def main():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        for path in PAGES:
+            text = fetch_page_text(f"http://127.0.0.1:{server.server_port}{path}", timeout=5)
+            expected = EXPECTED.get(path, TEXT)
+            assert text == expected, f"{path}: {text!r} != {expected!r}"
+            print(f"✅ {path}: {text}")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
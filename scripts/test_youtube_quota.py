@@ -0,0 +1,101 @@
+import os
+import sys
+import time
+import tempfile
+from datetime import datetime, timezone
+
+import httplib2
+from googleapiclient.errors import HttpError
+
+# Ensure we can import tools from the package root when run as a script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tools.youtube_cache as youtube_cache
+from tools.youtube_cache import QuotaExceeded, QuotaLedger, YouTubeApiCache, quota_day
+
+
+class FakeYouTube:
+    """googleapiclient-shaped client: youtube.search().list(**params).execute()"""
+
+    def __init__(self):
+        self.calls = 0
+        self.quota_error = False
+
+    def search(self):
+        return self
+
+    def list(self, **params):
+        self.params = params
+        self.headers = {}
+        return self
+
+    def execute(self):
+        self.calls += 1
+        if self.quota_error:
+            raise HttpError(httplib2.Response({"status": 403}), b'{"error": {"errors": [{"reason": "quotaExceeded"}]}}')
+        return {"etag": f"etag-{self.calls}", "items": [{"q": self.params["q"], "call": self.calls}]}
+
+
+def check_quota_day() -> None:
+    """Quota days turn over at midnight Pacific time, not UTC"""
+    assert quota_day(datetime(2026, 7, 1, 6, 59, tzinfo=timezone.utc)) == "2026-06-30"
+    assert quota_day(datetime(2026, 7, 1, 7, 0, tzinfo=timezone.utc)) == "2026-07-01"
+    assert quota_day(datetime(2026, 1, 1, 7, 59, tzinfo=timezone.utc)) == "2025-12-31"
+    assert quota_day(datetime(2026, 1, 1, 8, 0, tzinfo=timezone.utc)) == "2026-01-01"
+    print("✅ Quota days roll over at midnight Pacific (07:00 UTC in summer, 08:00 UTC in winter)")
+
+
+def main():
+    check_quota_day()
+
+    today = {"day": "2026-10-18"}
+    youtube_cache.quota_day = lambda now=None: today["day"]
+
+    path = os.path.join(tempfile.mkdtemp(), "cache.db")
+    ledger = QuotaLedger(daily_limit=1000, warn_fraction=0.8, path=path)
+    client = FakeYouTube()
+    # Entries go stale almost at once, and stay usable as a fallback for an hour
+    cache = YouTubeApiCache(lambda: client, ledger=ledger, search_ttl_hours=1e-6, stale_hours=1, path=path)
+
+    first = cache.search(q="edge ai", part="snippet")
+    assert client.calls == 1 and ledger.used() == 100
+    time.sleep(0.05)
+
+    # Past the warning threshold a stale entry is served without spending quota
+    for _ in range(7):
+        ledger.reserve("search.list")
+    assert ledger.is_low() and ledger.used() == 800
+    assert cache.search(q="Edge  AI", part="snippet") == first and client.calls == 1 and ledger.used() == 800
+    print("✅ Low quota: stale search result served without an API call")
+
+    # Out of quota: an uncached query fails without calling the API
+    ledger.reserve("search.list")
+    ledger.reserve("search.list")
+    try:
+        cache.search(q="robotics", part="snippet")
+        raise AssertionError("an uncached search on an exhausted quota should raise QuotaExceeded")
+    except QuotaExceeded:
+        pass
+    assert client.calls == 1 and ledger.remaining() == 0
+    print("✅ Exhausted quota: uncached search raises QuotaExceeded without an API call")
+
+    # Next quota day: the budget is back, stale entries are revalidated again
+    yesterday, today["day"] = today["day"], "2026-10-19"
+    assert ledger.used() == 0 and not ledger.is_low()
+    refreshed = cache.search(q="edge ai", part="snippet")
+    assert client.calls == 2 and refreshed["items"][0]["call"] == 2
+    assert ledger.used() == 100 and ledger.used(yesterday) == 1000
+    print(f"✅ Day rollover: {ledger.used():,} units on {today['day']}, {ledger.used(yesterday):,} kept for {yesterday}")
+
+    # The API itself reports quotaExceeded: the ledger is exhausted and the stale entry is the fallback
+    time.sleep(0.05)
+    client.quota_error = True
+    assert cache.search(q="edge ai", part="snippet") == refreshed and client.calls == 3
+    assert ledger.remaining() == 0
+    stats = ledger.stats()
+    assert stats["methods"]["quotaExceeded"]["units"] == 1000 - 200, stats
+    print(f"✅ API quotaExceeded: stale fallback served, ledger marked exhausted ({stats['methods']})")
+
+
+if __name__ == "__main__":
+    main()
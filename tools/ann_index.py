@@ -0,0 +1,265 @@
+# tools/ann_index.py
+"""
+Approximate nearest-neighbour search for large RAG scopes.
+An inverted-file (IVF) index: a spherical k-means splits the normalized
+MiniLM vectors into `nlist` cells, and a query only scans the vectors of its
+`nprobe` closest cells. Vectors are stored as int8 codes with one scale per
+dimension (4x less memory than float32). The best `rerank` x k candidates
+are re-scored exactly with float32 vectors read back from the store, so
+approximation only affects which candidates are found, not their scores.
+New vectors are inserted into their nearest cell without retraining;
+`needs_retrain` turns true once the index has doubled since training.
+
+Check recall and latency on a store (or synthetic vectors) with:
+
+    python -m tools.ann_index --db output/rag/knowledge_base.db --k 10
+    python -m tools.ann_index --synthetic 50000
+"""
+
+import math
+import time
+import sqlite3
+import argparse
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+VectorFetcher = Callable[[Sequence[int]], np.ndarray]
+
+
+def default_nlist(size: int) -> int:
+    """About 4 * sqrt(n) cells, the usual IVF starting point"""
+    return int(min(4096, max(8, 4 * math.sqrt(size))))
+
+
+class IvfIndex:
+    """IVF index with int8 scalar-quantized vectors and optional exact re-ranking"""
+
+    def __init__(self, nlist: Optional[int] = None, nprobe: int = 8, rerank: int = 4,
+                 train_iterations: int = 10, seed: int = 0):
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.rerank = rerank
+        self.train_iterations = train_iterations
+        self.seed = seed
+        self.centroids = np.zeros((0, 0), dtype=np.float32)
+        self.scale = np.zeros(0, dtype=np.float32)
+        # One (chunk ids, int8 codes) pair per cell, replaced as a whole on insert
+        self.lists: List[Tuple[np.ndarray, np.ndarray]] = []
+        self.trained_size = 0
+        self._sorted_ids: Optional[np.ndarray] = None
+
+    # ------------------------------------------------------------------ #
+    # Build and insert
+    # ------------------------------------------------------------------ #
+    def build(self, ids: np.ndarray, vectors: np.ndarray) -> "IvfIndex":
+        """Train centroids and quantization scales on `vectors`, then index them"""
+        ids = np.asarray(ids, dtype=np.int64)
+        vectors = np.asarray(vectors, dtype=np.float32)
+        nlist = min(self.nlist or default_nlist(len(vectors)), max(1, len(vectors)))
+        rng = np.random.default_rng(self.seed)
+        # k-means on a sample of up to 64 vectors per cell
+        sample = vectors[rng.choice(len(vectors), min(len(vectors), nlist * 64), replace=False)]
+        centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+        for _ in range(self.train_iterations):
+            assignment = self._nearest(sample, centroids)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, sample)
+            counts = np.bincount(assignment, minlength=nlist)
+            # Empty cells are re-seeded from random sample vectors
+            empty = counts == 0
+            sums[empty] = sample[rng.choice(len(sample), int(empty.sum()))]
+            centroids = sums / np.maximum(np.linalg.norm(sums, axis=1, keepdims=True), 1e-12)
+        self.centroids = centroids.astype(np.float32)
+        self.scale = (np.maximum(np.abs(sample).max(axis=0), 1e-6) / 127.0).astype(np.float32)
+        self.lists = [(np.zeros(0, dtype=np.int64), np.zeros((0, vectors.shape[1]), dtype=np.int8))
+                      for _ in range(nlist)]
+        self.trained_size = len(vectors)
+        self.add(ids, vectors)
+        return self
+
+    def add(self, ids: np.ndarray, vectors: np.ndarray) -> None:
+        """Insert vectors into their nearest cells (no retraining)"""
+        if not len(ids):
+            return
+        ids = np.asarray(ids, dtype=np.int64)
+        codes = self.quantize(np.asarray(vectors, dtype=np.float32))
+        assignment = self._nearest(np.asarray(vectors, dtype=np.float32), self.centroids)
+        order = np.argsort(assignment, kind="stable")
+        cells, starts = np.unique(assignment[order], return_index=True)
+        bounds = list(starts[1:]) + [len(order)]
+        for cell, start, end in zip(cells, starts, bounds):
+            rows = order[start:end]
+            cell_ids, cell_codes = self.lists[cell]
+            self.lists[cell] = (np.concatenate([cell_ids, ids[rows]]), np.concatenate([cell_codes, codes[rows]]))
+        self._sorted_ids = None
+
+    def quantize(self, vectors: np.ndarray) -> np.ndarray:
+        return np.clip(np.rint(vectors / self.scale), -127, 127).astype(np.int8)
+
+    @staticmethod
+    def _nearest(vectors: np.ndarray, centroids: np.ndarray, batch: int = 8192) -> np.ndarray:
+        return np.concatenate([
+            np.argmax(vectors[start:start + batch] @ centroids.T, axis=1)
+            for start in range(0, len(vectors), batch)
+        ]) if len(vectors) else np.zeros(0, dtype=np.int64)
+
+    # ------------------------------------------------------------------ #
+    # Search
+    # ------------------------------------------------------------------ #
+    def search(self, query: np.ndarray, k: int, nprobe: Optional[int] = None, rerank: Optional[int] = None,
+               vectors: Optional[VectorFetcher] = None) -> Tuple[List[int], List[float]]:
+        """
+        Top `k` (chunk ids, scores), best first. With a `vectors` fetcher the
+        best `rerank` x k candidates are re-scored with their float32
+        vectors; otherwise scores come from the int8 codes.
+        """
+        nprobe = min(nprobe or self.nprobe, len(self.lists))
+        rerank = self.rerank if rerank is None else rerank
+        if nprobe <= 0 or k <= 0:
+            return [], []
+        cell_scores = self.centroids @ query
+        if nprobe < len(self.lists):
+            probed = np.argpartition(-cell_scores, nprobe - 1)[:nprobe]
+        else:
+            probed = range(len(self.lists))
+        ids = np.concatenate([self.lists[cell][0] for cell in probed])
+        if not len(ids):
+            return [], []
+        codes = np.concatenate([self.lists[cell][1] for cell in probed])
+        approx = codes.astype(np.float32) @ (query * self.scale)
+
+        keep = min(len(ids), k * max(1, rerank) if vectors is not None else k)
+        top = np.argpartition(-approx, keep - 1)[:keep] if keep < len(ids) else np.arange(len(ids))
+        candidates, scores = ids[top], approx[top]
+        if vectors is not None:
+            scores = vectors([int(c) for c in candidates]) @ query
+        best = np.argsort(-scores)[:k]
+        return [int(c) for c in candidates[best]], [float(s) for s in scores[best]]
+
+    # ------------------------------------------------------------------ #
+    # Introspection
+    # ------------------------------------------------------------------ #
+    @property
+    def ids(self) -> np.ndarray:
+        """All indexed chunk ids, sorted"""
+        if self._sorted_ids is None:
+            self._sorted_ids = np.sort(np.concatenate([cell_ids for cell_ids, _ in self.lists])) \
+                if self.lists else np.zeros(0, dtype=np.int64)
+        return self._sorted_ids
+
+    @property
+    def size(self) -> int:
+        return sum(len(cell_ids) for cell_ids, _ in self.lists)
+
+    @property
+    def needs_retrain(self) -> bool:
+        return self.size > 2 * max(1, self.trained_size)
+
+    def memory_bytes(self) -> int:
+        return int(self.centroids.nbytes + self.scale.nbytes
+                   + sum(cell_ids.nbytes + codes.nbytes for cell_ids, codes in self.lists))
+
+    def stats(self) -> Dict[str, Any]:
+        sizes = [len(cell_ids) for cell_ids, _ in self.lists]
+        return {
+            "vectors": self.size,
+            "nlist": len(self.lists),
+            "nprobe": self.nprobe,
+            "rerank": self.rerank,
+            "largest_cell": max(sizes, default=0),
+            "memory_mb": round(self.memory_bytes() / (1024 * 1024), 2),
+            "float32_mb": round(self.size * self.centroids.shape[1] * 4 / (1024 * 1024), 2) if self.size else 0.0,
+        }
+
+
+def recall_at_k(index: IvfIndex, ids: np.ndarray, matrix: np.ndarray, k: int = 10, queries: int = 100,
+                nprobe_values: Sequence[int] = (1, 2, 4, 8, 16, 32), rerank: Optional[int] = None,
+                seed: int = 0) -> List[Dict[str, Any]]:
+    """
+    Recall@k of the index against exact search over (`ids`, `matrix`) per
+    nprobe value, using stored vectors as queries (each query's own vector
+    is left out of both result lists). Also reports mean latency of both.
+    """
+    rng = np.random.default_rng(seed)
+    picks = rng.choice(len(ids), min(queries, len(ids)), replace=False)
+    position = {int(cid): row for row, cid in enumerate(ids)}
+
+    def fetch(chunk_ids: Sequence[int]) -> np.ndarray:
+        return matrix[[position[c] for c in chunk_ids]]
+
+    started = time.perf_counter()
+    exact = []
+    for row in picks:
+        scores = matrix @ matrix[row]
+        top = np.argpartition(-scores, k)[:k + 1]
+        top = top[np.argsort(-scores[top])]
+        exact.append(set([int(ids[i]) for i in top if i != row][:k]))
+    exact_ms = (time.perf_counter() - started) / len(picks) * 1000
+
+    results = []
+    for nprobe in nprobe_values:
+        found = 0
+        started = time.perf_counter()
+        for row, truth in zip(picks, exact):
+            hits, _ = index.search(matrix[row], k + 1, nprobe=nprobe, rerank=rerank, vectors=fetch)
+            found += len(truth.intersection([h for h in hits if h != int(ids[row])][:k]))
+        results.append({
+            "nprobe": min(nprobe, len(index.lists)),
+            "recall_at_k": round(found / (k * len(picks)), 4),
+            "ann_ms": round((time.perf_counter() - started) / len(picks) * 1000, 3),
+            "exact_ms": round(exact_ms, 3),
+        })
+    return results
+
+
+def _load_store(db_path: str) -> Tuple[np.ndarray, np.ndarray]:
+    conn = sqlite3.connect(db_path)
+    try:
+        rows = conn.execute("SELECT id, embedding FROM chunks ORDER BY id").fetchall()
+    finally:
+        conn.close()
+    if not rows:
+        return np.zeros(0, dtype=np.int64), np.zeros((0, 0), dtype=np.float32)
+    return (np.array([r[0] for r in rows], dtype=np.int64),
+            np.vstack([np.frombuffer(r[1], dtype=np.float32) for r in rows]))
+
+
+def _synthetic(size: int, dim: int = 384, clusters: int = 200, seed: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """Clustered unit vectors, roughly shaped like sentence embeddings of many topics"""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim)).astype(np.float32)
+    vectors = centers[rng.integers(0, clusters, size)] + rng.normal(scale=0.6, size=(size, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return np.arange(1, size + 1, dtype=np.int64), vectors
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m tools.ann_index",
+                                     description="Recall@k and latency of the IVF index against exact search")
+    parser.add_argument("--db", default="output/rag/knowledge_base.db", help="RAG store to read vectors from")
+    parser.add_argument("--synthetic", type=int, default=0, help="Use N synthetic vectors instead of the store")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--nlist", type=int, default=None)
+    parser.add_argument("--rerank", type=int, default=4, help="Candidates re-scored exactly, as a multiple of k")
+    args = parser.parse_args(argv)
+
+    ids, matrix = _synthetic(args.synthetic) if args.synthetic else _load_store(args.db)
+    if len(ids) <= args.k:
+        print(f"❌ Need more than {args.k} vectors, found {len(ids)}")
+        return 1
+    started = time.perf_counter()
+    index = IvfIndex(nlist=args.nlist, rerank=args.rerank).build(ids, matrix)
+    built = time.perf_counter() - started
+    stats = index.stats()
+    print(f"🧭 IVF over {stats['vectors']:,} vectors: nlist {stats['nlist']}, built in {built:.2f}s")
+    print(f"  Memory: {stats['memory_mb']} MB int8 codes vs {stats['float32_mb']} MB float32")
+    print(f"\n{'nprobe':>6} {'recall@' + str(args.k):>10} {'ann ms':>8} {'exact ms':>9}")
+    for row in recall_at_k(index, ids, matrix, k=args.k, queries=args.queries):
+        print(f"{row['nprobe']:>6} {row['recall_at_k']:>10.3f} {row['ann_ms']:>8.3f} {row['exact_ms']:>9.3f}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,223 @@
+# tools/bm25_index.py
+"""
+Lexical BM25 index for the RAG store.
+Dense MiniLM similarity blurs exact terms such as model names ("gemma 3
+270m"), version numbers and API names. This inverted index keeps one
+posting (term, chunk, term frequency) per distinct term of every chunk in
+the same SQLite file as the vectors. It is written in the transaction that
+inserts the chunks, so it is updated incrementally at ingest; the in-memory
+caches follow once that transaction committed. Chunks are
+immutable (deduplicated by content hash), so postings never change once
+written; namespaces only restrict which chunks a query may return.
+Scoring runs in numpy over posting arrays cached per term.
+"""
+
+import re
+import math
+import sqlite3
+import threading
+from collections import Counter, OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# Words, numbers and compounds such as "gpt-4o", "v2.5" or "llama_index"
+TOKEN = re.compile(r"[a-z0-9]+(?:[._+-][a-z0-9]+)*")
+STOPWORDS = frozenset("""
+a an and are as at be by for from has have how in is it its of on or that the this to was were what when where
+which who why will with
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased terms; compounds also yield their parts, so "gemma-3-270m" matches "gemma 3 270m" """
+    terms: List[str] = []
+    for token in TOKEN.findall(text.lower()):
+        if token in STOPWORDS:
+            continue
+        terms.append(token)
+        parts = re.split(r"[._+-]", token)
+        if len(parts) > 1:
+            terms.extend(part for part in parts if part and part not in STOPWORDS)
+    return terms
+
+
+class Bm25Index:
+    """
+    BM25 postings persisted next to the chunks. Queries score in numpy over
+    per-term posting arrays kept in an LRU cache, which inserts extend in
+    place, so frequent terms are read from SQLite once per process.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75, cached_terms: int = 20_000):
+        self.k1 = k1
+        self.b = b
+        self.cached_terms = cached_terms
+        self._lock = threading.Lock()
+        # term -> (chunk ids, term frequencies)
+        self._postings: "OrderedDict[str, Tuple[np.ndarray, np.ndarray]]" = OrderedDict()
+        # Token count per chunk id (0 for ids without a document); None until first query
+        self._lengths: Optional[np.ndarray] = None
+        self._documents = 0
+        # Bumped by every applied insert: a posting list read before it is not cached
+        self._generation = 0
+
+    def init_schema(self, conn: sqlite3.Connection) -> None:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS bm25_postings (
+                term TEXT NOT NULL,
+                chunk_id INTEGER NOT NULL,
+                tf INTEGER NOT NULL,
+                PRIMARY KEY (term, chunk_id)
+            ) WITHOUT ROWID
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS bm25_docs (
+                chunk_id INTEGER PRIMARY KEY,
+                length INTEGER NOT NULL
+            )
+        """)
+        # Stores created before the lexical index: index every chunk once
+        missing = conn.execute(
+            "SELECT c.id, c.content FROM chunks c LEFT JOIN bm25_docs d ON d.chunk_id = c.id WHERE d.chunk_id IS NULL"
+        ).fetchall()
+        if missing:
+            self.add(conn, missing)
+            # Nothing is cached before the first query; drop anything that was anyway
+            with self._lock:
+                self._postings.clear()
+                self._lengths = None
+
+    def add(self, conn: sqlite3.Connection, chunks: Iterable[Tuple[int, str]]) -> Tuple[list, list]:
+        """
+        Index new chunks inside the caller's transaction. Returns the update to
+        pass to `apply` once that transaction committed.
+        """
+        docs, postings = [], []
+        for chunk_id, text in chunks:
+            counts = Counter(tokenize(text))
+            docs.append((chunk_id, sum(counts.values())))
+            postings.extend((term, chunk_id, tf) for term, tf in counts.items())
+        conn.executemany("INSERT OR REPLACE INTO bm25_docs (chunk_id, length) VALUES (?, ?)", docs)
+        conn.executemany("INSERT OR REPLACE INTO bm25_postings (term, chunk_id, tf) VALUES (?, ?, ?)", postings)
+        return docs, postings
+
+    def apply(self, update: Tuple[list, list]) -> None:
+        """
+        Extend the cached lengths and posting lists with a committed `add`.
+        Postings a query already read from the committed store are not added twice.
+        """
+        docs, postings = update
+        if not docs:
+            return
+        with self._lock:
+            self._generation += 1
+            if self._lengths is not None and docs:
+                top = max(chunk_id for chunk_id, _ in docs)
+                if top >= len(self._lengths):
+                    self._lengths = np.concatenate([self._lengths, np.zeros(top + 1 - len(self._lengths))])
+                for chunk_id, length in docs:
+                    self._documents += int(self._lengths[chunk_id] == 0)
+                    self._lengths[chunk_id] = length
+            added: Dict[str, List[Tuple[int, int]]] = {}
+            for term, chunk_id, tf in postings:
+                if term in self._postings:
+                    added.setdefault(term, []).append((chunk_id, tf))
+            for term, pairs in added.items():
+                ids, tfs = self._postings[term]
+                new_ids = np.array([c for c, _ in pairs], dtype=np.int64)
+                fresh = ~np.isin(new_ids, ids)
+                if fresh.any():
+                    self._postings[term] = (
+                        np.concatenate([ids, new_ids[fresh]]),
+                        np.concatenate([tfs, np.array([t for _, t in pairs], dtype=np.float64)[fresh]]),
+                    )
+
+    def search(self, conn: sqlite3.Connection, question: str, scope_ids: Optional[np.ndarray],
+               limit: int) -> List[Tuple[int, float]]:
+        """
+        Top `limit` (chunk_id, score) for the question, best first. Document
+        frequencies are corpus-wide; `scope_ids` (sorted) restricts the
+        chunks that can be returned, None allows all.
+        """
+        terms = sorted(set(tokenize(question)))
+        if not terms or limit <= 0:
+            return []
+        lengths, documents = self._doc_lengths(conn)
+        if not documents:
+            return []
+        avg_length = float(lengths.sum()) / documents
+
+        ids_parts, contrib_parts = [], []
+        for term in terms:
+            chunk_ids, tf = self._term_postings(conn, term)
+            if len(chunk_ids) and chunk_ids.max() >= len(lengths):
+                # Read from a commit whose insert is not applied to the lengths yet
+                known = chunk_ids < len(lengths)
+                chunk_ids, tf = chunk_ids[known], tf[known]
+            if not len(chunk_ids):
+                continue
+            df = len(chunk_ids)
+            idf = math.log(1 + (documents - df + 0.5) / (df + 0.5))
+            norm = self.k1 * (1 - self.b + self.b * lengths[chunk_ids] / avg_length)
+            ids_parts.append(chunk_ids)
+            contrib_parts.append(idf * tf * (self.k1 + 1) / (tf + norm))
+        if not ids_parts:
+            return []
+
+        # Dense accumulator over chunk ids: cheaper than grouping the postings
+        scores = np.bincount(np.concatenate(ids_parts), weights=np.concatenate(contrib_parts), minlength=len(lengths))
+        candidates = np.flatnonzero(scores)
+        if scope_ids is not None and len(candidates):
+            # Scope ids are sorted, so membership is a binary search
+            positions = np.clip(np.searchsorted(scope_ids, candidates), 0, max(0, len(scope_ids) - 1))
+            candidates = candidates[scope_ids[positions] == candidates] if len(scope_ids) else candidates[:0]
+        if not len(candidates):
+            return []
+        scores = scores[candidates]
+        if len(scores) > limit:
+            top = np.argpartition(-scores, limit - 1)[:limit]
+            top = top[np.argsort(-scores[top])]
+        else:
+            top = np.argsort(-scores)
+        return [(int(candidates[i]), float(scores[i])) for i in top]
+
+    def _term_postings(self, conn: sqlite3.Connection, term: str) -> Tuple[np.ndarray, np.ndarray]:
+        with self._lock:
+            cached = self._postings.get(term)
+            if cached is not None:
+                self._postings.move_to_end(term)
+                return cached
+            generation = self._generation
+        rows = conn.execute("SELECT chunk_id, tf FROM bm25_postings WHERE term = ?", (term,)).fetchall()
+        postings = (
+            np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows)),
+            np.fromiter((r[1] for r in rows), dtype=np.float64, count=len(rows)),
+        )
+        with self._lock:
+            # An insert applied meanwhile may have committed after this read
+            if generation != self._generation:
+                return postings
+            self._postings[term] = postings
+            while len(self._postings) > self.cached_terms:
+                self._postings.popitem(last=False)
+        return postings
+
+    def _doc_lengths(self, conn: sqlite3.Connection) -> Tuple[np.ndarray, int]:
+        with self._lock:
+            if self._lengths is None:
+                rows = conn.execute("SELECT chunk_id, length FROM bm25_docs").fetchall()
+                lengths = np.zeros(max((r[0] for r in rows), default=0) + 1, dtype=np.float64)
+                for chunk_id, length in rows:
+                    lengths[chunk_id] = length
+                self._lengths, self._documents = lengths, len(rows)
+            return self._lengths, self._documents
+
+
+def reciprocal_rank_fusion(rankings: Iterable[List[int]], k: int = 60) -> Dict[int, float]:
+    """RRF score per id: the sum over rankings of 1 / (k + rank), ranks starting at 1"""
+    fused: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, 1):
+            fused[item] = fused.get(item, 0.0) + 1.0 / (k + rank)
+    return fused
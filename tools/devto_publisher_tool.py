@@ -1,11 +1,12 @@
 # tools/devto_publisher_tool.py
 import os
 import json
-import requests
 from typing import Optional
 from crewai.tools import BaseTool
 from pydantic import Field
 from dotenv import load_dotenv
+from utils import http_client
+from utils.tracing import span, traced
 load_dotenv()
 
 class DevToPublisherTool(BaseTool):
@@ -13,11 +14,14 @@ class DevToPublisherTool(BaseTool):
     description: str = "Publish blog posts directly to Dev.to platform"
     
     api_key: Optional[str] = Field(default=None, exclude=True)
+    api_base: str = Field(default="https://dev.to/api", exclude=True)
     
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.api_key = os.getenv('DEVTO_API_KEY')
+        self.api_base = os.getenv('DEVTO_API_BASE', self.api_base)
     
+    @traced("tool:Dev.to Publisher", "tool")
     def _run(self, markdown_content: str, published: bool = True) -> str:
         """
         Publish markdown content to Dev.to - Simple approach
@@ -51,15 +55,18 @@ class DevToPublisherTool(BaseTool):
                 article_data['article']['main_image'] = cover_image
             
             # Publish to Dev.to
-            response = requests.post(
-                "https://dev.to/api/articles",
-                headers={
-                    "api-key": self.api_key,
-                    "Content-Type": "application/json"
-                },
-                json=article_data,
-                timeout=30
-            )
+            with span("devto_publish", "http", url=f"{self.api_base}/articles", chars=len(clean_content)) as s:
+                # Retried only on 429, so an article is never created twice
+                response = http_client.post(
+                    f"{self.api_base}/articles",
+                    headers={
+                        "api-key": self.api_key,
+                        "Content-Type": "application/json"
+                    },
+                    json=article_data,
+                    timeout=30
+                )
+                s.set(status=response.status_code)
             
             if response.status_code == 201:
                 article = response.json()
@@ -130,5 +137,9 @@ class DevToPublisherTool(BaseTool):
                 return parts[2].strip()  # Return content after frontmatter
         return content
 
-# Create tool instance
-devto_publisher_tool = DevToPublisherTool()
+def __getattr__(name: str):
+    # Lazy module attribute: the shared instance is built by the registry on first use
+    if name == "devto_publisher_tool":
+        from utils.registry import registry
+        return registry.get("devto_publisher_tool")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
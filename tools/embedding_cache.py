@@ -0,0 +1,139 @@
+# tools/embedding_cache.py
+"""
+Persistent embedding cache.
+Vectors are keyed by (model name, chunker settings, chunk hash) and stored
+compactly in a local SQLite file, so re-indexing or rebuilding a collection
+only embeds chunks that were never seen before.
+"""
+
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from contextlib import contextmanager
+from typing import Dict, List
+
+import numpy as np
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "agentic-rag", "embeddings.db")
+
+
+class EmbeddingCache:
+    """Size-bounded LRU cache of embedding vectors on local disk"""
+
+    def __init__(self, model_name: str, settings: str = "", path: str = None,
+                 max_bytes: int = 512 * 1024 * 1024, dtype: str = "float16"):
+        if dtype not in ("float16", "float32"):
+            raise ValueError(f"Unsupported cache dtype: {dtype}")
+        self.path = path or os.getenv("EMBEDDING_CACHE_PATH", DEFAULT_CACHE_PATH)
+        self.max_bytes = max_bytes
+        self.dtype = dtype
+        # Every key is scoped to the model and chunker that produced the vector
+        self._scope = f"{model_name}|{settings}"
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        cache_dir = os.path.dirname(self.path)
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    key TEXT PRIMARY KEY,
+                    dim INTEGER NOT NULL,
+                    dtype TEXT NOT NULL,
+                    vector BLOB NOT NULL,
+                    nbytes INTEGER NOT NULL,
+                    last_used REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_lru ON embeddings (last_used)")
+
+    def key(self, chunk_hash: str) -> str:
+        return hashlib.sha256(f"{self._scope}|{chunk_hash}".encode("utf-8")).hexdigest()
+
+    def get_many(self, chunk_hashes: List[str]) -> Dict[str, np.ndarray]:
+        """Return cached float32 vectors for the hashes that are present"""
+        keys = {self.key(h): h for h in chunk_hashes}
+        found: Dict[str, np.ndarray] = {}
+        key_list = list(keys)
+        with self._connect() as conn:
+            for start in range(0, len(key_list), 500):
+                batch = key_list[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                for key, dtype, blob in conn.execute(
+                    f"SELECT key, dtype, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ):
+                    vector = np.frombuffer(blob, dtype=dtype).astype(np.float32)
+                    norm = np.linalg.norm(vector)
+                    # float16 storage loses a little precision; keep unit length for cosine scores
+                    found[keys[key]] = vector / norm if norm else vector
+            if found:
+                now = time.time()
+                conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                    [(now, self.key(h)) for h in found],
+                )
+
+        with self._lock:
+            self.hits += len(found)
+            self.misses += len(set(chunk_hashes)) - len(found)
+        return found
+
+    def put_many(self, vectors: Dict[str, np.ndarray]) -> None:
+        """Store vectors by chunk hash, then evict least recently used entries over the size limit"""
+        if not vectors:
+            return
+        now = time.time()
+        rows = []
+        for chunk_hash, vector in vectors.items():
+            blob = np.asarray(vector, dtype=self.dtype).tobytes()
+            rows.append((self.key(chunk_hash), len(vector), self.dtype, blob, len(blob), now))
+
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, dim, dtype, vector, nbytes, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._evict(conn)
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        total = conn.execute("SELECT COALESCE(SUM(nbytes), 0) FROM embeddings").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Trim to 90% so we do not evict again on the very next insert
+        target = int(self.max_bytes * 0.9)
+        to_delete = []
+        for key, nbytes in conn.execute("SELECT key, nbytes FROM embeddings ORDER BY last_used"):
+            if total <= target:
+                break
+            to_delete.append((key,))
+            total -= nbytes
+        conn.executemany("DELETE FROM embeddings WHERE key = ?", to_delete)
+
+    def stats(self) -> Dict[str, float]:
+        with self._connect() as conn:
+            entries, size = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(nbytes), 0) FROM embeddings"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "entries": entries,
+            "size_mb": round(size / (1024 * 1024), 2),
+            "max_mb": round(self.max_bytes / (1024 * 1024), 2),
+        }
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
@@ -1,15 +1,21 @@
 # tools/image_search_tool.py
 import os
 import json
-import requests
 import random
 import time
-from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
 from crewai.tools import BaseTool
-from pydantic import Field
+from pydantic import Field, PrivateAttr
 from dotenv import load_dotenv
+from utils import http_client
+from utils.cache import PersistentCache, cache_key
+from utils.tracing import span, traced, propagate
 load_dotenv()
 
+# Photo fields kept in the metadata cache (plus src.large2x)
+PHOTO_FIELDS = ('id', 'width', 'height', 'url', 'photographer', 'photographer_url', 'alt')
+
 class PexelsCoverImageTool(BaseTool):
     name: str = "Dev.to Cover Image Finder"
     description: str = "Find perfect cover images from Google DeepMind profile with smart fallback"
@@ -18,13 +24,27 @@ class PexelsCoverImageTool(BaseTool):
     base_url: Optional[str] = Field(default=None, exclude=True)
     deepmind_queries: Optional[list] = Field(default=None, exclude=True)
     fallback_queries: Optional[list] = Field(default=None, exclude=True)
+    # Send all candidate queries at once instead of one after another
+    parallel_search: bool = Field(default=True, exclude=True)
+    # Fixed seed -> the same queries, pages and photo for a topic on every run
+    selection_seed: Optional[int] = Field(default=None, exclude=True)
+    use_photo_cache: bool = Field(default=True, exclude=True)
+    photo_cache_ttl_hours: float = Field(default_factory=lambda: float(os.getenv("PEXELS_CACHE_TTL_HOURS", 7 * 24)),
+                                         exclude=True)
+    _photo_cache: Optional[PersistentCache] = PrivateAttr(default=None)
     
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.api_key = os.getenv('PEXELS_API_KEY')
         if not self.api_key:
             raise ValueError("PEXELS_API_KEY environment variable is required")
-        self.base_url = "https://api.pexels.com/v1"
+        # Overridable so benchmarks can point the tool at a local stand-in
+        self.base_url = os.getenv("PEXELS_API_BASE", "https://api.pexels.com/v1")
+        if self.selection_seed is None and os.getenv("PEXELS_SELECTION_SEED"):
+            self.selection_seed = int(os.getenv("PEXELS_SELECTION_SEED"))
+        if self.use_photo_cache:
+            # Photo metadata rarely changes; stale entries are refreshed in the background for another 30 days
+            self._photo_cache = PersistentCache("pexels_search", self.photo_cache_ttl_hours * 3600, 30 * 24 * 3600)
         
         # Queries most likely to return Google DeepMind photos
         self.deepmind_queries = [
@@ -45,6 +65,7 @@ class PexelsCoverImageTool(BaseTool):
             "software development"
         ]
     
+    @traced("tool:Dev.to Cover Image Finder", "tool")
     def _run(self, topic: str, attempts: int = 2) -> str:
         """
         Search strategy:
@@ -52,132 +73,140 @@ class PexelsCoverImageTool(BaseTool):
         2. Filter results for Google DeepMind photographer
         3. Randomize selection from Google DeepMind results
         4. Fallback to general tech if needed
+        With parallel_search every candidate query is sent at once and the
+        first suitable photo in this priority order wins.
         """
-        
-        # PRIORITY 1: Search Google DeepMind specific queries
-        deepmind_result = self._search_deepmind_photos(topic)
-        if deepmind_result:
-            return json.dumps({
-                'success': True,
-                'cover_image': deepmind_result,
-                'message': f"Found Google DeepMind cover image for '{topic}'"
-            }, indent=2)
-        
-        # PRIORITY 2: General search with DeepMind filtering
-        general_result = self._search_with_deepmind_filter(topic)
-        if general_result:
+        # Seeded selection picks the same queries, pages and photos on every run,
+        # so the cached search results are reused
+        rng = random.Random(f"{self.selection_seed}:{topic}") if self.selection_seed is not None else random.Random()
+        candidates = self._candidate_searches(topic, attempts, rng)
+
+        if self.parallel_search:
+            found = self._first_suitable_parallel(candidates, rng)
+        else:
+            found = self._first_suitable_sequential(candidates, rng)
+
+        if found:
+            cover_image, message = found
             return json.dumps({
                 'success': True,
-                'cover_image': general_result,
-                'message': f"Found tech cover image for '{topic}'"
+                'cover_image': cover_image,
+                'message': message
             }, indent=2)
         
-        # PRIORITY 3: Fallback to broader tech search
-        if attempts >= 2:
-            fallback_query = random.choice(self.fallback_queries)
-            fallback_result = self._search_with_deepmind_filter(fallback_query)
-            if fallback_result:
-                return json.dumps({
-                    'success': True,
-                    'cover_image': fallback_result,
-                    'message': f"Found fallback tech cover image: '{fallback_query}'"
-                }, indent=2)
-        
         return json.dumps({
             'success': False,
             'error': f"No suitable cover image found after {attempts} attempts",
             'topic': topic
         })
-    
-    def _search_deepmind_photos(self, topic: str) -> Optional[dict]:
-        """Specifically search for Google DeepMind photos"""
-        
-        # Try multiple DeepMind-focused queries
+
+    def _candidate_searches(self, topic: str, attempts: int, rng: random.Random) -> List[Dict[str, Any]]:
+        """Every search `_run` may make, in priority order"""
+        # PRIORITY 1: Google DeepMind specific queries (top 3 in randomized order)
         queries_to_try = self.deepmind_queries.copy()
-        random.shuffle(queries_to_try)  # Randomize order of queries
-        
-        for query in queries_to_try[:3]:  # Try top 3 randomized queries
-            try:
-                url = f"{self.base_url}/search"
-                headers = {"Authorization": self.api_key}
-                params = {
-                    "query": query,
-                    "per_page": 50,  # Get many results to filter from
-                    "orientation": "landscape"
-                }
-                
-                response = requests.get(url, headers=headers, params=params, timeout=10)
-                response.raise_for_status()
-                data = response.json()
-                
-                photos = data.get('photos', [])
-                
-                # Filter for Google DeepMind photographer
-                deepmind_photos = [
-                    photo for photo in photos 
-                    if 'google deepmind' in photo.get('photographer', '').lower() or
-                       'deepmind' in photo.get('photographer', '').lower()
-                ]
-                
-                if deepmind_photos:
-                    # Randomize selection from available Google DeepMind photos
-                    random.shuffle(deepmind_photos)
-                    
-                    # Try to find suitable dimensions from randomized list
-                    for photo in deepmind_photos[:10]:  # Check up to 10 random photos
-                        result = self._check_image_suitability(photo, query, is_deepmind=True)
-                        if result:
-                            return result
-                
-            except Exception as e:
-                print(f"Error searching DeepMind photos: {e}")
-                continue
-        
+        rng.shuffle(queries_to_try)
+        candidates = [
+            {'query': query, 'per_page': 50, 'page': 1, 'deepmind_only': True,
+             'message': f"Found Google DeepMind cover image for '{topic}'"}
+            for query in queries_to_try[:3]
+        ]
+
+        # PRIORITY 2: General search with DeepMind filtering (light randomization - early pages only)
+        candidates.append({'query': topic, 'per_page': 40, 'page': rng.randint(1, 3), 'deepmind_only': False,
+                           'message': f"Found tech cover image for '{topic}'"})
+
+        # PRIORITY 3: Fallback to broader tech search
+        if attempts >= 2:
+            fallback_query = rng.choice(self.fallback_queries)
+            candidates.append({'query': fallback_query, 'per_page': 40, 'page': rng.randint(1, 3),
+                               'deepmind_only': False,
+                               'message': f"Found fallback tech cover image: '{fallback_query}'"})
+        return candidates
+
+    def _first_suitable_sequential(self, candidates: List[Dict[str, Any]], rng: random.Random) -> Optional[tuple]:
+        for candidate in candidates:
+            photos = self._search_photos(candidate)
+            result = self._select_photo(photos, candidate, rng) if photos else None
+            if result:
+                return result, candidate['message']
         return None
-    
-    def _search_with_deepmind_filter(self, query: str) -> Optional[dict]:
-        """Search general query but prefer Google DeepMind results"""
+
+    def _first_suitable_parallel(self, candidates: List[Dict[str, Any]], rng: random.Random) -> Optional[tuple]:
+        """Run all candidate searches concurrently; stop at the first suitable one in priority order"""
+        pool = ThreadPoolExecutor(max_workers=len(candidates), thread_name_prefix="pexels")
+        try:
+            futures = [pool.submit(propagate(self._search_photos), candidate) for candidate in candidates]
+            for candidate, future in zip(candidates, futures):
+                photos = future.result()
+                result = self._select_photo(photos, candidate, rng) if photos else None
+                if result:
+                    return result, candidate['message']
+            return None
+        finally:
+            # Lower-priority searches still in flight are not waited for
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def _search_photos(self, candidate: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Photo metadata for one search, from the cache when possible; [] on errors"""
+        params = {
+            "query": candidate['query'],
+            "per_page": candidate['per_page'],
+            "orientation": "landscape",
+            "page": candidate['page']
+        }
         try:
-            url = f"{self.base_url}/search"
-            headers = {"Authorization": self.api_key}
-            params = {
-                "query": query,
-                "per_page": 40,
-                "orientation": "landscape",
-                "page": random.randint(1, 3)  # Light randomization - early pages only
-            }
-            
-            response = requests.get(url, headers=headers, params=params, timeout=10)
+            if self._photo_cache is None:
+                return self._fetch_photos(params)
+            key = cache_key(params['query'], params['per_page'], params['orientation'], params['page'])
+            return self._photo_cache.get_or_fetch(key, lambda: self._fetch_photos(params))
+        except Exception as e:
+            print(f"Error searching Pexels for '{candidate['query']}': {e}")
+            return []
+
+    def _fetch_photos(self, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        url = f"{self.base_url}/search"
+        headers = {"Authorization": self.api_key}
+        with span("pexels_search", "http", query=params['query']) as s:
+            response = http_client.get(url, headers=headers, params=params, timeout=10)
             response.raise_for_status()
             data = response.json()
-            
-            photos = data.get('photos', [])
-            if not photos:
-                return None
-            
-            # First check for Google DeepMind photos
-            deepmind_photos = [
-                photo for photo in photos 
-                if 'google deepmind' in photo.get('photographer', '').lower() or
-                   'deepmind' in photo.get('photographer', '').lower()
-            ]
-            
-            # Prefer DeepMind photos, fallback to general
-            candidates = deepmind_photos if deepmind_photos else photos
-            random.shuffle(candidates)  # Randomize selection
-            
-            # Try to find suitable image from candidates
-            for photo in candidates[:8]:  # Check up to 8 candidates
-                is_deepmind = photo in deepmind_photos if deepmind_photos else False
-                result = self._check_image_suitability(photo, query, is_deepmind=is_deepmind)
+            s.set(status=response.status_code, photos=len(data.get('photos', [])))
+        # Keep only the fields a cover image needs, so cached entries stay small
+        photos = []
+        for photo in data.get('photos', []):
+            slim = {field: photo.get(field) for field in PHOTO_FIELDS}
+            slim['src'] = {'large2x': photo['src']['large2x']}
+            photos.append(slim)
+        return photos
+
+    def _select_photo(self, photos: List[Dict[str, Any]], candidate: Dict[str, Any],
+                      rng: random.Random) -> Optional[dict]:
+        """Pick a suitable photo from one search, preferring Google DeepMind photos"""
+        query = candidate['query']
+        # Filter for Google DeepMind photographer
+        deepmind_photos = [
+            photo for photo in photos
+            if 'google deepmind' in (photo.get('photographer') or '').lower() or
+               'deepmind' in (photo.get('photographer') or '').lower()
+        ]
+
+        if candidate['deepmind_only']:
+            # Randomize selection from available Google DeepMind photos
+            rng.shuffle(deepmind_photos)
+            for photo in deepmind_photos[:10]:  # Check up to 10 random photos
+                result = self._check_image_suitability(photo, query, is_deepmind=True)
                 if result:
                     return result
-            
-            return None
-            
-        except Exception as e:
-            print(f"Error in general search: {e}")
             return None
+
+        # Prefer DeepMind photos, fallback to general
+        candidates = deepmind_photos if deepmind_photos else list(photos)
+        rng.shuffle(candidates)  # Randomize selection
+        for photo in candidates[:8]:  # Check up to 8 candidates
+            result = self._check_image_suitability(photo, query, is_deepmind=bool(deepmind_photos))
+            if result:
+                return result
+        return None
     
     def _check_image_suitability(self, photo: dict, search_query: str, is_deepmind: bool = False) -> Optional[dict]:
         """Check if image meets requirements"""
@@ -207,5 +236,9 @@ class PexelsCoverImageTool(BaseTool):
         
         return None
 
-# Create the tool instance
-pexels_cover_tool = PexelsCoverImageTool()
+def __getattr__(name: str):
+    # Lazy module attribute: the shared instance is built by the registry on first use
+    if name == "pexels_cover_tool":
+        from utils.registry import registry
+        return registry.get("pexels_cover_tool")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
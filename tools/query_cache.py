@@ -0,0 +1,201 @@
+# tools/query_cache.py
+"""
+Semantic cache for RAG query results.
+Answers exact repeats of a question, and questions whose embedding is close
+enough to a cached one, without searching the store again. Entries live in
+the RAG SQLite file so they survive across runs; they expire after a TTL,
+are evicted least-recently-used, and are dropped for a namespace whenever new
+content is ingested into it.
+"""
+
+import re
+import json
+import time
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+
+def normalize_question(question: str) -> str:
+    """Lowercase, collapse whitespace and drop trailing punctuation"""
+    return re.sub(r"\s+", " ", question).strip().lower().rstrip("?!. ")
+
+
+def scope_key(namespaces: Iterable[str]) -> str:
+    """Stable key for a search scope, e.g. '|topic-a|topic-b|'"""
+    return "|" + "|".join(sorted(set(namespaces))) + "|"
+
+
+class QueryCache:
+    """Exact + embedding-similarity cache of query results, persisted in SQLite"""
+
+    def __init__(self, db_path: str, similarity_threshold: float = 0.95,
+                 ttl_seconds: float = 24 * 3600, max_entries: int = 2000):
+        self.db_path = db_path
+        self.similarity_threshold = similarity_threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        # Guards the counters and `_vectors`. Writes drop vectors only after their
+        # SQLite change committed, so a concurrent load can re-cache at most fresh rows
+        self._lock = threading.Lock()
+        # (scope, params) -> (entry ids, query vectors), loaded on first semantic lookup
+        self._vectors: Dict[Tuple[str, str], Tuple[np.ndarray, np.ndarray]] = {}
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS query_cache (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    scope TEXT NOT NULL,
+                    params TEXT NOT NULL,
+                    question TEXT NOT NULL,
+                    embedding BLOB NOT NULL,
+                    result TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used REAL NOT NULL,
+                    UNIQUE (scope, params, question)
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_query_cache_lru ON query_cache (last_used)")
+
+    def get_exact(self, scope: str, params: str, question: str) -> Optional[Any]:
+        """Cached result for the same normalized question, or None"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT id, result, created_at FROM query_cache WHERE scope = ? AND params = ? AND question = ?",
+                (scope, params, normalize_question(question)),
+            ).fetchone()
+            result, expired = self._use(conn, row)
+        with self._lock:
+            if expired:
+                self._vectors.clear()
+            if result is not None:
+                self.exact_hits += 1
+        return result
+
+    def get_similar(self, scope: str, params: str, vector: np.ndarray) -> Optional[Any]:
+        """
+        Cached result for the most similar earlier question in the same scope,
+        if its cosine similarity reaches the threshold. Counts a miss otherwise.
+        """
+        ids, matrix = self._load_vectors(scope, params)
+        result, expired = None, False
+        if len(ids):
+            scores = matrix @ vector
+            best = int(np.argmax(scores))
+            if scores[best] >= self.similarity_threshold:
+                with self._connect() as conn:
+                    row = conn.execute(
+                        "SELECT id, result, created_at FROM query_cache WHERE id = ?", (int(ids[best]),)
+                    ).fetchone()
+                    result, expired = self._use(conn, row)
+
+        with self._lock:
+            if expired:
+                self._vectors.clear()
+            if result is None:
+                self.misses += 1
+            else:
+                self.semantic_hits += 1
+        return result
+
+    def put(self, scope: str, params: str, question: str, vector: np.ndarray, result: Any) -> None:
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO query_cache "
+                "(scope, params, question, embedding, result, created_at, last_used) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (scope, params, normalize_question(question), np.asarray(vector, dtype=np.float32).tobytes(),
+                 json.dumps(result), now, now),
+            )
+            evicted = self._evict(conn, now)
+        with self._lock:
+            if evicted:
+                self._vectors.clear()
+            else:
+                self._vectors.pop((scope, params), None)
+
+    def invalidate(self, namespace: str) -> None:
+        """Drop cached results for every scope that searches `namespace`"""
+        with self._connect() as conn:
+            # instr() is an exact, case-sensitive substring match: LIKE would treat
+            # '_' and '%' in namespace names as wildcards and ignore case
+            conn.execute(
+                "DELETE FROM query_cache WHERE instr(scope, ?) > 0 OR scope = ?",
+                (f"|{namespace}|", scope_key(["*"])),
+            )
+        with self._lock:
+            self._vectors.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._connect() as conn:
+            entries = conn.execute("SELECT COUNT(*) FROM query_cache").fetchone()[0]
+        lookups = self.exact_hits + self.semantic_hits + self.misses
+        hits = self.exact_hits + self.semantic_hits
+        return {
+            "exact_hits": self.exact_hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+            "entries": entries,
+        }
+
+    def _use(self, conn: sqlite3.Connection, row: Optional[tuple]) -> Tuple[Optional[Any], bool]:
+        """
+        (result, expired) for a row, bumping its LRU timestamp. Expired rows are
+        deleted; the caller drops the in-memory vectors once that committed.
+        """
+        if row is None:
+            return None, False
+        entry_id, result, created_at = row
+        now = time.time()
+        if now - created_at > self.ttl_seconds:
+            conn.execute("DELETE FROM query_cache WHERE id = ?", (entry_id,))
+            return None, True
+        conn.execute("UPDATE query_cache SET last_used = ? WHERE id = ?", (now, entry_id))
+        return json.loads(result), False
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> bool:
+        """Delete expired and least recently used rows; True if any were deleted"""
+        deleted = conn.execute("DELETE FROM query_cache WHERE created_at < ?", (now - self.ttl_seconds,)).rowcount
+        overflow = conn.execute("SELECT COUNT(*) FROM query_cache").fetchone()[0] - self.max_entries
+        if overflow > 0:
+            deleted += conn.execute(
+                "DELETE FROM query_cache WHERE id IN (SELECT id FROM query_cache ORDER BY last_used LIMIT ?)",
+                (overflow,),
+            ).rowcount
+        return deleted > 0
+
+    def _load_vectors(self, scope: str, params: str) -> Tuple[np.ndarray, np.ndarray]:
+        key = (scope, params)
+        with self._lock:
+            cached = self._vectors.get(key)
+            if cached is not None:
+                return cached
+            # Read under the lock, so a write that commits meanwhile clears this load afterwards
+            with self._connect() as conn:
+                rows = conn.execute(
+                    "SELECT id, embedding FROM query_cache WHERE scope = ? AND params = ? AND created_at >= ?",
+                    (scope, params, time.time() - self.ttl_seconds),
+                ).fetchall()
+            ids = np.array([r[0] for r in rows], dtype=np.int64)
+            matrix = (
+                np.vstack([np.frombuffer(r[1], dtype=np.float32) for r in rows])
+                if rows else np.zeros((0, 0), dtype=np.float32)
+            )
+            cached = self._vectors[key] = (ids, matrix)
+            return cached
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
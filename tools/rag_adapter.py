@@ -0,0 +1,1033 @@
+# tools/rag_adapter.py
+"""
+Local RAG adapter for the shared RagTool.
+Chunks sources, embeds them with a sentence-transformers model in fixed-size
+batches and keeps chunks + vectors in a SQLite file next to the outputs.
+Already-ingested URLs and chunks are skipped using a persistent dedup index,
+and vectors come from the on-disk embedding cache whenever possible.
+
+Chunks are stored once and linked into namespaces (one per topic/run);
+queries only search the active namespace unless asked to look wider.
+Searches fuse the dense ranking with a BM25 ranking over the same chunks
+(see tools/bm25_index.py) by reciprocal rank fusion; large scopes can use
+an approximate IVF index with int8 vectors instead of exact dense search
+(see tools/ann_index.py). Query results are compressed before they reach the agents (see
+tools/rag_compression.py).
+"""
+
+import os
+import re
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+import numpy as np
+from pydantic import PrivateAttr
+from crewai_tools.tools.rag.rag_tool import Adapter
+from tools.web_loader import fetch_page_text
+from tools.embedding_cache import EmbeddingCache
+from tools.query_cache import QueryCache, scope_key
+from tools.bm25_index import Bm25Index, reciprocal_rank_fusion, tokenize
+from tools.ann_index import IvfIndex, recall_at_k
+from tools.rag_compression import ALL_REPEATED, ContextCompressor
+from utils.ledger import active_caller, active_run_id
+from utils.registry import registry
+from utils.tracing import span
+
+SourceItem = Union[str, Dict[str, Any]]
+
+DEFAULT_DB_PATH = "output/rag/knowledge_base.db"
+
+DEFAULT_NAMESPACE = "default"
+ALL_NAMESPACES = "*"
+
+# (namespace written to, namespaces searched) for the current flow/thread
+_active_scope: ContextVar[Optional[Tuple[str, Tuple[str, ...]]]] = ContextVar("rag_scope", default=None)
+
+# Query parameters that only track the visit and never change the page
+TRACKING_PARAMS = ("utm_", "fbclid", "gclid", "mc_cid", "mc_eid", "ref", "ref_src")
+
+
+def normalize_url(url: str) -> str:
+    """Canonical form of a URL used as its dedup key"""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and (scheme, parts.port) not in (("http", 80), ("https", 443)):
+        host = f"{host}:{parts.port}"
+    path = parts.path.rstrip("/") or "/"
+    query = urlencode(sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith(TRACKING_PARAMS)
+    ))
+    return urlunsplit((scheme, host, path, query, ""))
+
+
+def namespace_for(*parts: str) -> str:
+    """Build a namespace like 'gemma-3-270m/20250101-120000' from topic/run parts"""
+    slugs = [re.sub(r"[^a-z0-9]+", "-", str(p).lower()).strip("-") for p in parts if p]
+    return "/".join(s for s in slugs if s) or DEFAULT_NAMESPACE
+
+
+def content_hash(text: str) -> str:
+    """Whitespace-insensitive hash of a chunk"""
+    return hashlib.sha256(re.sub(r"\s+", " ", text).strip().encode("utf-8")).hexdigest()
+
+
+def chunk_text(text: str, chunk_size: int = 1000, chunk_overlap: int = 100) -> List[str]:
+    """
+    Split text into chunks of at most `chunk_size` characters, breaking on
+    sentence/paragraph boundaries where possible and carrying roughly
+    `chunk_overlap` characters of context into the next chunk.
+    """
+    text = text.strip()
+    if not text:
+        return []
+    if len(text) <= chunk_size:
+        return [text]
+
+    pieces: List[str] = []
+    for piece in re.split(r"(?<=[.!?])\s+|\n{2,}", text):
+        piece = piece.strip()
+        # Hard-split pieces that are longer than a chunk on their own
+        while len(piece) > chunk_size:
+            cut = piece.rfind(" ", 0, chunk_size)
+            cut = cut if cut > chunk_size // 2 else chunk_size
+            pieces.append(piece[:cut].strip())
+            piece = piece[cut:].strip()
+        if piece:
+            pieces.append(piece)
+
+    chunks: List[str] = []
+    current = ""
+    for piece in pieces:
+        if current and len(current) + 1 + len(piece) > chunk_size:
+            chunks.append(current)
+            overlap = current[-chunk_overlap:] if chunk_overlap > 0 else ""
+            # Start the overlap on a word boundary
+            if " " in overlap:
+                overlap = overlap.split(" ", 1)[1]
+            if len(overlap) + 1 + len(piece) > chunk_size:
+                overlap = ""
+            current = f"{overlap} {piece}".strip()
+        else:
+            current = f"{current} {piece}".strip()
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def format_timestamp(seconds: float) -> str:
+    minutes, secs = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{secs:02d}" if hours else f"{minutes}:{secs:02d}"
+
+
+def attribution(metadata: Dict[str, Any]) -> str:
+    """'Source: <url> (m:ss-m:ss)' line for timed transcript segments; empty for other chunks"""
+    if metadata.get("start") is None or not metadata.get("video_url"):
+        return ""
+    span_text = format_timestamp(metadata["start"])
+    if metadata.get("end") is not None:
+        span_text += f"-{format_timestamp(metadata['end'])}"
+    return f"Source: {metadata['video_url']} ({span_text})\n"
+
+
+def get_embedding_model(model_name: str):
+    """Shared sentence-transformers model, loaded once per process on first use"""
+    key = f"embedding_model:{model_name}"
+    if key not in registry:
+        def load():
+            from sentence_transformers import SentenceTransformer
+            return SentenceTransformer(model_name)
+        registry.register(key, load)
+    return registry.get(key)
+
+
+class LocalRagAdapter(Adapter):
+    """RagTool adapter backed by sentence-transformers and SQLite"""
+
+    embedding_model: str = "sentence-transformers/all-MiniLM-L6-v2"
+    chunk_size: int = 1000
+    chunk_overlap: int = 100
+    embed_batch_size: int = 64
+    similarity_threshold: float = 0.3
+    limit: int = 5
+    fetch_timeout: float = 15.0
+    db_path: str = DEFAULT_DB_PATH
+    # Persistent embedding cache (None path -> EMBEDDING_CACHE_PATH or ~/.cache)
+    use_embedding_cache: bool = True
+    embedding_cache_path: Optional[str] = None
+    embedding_cache_max_mb: int = 512
+    embedding_cache_dtype: str = "float16"
+    # Semantic query cache: repeats and near-duplicate questions skip the search
+    use_query_cache: bool = True
+    query_cache_threshold: float = 0.95
+    query_cache_ttl_seconds: float = 24 * 3600
+    query_cache_max_entries: int = 2000
+    # Hybrid retrieval: top `fusion_candidates` of the dense and BM25 rankings, fused with RRF
+    hybrid_search: bool = True
+    rrf_k: int = 60
+    fusion_candidates: int = 50
+    # Approximate dense search (IVF over int8 codes, exact re-ranking) for scopes of at least
+    # `ann_min_chunks` chunks; raise ann_nprobe for recall, lower it for latency (see ann_recall)
+    ann_index: bool = False
+    ann_min_chunks: int = 20_000
+    ann_nlist: Optional[int] = None
+    ann_nprobe: int = 16
+    ann_rerank: int = 4
+    # Post-retrieval compression: drop passages already returned in the run, diversify
+    # with MMR over `mmr_candidates` x limit hits, keep the best sentences within the budget
+    compress_results: bool = True
+    compression_token_budget: int = 600
+    mmr_lambda: float = 0.7
+    mmr_candidates: int = 3
+
+    _model: Any = PrivateAttr(default=None)
+    _embedding_cache: Optional[EmbeddingCache] = PrivateAttr(default=None)
+    _query_cache: Optional[QueryCache] = PrivateAttr(default=None)
+    _compressor: Optional[ContextCompressor] = PrivateAttr(default=None)
+    _bm25: Bm25Index = PrivateAttr(default_factory=Bm25Index)
+    # Recent search latencies (seconds) per leg: dense, bm25, fusion
+    _latencies: Dict[str, Any] = PrivateAttr(default_factory=lambda: {
+        leg: deque(maxlen=1000) for leg in ("dense", "bm25", "fusion")
+    })
+    _lock: Any = PrivateAttr(default_factory=threading.RLock)
+    # In-memory (ids, vectors) per search scope, loaded on first query
+    _indexes: Dict[Tuple[str, ...], Tuple[np.ndarray, np.ndarray]] = PrivateAttr(default_factory=dict)
+    # IVF index per large search scope, and scopes with chunks not inserted yet
+    _ann: Dict[Tuple[str, ...], IvfIndex] = PrivateAttr(default_factory=dict)
+    _ann_stale: set = PrivateAttr(default_factory=set)
+
+    def model_post_init(self, __context: Any) -> None:
+        if self.use_embedding_cache:
+            self._embedding_cache = EmbeddingCache(
+                model_name=self.embedding_model,
+                settings=f"chunk_size={self.chunk_size},chunk_overlap={self.chunk_overlap}",
+                path=self.embedding_cache_path,
+                max_bytes=self.embedding_cache_max_mb * 1024 * 1024,
+                dtype=self.embedding_cache_dtype,
+            )
+        db_dir = os.path.dirname(self.db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        with self._connect() as conn:
+            self._init_schema(conn)
+        if self.use_query_cache:
+            self._query_cache = QueryCache(
+                self.db_path,
+                similarity_threshold=self.query_cache_threshold,
+                ttl_seconds=self.query_cache_ttl_seconds,
+                max_entries=self.query_cache_max_entries,
+            )
+        if self.compress_results:
+            self._compressor = ContextCompressor(
+                token_budget=self.compression_token_budget,
+                mmr_lambda=self.mmr_lambda,
+            )
+
+    def _init_schema(self, conn: sqlite3.Connection) -> None:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS chunks (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                source TEXT NOT NULL,
+                data_type TEXT NOT NULL,
+                content TEXT NOT NULL,
+                metadata TEXT NOT NULL DEFAULT '{}',
+                embedding BLOB NOT NULL,
+                created_at REAL NOT NULL
+            )
+        """)
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(chunks)")}
+        if "content_hash" not in columns:
+            conn.execute("ALTER TABLE chunks ADD COLUMN content_hash TEXT")
+            conn.executemany(
+                "UPDATE chunks SET content_hash = ? WHERE id = ?",
+                [(content_hash(text), cid) for cid, text in conn.execute("SELECT id, content FROM chunks")],
+            )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_chunks_hash ON chunks (content_hash)")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS sources (
+                source_key TEXT PRIMARY KEY,
+                source TEXT NOT NULL,
+                data_type TEXT NOT NULL,
+                chunk_count INTEGER NOT NULL,
+                ingested_at REAL NOT NULL
+            )
+        """)
+
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS source_chunks (
+                source_key TEXT NOT NULL,
+                chunk_id INTEGER NOT NULL,
+                PRIMARY KEY (source_key, chunk_id)
+            )
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS chunk_namespaces (
+                namespace TEXT NOT NULL,
+                chunk_id INTEGER NOT NULL,
+                PRIMARY KEY (namespace, chunk_id)
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_chunk_namespaces_chunk ON chunk_namespaces (chunk_id)")
+        if "chunk_namespaces" not in tables:
+            # Stores created before namespaces: everything lives in the default namespace
+            conn.execute("INSERT INTO chunk_namespaces (namespace, chunk_id) SELECT ?, id FROM chunks", (DEFAULT_NAMESPACE,))
+            conn.execute(
+                "INSERT OR IGNORE INTO source_chunks (source_key, chunk_id) "
+                "SELECT s.source_key, c.id FROM sources s JOIN chunks c ON c.source = s.source"
+            )
+
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS ingest_offsets (
+                path TEXT NOT NULL,
+                namespace TEXT NOT NULL,
+                byte_offset INTEGER NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (path, namespace)
+            )
+        """)
+        if "file_offsets" in tables:
+            conn.execute(
+                "INSERT OR IGNORE INTO ingest_offsets (path, namespace, byte_offset, updated_at) "
+                "SELECT path, ?, byte_offset, updated_at FROM file_offsets",
+                (DEFAULT_NAMESPACE,),
+            )
+            conn.execute("DROP TABLE file_offsets")
+        self._bm25.init_schema(conn)
+
+    # ------------------------------------------------------------------ #
+    # Adapter interface
+    # ------------------------------------------------------------------ #
+    def add(self, *args: Any, **kwargs: Any) -> None:
+        """
+        RagTool-compatible add: every positional argument becomes one source
+        sharing `data_type` and `metadata` from kwargs.
+        """
+        data_type = kwargs.get("data_type")
+        metadata = kwargs.get("metadata") or {}
+        stats = self.add_many([
+            {"source": arg, "data_type": data_type, "metadata": metadata} for arg in args
+        ])
+        failed = [r for r in stats["results"] if r["status"] == "failed"]
+        if failed:
+            raise ValueError("; ".join(f"{r['source']}: {r['error']}" for r in failed))
+
+    def query(self, question: str, similarity_threshold: Optional[float] = None, limit: Optional[int] = None) -> str:
+        threshold = self.similarity_threshold if similarity_threshold is None else similarity_threshold
+        top_k = self.limit if limit is None else limit
+        # Over-fetch so diversification has alternatives to repeated or redundant chunks
+        candidates = top_k * self.mmr_candidates if self._compressor is not None else top_k
+
+        with span("rag_query", "rag", question=question[:200], scope=scope_key(self.search_scope), limit=top_k) as s:
+            hits, query_vec = self._retrieve(question, candidates, threshold, s)
+            if self._compressor is None or not hits:
+                return self._format_hits(hits[:top_k])
+            return self._compress(hits, top_k, query_vec, question, s)
+
+    def _retrieve(self, question: str, limit: int, threshold: float,
+                  s: Any) -> Tuple[List[Dict[str, Any]], Optional[np.ndarray]]:
+        """Search hits for a question, through the query cache; the query vector is None on an exact cache hit"""
+        cache = self._query_cache
+        if cache is None:
+            query_vec = self._embed([question])[0]
+            return self.search(question, limit=limit, similarity_threshold=threshold, query_vector=query_vec), query_vec
+
+        scope = scope_key(self.search_scope)
+        params = f"limit={limit},threshold={threshold},hits{',hybrid' if self.hybrid_search else ''}"
+        cached = cache.get_exact(scope, params, question)
+        if cached is not None:
+            s.set(cache="exact")
+            return cached, None
+
+        query_vec = self._embed([question])[0]
+        cached = cache.get_similar(scope, params, query_vec)
+        if cached is not None:
+            s.set(cache="semantic")
+            return cached, query_vec
+
+        s.set(cache="miss")
+        hits = self.search(question, limit=limit, similarity_threshold=threshold, query_vector=query_vec)
+        cache.put(scope, params, question, query_vec, hits)
+        return hits, query_vec
+
+    def _compress(self, hits: List[Dict[str, Any]], top_k: int, query_vec: Optional[np.ndarray],
+                  question: str, s: Any) -> str:
+        """Format hits after per-task dedupe, MMR and sentence selection; tokens saved go to the ledger"""
+        if query_vec is None:
+            query_vec = self._embed([question])[0]
+        run_key = self._history_key()
+        relevance = None
+        if all("fused" in hit for hit in hits):
+            # Rank by the fused score, so chunks found only by BM25 are not demoted again
+            fused = np.array([hit["fused"] for hit in hits], dtype=np.float32)
+            relevance = fused / fused.max()
+        kept, repeated = self._compressor.compress(
+            hits, self._hit_vectors(hits), query_vec, top_k,
+            embed=lambda texts: self._embed_chunks(texts, [content_hash(t) for t in texts])[0],
+            run_key=run_key,
+            relevance=relevance,
+            terms=set(tokenize(question)) if self.hybrid_search else None,
+        )
+        answer = self._format_hits(kept) if kept else ALL_REPEATED
+        if kept and repeated:
+            answer += f"\n\n({repeated} more relevant passages were already returned to you earlier in this task.)"
+        before, after = self._compressor.account(
+            self._format_hits(hits[:top_k]), answer, min(top_k, len(hits)), len(kept)
+        )
+        s.set(tokens_before=before, tokens_after=after, repeated=repeated)
+        return answer
+
+    def _history_key(self) -> Optional[str]:
+        """
+        Dedupe history of the agent working on the current task in the active
+        run. Agents and tasks have separate context windows, so each keeps its
+        own; outside a run, or for an unknown caller, nothing is deduplicated.
+        """
+        run_id, caller = active_run_id(), active_caller()
+        if run_id is None or caller is None:
+            return None
+        task, agent = caller
+        return f"{run_id}|{self.current_namespace}|{task or ''}|{agent or ''}"
+
+    def _hit_vectors(self, hits: List[Dict[str, Any]]) -> np.ndarray:
+        """Stored vectors of search hits, from the loaded index (re-embedded if no longer indexed)"""
+        if self.search_scope in self._ann:
+            return self._fetch_vectors([hit["id"] for hit in hits])
+        ids, matrix = self._load_index(self.search_scope)
+        hit_ids = np.array([hit["id"] for hit in hits], dtype=np.int64)
+        positions = np.clip(np.searchsorted(ids, hit_ids), 0, max(0, len(ids) - 1))
+        found = (ids[positions] == hit_ids) if len(ids) else np.zeros(len(hits), dtype=bool)
+        if found.all():
+            return matrix[positions]
+        contents = [hit["content"] for hit in hits]
+        return self._embed_chunks(contents, [content_hash(c) for c in contents])[0]
+
+    @property
+    def compressor(self) -> Optional[ContextCompressor]:
+        return self._compressor
+
+    @staticmethod
+    def _format_hits(hits: List[Dict[str, Any]]) -> str:
+        if not hits:
+            return "No relevant content found."
+        return "\n\n".join(attribution(hit["metadata"]) + hit["content"] for hit in hits)
+
+    @property
+    def query_cache(self) -> Optional[QueryCache]:
+        return self._query_cache
+
+    # ------------------------------------------------------------------ #
+    # Namespaces
+    # ------------------------------------------------------------------ #
+    @property
+    def current_namespace(self) -> str:
+        scope = _active_scope.get()
+        return scope[0] if scope else DEFAULT_NAMESPACE
+
+    @property
+    def search_scope(self) -> Tuple[str, ...]:
+        scope = _active_scope.get()
+        return scope[1] if scope else (DEFAULT_NAMESPACE,)
+
+    @contextmanager
+    def use_namespace(self, namespace: str, also_search: Union[str, Iterable[str], None] = None):
+        """
+        Route ingestion and queries in this context to `namespace`.
+        `also_search` adds namespaces to query, or ALL_NAMESPACES ("*") to search everything.
+        """
+        if also_search == ALL_NAMESPACES:
+            searched: Tuple[str, ...] = (ALL_NAMESPACES,)
+        else:
+            extra = [also_search] if isinstance(also_search, str) else list(also_search or [])
+            searched = tuple(sorted({namespace, *extra}))
+        token = _active_scope.set((namespace, searched))
+        try:
+            yield namespace
+        finally:
+            _active_scope.reset(token)
+
+    def namespaces(self) -> Dict[str, int]:
+        """Chunk count per namespace"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT namespace, COUNT(*) FROM chunk_namespaces GROUP BY namespace ORDER BY namespace"
+            ).fetchall()
+        return {name: count for name, count in rows}
+
+    # ------------------------------------------------------------------ #
+    # Bulk ingestion
+    # ------------------------------------------------------------------ #
+    def add_many(self, sources: List[SourceItem], namespace: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Ingest many sources in one pass into `namespace` (default: the active one).
+
+        Each item is either a string (URL, file path or raw text) or a dict with
+        `source` or `content`, optional `data_type` ("web_page", "text_file",
+        "text"), optional `metadata` and optional `refresh` (re-read a known URL).
+
+        URLs that were already ingested are not loaded again and chunks whose
+        content hash is already stored are not re-embedded; if they belong to
+        another namespace they are just linked into this one. New chunks are
+        embedded in batches of `embed_batch_size` and everything is written to
+        the store in a single transaction.
+
+        Returns throughput and dedup stats plus one result per source, in input order.
+        """
+        namespace = namespace or self.current_namespace
+        with span("rag_ingest", "rag", namespace=namespace, sources=len(sources)) as s:
+            stats = self._add_many(sources, namespace)
+            s.set(**{k: v for k, v in stats.items() if k not in ("results", "namespace")})
+        return stats
+
+    def _add_many(self, sources: List[SourceItem], namespace: str) -> Dict[str, Any]:
+        started = time.perf_counter()
+        results: List[Dict[str, Any]] = []
+        pending = []  # (chunk text, metadata, content hash) of chunks to embed
+        pending_by_hash: Dict[str, int] = {}
+        plans = []  # (result, source_key, source row, chunk refs); refs are chunk ids or ("new", index)
+
+        for item in sources:
+            item = item if isinstance(item, dict) else {"source": item}
+            ref = str(item.get("source") or (item.get("metadata") or {}).get("url") or "inline-text")
+            if len(ref) > 120:  # raw text passed as the source
+                ref = ref[:117] + "..."
+            result: Dict[str, Any] = {"source": ref, "status": "embedded", "chunks": 0, "linked": 0, "skipped": 0}
+            results.append(result)
+            try:
+                source_key = self._source_key(item)
+                known_ids = self._source_chunk_ids(source_key) if source_key and not item.get("refresh") else None
+                if known_ids is not None:
+                    plans.append((result, None, None, known_ids))
+                    continue
+
+                data_type, text = self._load(item)
+                chunks = chunk_text(text, self.chunk_size, self.chunk_overlap)
+                if not chunks:
+                    raise ValueError("No text content to embed")
+
+                hashes = [content_hash(chunk) for chunk in chunks]
+                stored = self._stored_hashes(hashes)
+                metadata = {**(item.get("metadata") or {}), "source": ref, "data_type": data_type}
+                refs: List[Any] = []
+                for chunk, digest in zip(chunks, hashes):
+                    if digest in stored:
+                        refs.append(stored[digest])
+                    elif digest in pending_by_hash:
+                        refs.append(("dup", pending_by_hash[digest]))
+                    else:
+                        pending_by_hash[digest] = len(pending)
+                        refs.append(("new", len(pending)))
+                        pending.append((chunk, metadata, digest))
+                source_row = (source_key, ref, data_type, len(chunks)) if source_key else None
+                plans.append((result, source_key, source_row, refs))
+            except Exception as e:
+                result.update(status="failed", error=str(e))
+
+        embed_started = time.perf_counter()
+        vectors, cache_hits = self._embed_chunks(
+            [chunk for chunk, _, _ in pending], [digest for _, _, digest in pending]
+        )
+        embed_seconds = time.perf_counter() - embed_started
+
+        linked_chunks, skipped_chunks = self._write_chunks(namespace, pending, vectors, plans)
+
+        elapsed = time.perf_counter() - started
+        docs = sum(1 for r in results if r["status"] in ("embedded", "linked"))
+        stats = {
+            "namespace": namespace,
+            "documents": docs,
+            "skipped_documents": sum(1 for r in results if r["status"] == "skipped"),
+            "failed": sum(1 for r in results if r["status"] == "failed"),
+            "chunks": len(pending),
+            "linked_chunks": linked_chunks,
+            "skipped_chunks": skipped_chunks,
+            "seconds": round(elapsed, 3),
+            "embed_seconds": round(embed_seconds, 3),
+            "embedding_cache_hits": cache_hits,
+            "embedded_chunks": len(pending) - cache_hits,
+            "chunks_per_sec": round(len(pending) / elapsed, 1) if elapsed > 0 else 0.0,
+            "docs_per_sec": round(docs / elapsed, 2) if elapsed > 0 else 0.0,
+            "results": results,
+        }
+        print(
+            f"📚 RAG ingest [{namespace}]: {docs} docs, {len(pending)} new chunks ({cache_hits} from embedding cache), "
+            f"{linked_chunks} linked, {skipped_chunks} skipped in {elapsed:.2f}s "
+            f"({stats['chunks_per_sec']} chunks/s, {stats['docs_per_sec']} docs/s)"
+        )
+        return stats
+
+    def read_new_content(self, path: str, namespace: Optional[str] = None) -> tuple:
+        """
+        Return (text, start_offset) for the part of an append-only file that
+        has not been ingested into the namespace yet. A file that shrank is
+        read from the start.
+        """
+        namespace = namespace or self.current_namespace
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT byte_offset FROM ingest_offsets WHERE path = ? AND namespace = ?", (path, namespace)
+            ).fetchone()
+        offset = row[0] if row else 0
+        if not os.path.isfile(path):
+            return "", offset
+        if os.path.getsize(path) < offset:
+            offset = 0
+        with open(path, "rb") as f:
+            f.seek(offset)
+            return f.read().decode("utf-8", errors="replace"), offset
+
+    def mark_ingested(self, path: str, byte_offset: int, namespace: Optional[str] = None) -> None:
+        """Record that `path` has been ingested into the namespace up to `byte_offset`"""
+        namespace = namespace or self.current_namespace
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO ingest_offsets (path, namespace, byte_offset, updated_at) VALUES (?, ?, ?, ?)",
+                (path, namespace, byte_offset, time.time()),
+            )
+
+    def has_source(self, url: str) -> bool:
+        """True if the URL (after normalization) has already been ingested into any namespace"""
+        return self._source_chunk_ids(normalize_url(url)) is not None
+
+    def _source_key(self, item: Dict[str, Any]) -> Optional[str]:
+        """Dedup key for a whole source: its normalized URL, if it has one"""
+        url = (item.get("metadata") or {}).get("url") or item.get("source")
+        if isinstance(url, str) and url.startswith(("http://", "https://")):
+            return normalize_url(url)
+        return None
+
+    def _source_chunk_ids(self, source_key: str) -> Optional[List[int]]:
+        """Chunk ids of an already-ingested source, or None if it is unknown"""
+        with self._connect() as conn:
+            if not conn.execute("SELECT 1 FROM sources WHERE source_key = ?", (source_key,)).fetchone():
+                return None
+            return [row[0] for row in conn.execute(
+                "SELECT chunk_id FROM source_chunks WHERE source_key = ? ORDER BY chunk_id", (source_key,)
+            )]
+
+    def _stored_hashes(self, hashes: List[str], conn: Optional[sqlite3.Connection] = None) -> Dict[str, int]:
+        """Chunk id per already-stored content hash, read with `conn` if given"""
+        if conn is None:
+            with self._connect() as conn:
+                return self._stored_hashes(hashes, conn)
+        found: Dict[str, int] = {}
+        for start in range(0, len(hashes), 500):
+            batch = hashes[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            for digest, chunk_id in conn.execute(
+                f"SELECT content_hash, MIN(id) FROM chunks WHERE content_hash IN ({placeholders}) "
+                "GROUP BY content_hash",
+                batch,
+            ):
+                found[digest] = chunk_id
+        return found
+
+    def _load(self, item: Dict[str, Any]) -> tuple:
+        """Resolve a source item to (data_type, text)"""
+        if item.get("content") is not None:
+            return item.get("data_type") or "text", str(item["content"])
+
+        source = str(item.get("source", ""))
+        data_type = item.get("data_type")
+        if not data_type:
+            if source.startswith(("http://", "https://")):
+                data_type = "web_page"
+            elif os.path.isfile(source):
+                data_type = "text_file"
+            else:
+                data_type = "text"
+
+        if data_type == "web_page":
+            with span("fetch_page", "http", url=source) as s:
+                text = fetch_page_text(source, timeout=self.fetch_timeout)
+                s.set(chars=len(text))
+            return data_type, text
+        # "text" sources that point at a file are read from disk, as the research tool relies on
+        if data_type == "text_file" or (data_type == "text" and os.path.isfile(source)):
+            with open(source, "r", encoding="utf-8") as f:
+                return "text_file", f.read()
+        if data_type == "text":
+            return data_type, source
+        raise ValueError(f"Unsupported data_type: {data_type}")
+
+    def _write_chunks(self, namespace: str, pending: List[tuple], vectors: np.ndarray, plans: List[tuple]) -> Tuple[int, int]:
+        """
+        Insert new chunks, link every planned chunk into the namespace and record
+        sources, all in one transaction. Fills in per-source counts and returns
+        (linked, skipped) chunk totals.
+        """
+        now = time.time()
+        linked_total = skipped_total = 0
+        with self._lock:
+            with self._connect() as conn:
+                # Planning ran outside the lock: a concurrent ingest (another batch flow
+                # adding the same URL) may have stored some of these chunks since
+                stored = self._stored_hashes([digest for _, _, digest in pending], conn)
+                new_ids, inserted = [], []
+                for (chunk, meta, digest), vec in zip(pending, vectors):
+                    if digest in stored:
+                        new_ids.append(stored[digest])
+                        continue
+                    new_ids.append(conn.execute(
+                        "INSERT INTO chunks (source, data_type, content, metadata, embedding, created_at, content_hash) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (meta["source"], meta["data_type"], chunk, json.dumps(meta),
+                         vec.astype(np.float32).tobytes(), now, digest),
+                    ).lastrowid)
+                    inserted.append((new_ids[-1], chunk))
+                bm25_update = self._bm25.add(conn, inserted)
+                if stored:
+                    # Chunks stored meanwhile are linked like any other existing chunk
+                    plans = [
+                        (result, source_key, source_row,
+                         [new_ids[r[1]] if not isinstance(r, int) and pending[r[1]][2] in stored else r for r in refs])
+                        for result, source_key, source_row, refs in plans
+                    ]
+
+                existing = [r for _, _, _, refs in plans for r in refs if isinstance(r, int)]
+                members = self._namespace_members(conn, namespace, existing)
+                claimed = set()  # new chunks already counted for an earlier source in this call
+
+                for result, source_key, source_row, refs in plans:
+                    chunk_ids, new, linked = [], 0, 0
+                    for r in refs:
+                        if isinstance(r, int):
+                            chunk_ids.append(r)
+                            if r not in members:
+                                members.add(r)
+                                linked += 1
+                        else:
+                            chunk_ids.append(new_ids[r[1]])
+                            if r[0] == "new" and r[1] not in claimed:
+                                claimed.add(r[1])
+                                new += 1
+                    skipped = len(refs) - new - linked
+                    result.update(chunks=new, linked=linked, skipped=skipped)
+                    if not new:
+                        result["status"] = "linked" if linked else "skipped"
+                    linked_total += linked
+                    skipped_total += skipped
+
+                    conn.executemany(
+                        "INSERT OR IGNORE INTO chunk_namespaces (namespace, chunk_id) VALUES (?, ?)",
+                        [(namespace, cid) for cid in chunk_ids],
+                    )
+                    if source_row:
+                        conn.execute(
+                            "INSERT OR REPLACE INTO sources (source_key, source, data_type, chunk_count, ingested_at) "
+                            "VALUES (?, ?, ?, ?, ?)",
+                            (*source_row, now),
+                        )
+                        conn.execute("DELETE FROM source_chunks WHERE source_key = ?", (source_key,))
+                        conn.executemany(
+                            "INSERT OR IGNORE INTO source_chunks (source_key, chunk_id) VALUES (?, ?)",
+                            [(source_key, cid) for cid in chunk_ids],
+                        )
+
+                if inserted or linked_total:
+                    self._invalidate_indexes(namespace)
+            # Postings reach the in-memory BM25 caches only once the chunks committed
+            self._bm25.apply(bm25_update)
+        if (inserted or linked_total) and self._query_cache is not None:
+            # Cached answers for this namespace may now miss the new content
+            self._query_cache.invalidate(namespace)
+        return linked_total, skipped_total
+
+    def _namespace_members(self, conn: sqlite3.Connection, namespace: str, chunk_ids: List[int]) -> set:
+        members = set()
+        for start in range(0, len(chunk_ids), 500):
+            batch = chunk_ids[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            members.update(row[0] for row in conn.execute(
+                f"SELECT chunk_id FROM chunk_namespaces WHERE namespace = ? AND chunk_id IN ({placeholders})",
+                [namespace, *batch],
+            ))
+        return members
+
+    def _invalidate_indexes(self, namespace: str) -> None:
+        """Drop cached indexes whose scope includes the namespace"""
+        for scope in list(self._indexes):
+            if namespace in scope or ALL_NAMESPACES in scope:
+                del self._indexes[scope]
+        # IVF indexes are extended on their next search instead of being rebuilt
+        self._ann_stale.update(scope for scope in self._ann if namespace in scope or ALL_NAMESPACES in scope)
+
+    # ------------------------------------------------------------------ #
+    # Retrieval
+    # ------------------------------------------------------------------ #
+    def search(self, question: str, limit: int = 5, similarity_threshold: float = 0.0,
+               namespaces: Union[str, Iterable[str], None] = None,
+               query_vector: Optional[np.ndarray] = None) -> List[Dict[str, Any]]:
+        """
+        Return the top `limit` chunks for a question as dicts with content,
+        metadata and score (dense cosine similarity). Searches the active
+        scope unless `namespaces` is given ("*" searches every namespace).
+
+        With `hybrid_search`, the dense ranking (chunks at or above the
+        threshold) and the BM25 ranking are fused by reciprocal rank fusion,
+        so chunks that only match exact terms are found too; their hits also
+        carry `bm25` and `fused` scores.
+        """
+        scope = self._resolve_scope(namespaces)
+        ann = self._ann_index(scope) if self.ann_index else None
+        ids, matrix = (ann.ids, None) if ann is not None else self._load_index(scope)
+        if not len(ids):
+            return []
+
+        query_vec = self._embed([question])[0] if query_vector is None else query_vector
+        depth = max(limit, self.fusion_candidates) if self.hybrid_search else limit
+        started = time.perf_counter()
+        with span("vector_search", "rag", index_size=len(ids), ann=ann is not None) as s:
+            if ann is not None:
+                # Re-score max(depth, ann_rerank x limit) candidates exactly, whichever is larger
+                rerank = max(1, -(-self.ann_rerank * limit // depth))
+                found, found_scores = ann.search(query_vec, depth, nprobe=self.ann_nprobe, rerank=rerank,
+                                                 vectors=self._fetch_vectors)
+            else:
+                scores = matrix @ query_vec
+                if len(scores) > depth:
+                    candidates = np.argpartition(-scores, depth - 1)[:depth]
+                    order = candidates[np.argsort(-scores[candidates])]
+                else:
+                    order = np.argsort(-scores)
+                found, found_scores = [int(ids[i]) for i in order], [float(scores[i]) for i in order]
+            # chunk id -> cosine similarity, in dense rank order
+            dense = {cid: score for cid, score in zip(found, found_scores) if score >= similarity_threshold}
+            s.set(hits=len(dense))
+        self._latencies["dense"].append(time.perf_counter() - started)
+
+        if not self.hybrid_search:
+            top_ids = list(dense)[:limit]
+            rows = self._fetch_rows(top_ids) if top_ids else {}
+            return [{**rows[cid], "score": dense[cid]} for cid in top_ids if cid in rows]
+
+        started = time.perf_counter()
+        with span("bm25_search", "rag", terms=len(set(tokenize(question)))) as s:
+            with self._connect() as conn:
+                lexical = self._bm25.search(conn, question, ids, depth)
+            s.set(hits=len(lexical))
+        self._latencies["bm25"].append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        fused = reciprocal_rank_fusion([list(dense), [cid for cid, _ in lexical]], k=self.rrf_k)
+        top_ids = sorted(fused, key=fused.get, reverse=True)[:limit]
+        self._latencies["fusion"].append(time.perf_counter() - started)
+        if not top_ids:
+            return []
+
+        # Chunks found only by BM25 (or below the threshold) still report their cosine similarity
+        missing = [cid for cid in top_ids if cid not in dense]
+        if missing:
+            if matrix is not None:
+                vectors = matrix[np.searchsorted(ids, missing)]
+            else:
+                vectors = self._fetch_vectors(missing)
+            dense.update(zip(missing, (float(v) for v in vectors @ query_vec)))
+        bm25_scores = dict(lexical)
+        rows = self._fetch_rows(top_ids)
+        return [
+            {**rows[cid], "score": dense[cid], "bm25": round(bm25_scores.get(cid, 0.0), 4),
+             "fused": round(fused[cid], 6)}
+            for cid in top_ids if cid in rows
+        ]
+
+    def search_latency_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Searches and p50/p95 latency (ms) per retrieval leg over the recent queries"""
+        stats = {}
+        for leg, samples in self._latencies.items():
+            latencies = sorted(samples)
+            if not latencies:
+                continue
+            stats[leg] = {
+                "queries": len(latencies),
+                "p50_ms": round(latencies[len(latencies) // 2] * 1000, 3),
+                "p95_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000, 3),
+            }
+        return stats
+
+    def _resolve_scope(self, namespaces: Union[str, Iterable[str], None]) -> Tuple[str, ...]:
+        if namespaces is None:
+            return self.search_scope
+        if isinstance(namespaces, str):
+            return (namespaces,)
+        return tuple(sorted(set(namespaces)))
+
+    def _ann_index(self, scope: Tuple[str, ...]) -> Optional[IvfIndex]:
+        """
+        The scope's IVF index, built on first use once the scope has
+        `ann_min_chunks` chunks; None means exact search. Chunks ingested
+        since the last search are inserted, and the index is retrained once
+        it has doubled since training.
+        """
+        with self._lock:
+            index = self._ann.get(scope)
+            if index is None and scope in self._indexes:
+                return None  # small scope, already loaded for exact search
+            if index is not None and scope not in self._ann_stale:
+                return index
+
+            ids = self._scope_ids(scope)
+            if index is None and len(ids) < self.ann_min_chunks:
+                return None
+            with span("ann_index", "rag", scope_size=len(ids)) as s:
+                if index is not None:
+                    new = np.setdiff1d(ids, index.ids, assume_unique=True)
+                    index.add(new, self._fetch_vectors(new))
+                    s.set(inserted=len(new))
+                if index is None or index.needs_retrain:
+                    index = IvfIndex(nlist=self.ann_nlist, nprobe=self.ann_nprobe, rerank=self.ann_rerank)
+                    index.build(ids, self._fetch_vectors(ids))
+                    s.set(trained=True)
+            self._ann[scope] = index
+            self._ann_stale.discard(scope)
+            # The float32 matrix is no longer needed for this scope
+            self._indexes.pop(scope, None)
+            return index
+
+    def ann_recall(self, k: int = 10, queries: int = 100, namespaces: Union[str, Iterable[str], None] = None,
+                   nprobe_values: Iterable[int] = (1, 2, 4, 8, 16, 32)) -> Dict[str, Any]:
+        """
+        Recall@k of the scope's IVF index against exact search, with latency
+        per nprobe value, using stored chunk vectors as queries. Builds the
+        index for the check even below `ann_min_chunks`.
+        """
+        scope = self._resolve_scope(namespaces)
+        ids = self._scope_ids(scope)
+        if len(ids) <= k:
+            return {"chunks": len(ids), "error": f"need more than {k} chunks"}
+        matrix = self._fetch_vectors(ids)
+        index = self._ann.get(scope) if self.ann_index else None
+        if index is None or scope in self._ann_stale:
+            index = IvfIndex(nlist=self.ann_nlist, nprobe=self.ann_nprobe, rerank=self.ann_rerank).build(ids, matrix)
+        return {
+            **index.stats(),
+            "k": k,
+            "sweep": recall_at_k(index, ids, matrix, k=k, queries=queries, nprobe_values=tuple(nprobe_values),
+                                 rerank=self.ann_rerank),
+        }
+
+    def _scope_ids(self, scope: Tuple[str, ...]) -> np.ndarray:
+        """Sorted chunk ids of a search scope"""
+        with self._connect() as conn:
+            if ALL_NAMESPACES in scope:
+                rows = conn.execute("SELECT id FROM chunks ORDER BY id").fetchall()
+            else:
+                placeholders = ",".join("?" * len(scope))
+                rows = conn.execute(
+                    f"SELECT DISTINCT chunk_id FROM chunk_namespaces WHERE namespace IN ({placeholders}) "
+                    "ORDER BY chunk_id",
+                    scope,
+                ).fetchall()
+        return np.array([r[0] for r in rows], dtype=np.int64)
+
+    def _fetch_vectors(self, chunk_ids: Iterable[int]) -> np.ndarray:
+        """Stored float32 vectors of chunks, in the given order"""
+        chunk_ids = [int(cid) for cid in chunk_ids]
+        by_id: Dict[int, np.ndarray] = {}
+        with self._connect() as conn:
+            for start in range(0, len(chunk_ids), 500):
+                batch = chunk_ids[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                for cid, blob in conn.execute(
+                    f"SELECT id, embedding FROM chunks WHERE id IN ({placeholders})", batch
+                ):
+                    by_id[cid] = np.frombuffer(blob, dtype=np.float32)
+        if not by_id:
+            return np.zeros((len(chunk_ids), 0), dtype=np.float32)
+        dim = len(next(iter(by_id.values())))
+        return np.vstack([by_id.get(cid, np.zeros(dim, dtype=np.float32)) for cid in chunk_ids])
+
+    def _load_index(self, scope: Tuple[str, ...]) -> Tuple[np.ndarray, np.ndarray]:
+        with self._lock:
+            if scope not in self._indexes:
+                with self._connect() as conn:
+                    if ALL_NAMESPACES in scope:
+                        rows = conn.execute("SELECT id, embedding FROM chunks ORDER BY id").fetchall()
+                    else:
+                        placeholders = ",".join("?" * len(scope))
+                        rows = conn.execute(
+                            "SELECT c.id, c.embedding FROM chunks c WHERE c.id IN ("
+                            f"SELECT chunk_id FROM chunk_namespaces WHERE namespace IN ({placeholders})"
+                            ") ORDER BY c.id",
+                            scope,
+                        ).fetchall()
+                ids = np.array([r[0] for r in rows], dtype=np.int64)
+                matrix = (
+                    np.vstack([np.frombuffer(r[1], dtype=np.float32) for r in rows])
+                    if rows else np.zeros((0, 0), dtype=np.float32)
+                )
+                self._indexes[scope] = (ids, matrix)
+            return self._indexes[scope]
+
+    def _fetch_rows(self, chunk_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        placeholders = ",".join("?" * len(chunk_ids))
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT id, content, metadata FROM chunks WHERE id IN ({placeholders})", chunk_ids
+            ).fetchall()
+        return {r[0]: {"id": r[0], "content": r[1], "metadata": json.loads(r[2])} for r in rows}
+
+    # ------------------------------------------------------------------ #
+    # Embedding
+    # ------------------------------------------------------------------ #
+    @property
+    def embedding_cache(self) -> Optional[EmbeddingCache]:
+        return self._embedding_cache
+
+    def _embed_chunks(self, chunks: List[str], hashes: List[str]) -> tuple:
+        """
+        Embed chunks through the persistent cache; only cache misses reach the model.
+        Returns (vectors, number of cache hits).
+        """
+        if not chunks or self._embedding_cache is None:
+            return self._embed(chunks), 0
+
+        cached = self._embedding_cache.get_many(hashes)
+        missing = [i for i, digest in enumerate(hashes) if digest not in cached]
+        fresh = self._embed([chunks[i] for i in missing])
+        if missing:
+            self._embedding_cache.put_many({hashes[i]: vec for i, vec in zip(missing, fresh)})
+
+        by_hash = {**cached, **{hashes[i]: vec for i, vec in zip(missing, fresh)}}
+        return np.vstack([by_hash[digest] for digest in hashes]).astype(np.float32), len(chunks) - len(missing)
+
+    def _embed(self, texts: List[str]) -> np.ndarray:
+        """Embed texts in fixed-size batches; vectors are L2-normalized float32"""
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        model = self._get_model()
+        with span("embedding_batch", "embedding", texts=len(texts), batch_size=self.embed_batch_size,
+                  chars=sum(len(t) for t in texts)):
+            vectors = model.encode(
+                texts,
+                batch_size=self.embed_batch_size,
+                normalize_embeddings=True,
+                convert_to_numpy=True,
+                show_progress_bar=False,
+            )
+        return np.asarray(vectors, dtype=np.float32)
+
+    def _get_model(self):
+        if self._model is None:
+            self._model = get_embedding_model(self.embedding_model)
+        return self._model
+
+    @contextmanager
+    def _connect(self):
+        """Open the store; commits on success, rolls back on error, always closes"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
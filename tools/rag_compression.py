@@ -0,0 +1,184 @@
+# tools/rag_compression.py
+"""
+Post-retrieval compression of RAG results.
+Whatever `rag_tool` returns stays in the agent's prompt for every later
+iteration of its task, so hits are trimmed before they are formatted:
+passages already returned to the same task and agent earlier in the run
+(including the sentences that overlapping chunks share) are left out, the remaining candidates are
+diversified with maximal marginal relevance, and only the sentences closest
+to the question are kept within a per-query token budget. Tokens before and
+after are recorded in the cost ledger.
+"""
+
+import re
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from tools.bm25_index import tokenize
+from utils.ledger import record_retrieval
+
+SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+|\n{2,}")
+
+# Sentence score bonus for containing every query term (exact names and versions)
+LEXICAL_BONUS = 0.2
+
+ALL_REPEATED = "All relevant passages for this question were already returned to you earlier in this task."
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token), as used for the LLM calls"""
+    return len(text) // 4 + 1 if text else 0
+
+
+def split_sentences(text: str) -> List[str]:
+    return [s.strip() for s in SENTENCE_SPLIT.split(text) if s.strip()]
+
+
+def sentence_key(sentence: str) -> str:
+    """Case- and whitespace-insensitive identity of a sentence"""
+    return hashlib.sha1(re.sub(r"\s+", " ", sentence).strip().lower().encode("utf-8")).hexdigest()
+
+
+def mmr(relevance: np.ndarray, vectors: np.ndarray, k: int, lambda_: float = 0.7) -> List[int]:
+    """Indices of `k` items picked by maximal marginal relevance, in pick order"""
+    n = len(relevance)
+    if n == 0 or k <= 0:
+        return []
+    similarity = vectors @ vectors.T
+    redundancy = np.zeros(n, dtype=np.float32)
+    available = np.ones(n, dtype=bool)
+    picked: List[int] = []
+    for _ in range(min(k, n)):
+        scores = np.where(available, lambda_ * relevance - (1 - lambda_) * redundancy, -np.inf)
+        best = int(np.argmax(scores))
+        picked.append(best)
+        available[best] = False
+        redundancy = np.maximum(redundancy, similarity[:, best])
+    return picked
+
+
+class ContextCompressor:
+    """Per-caller dedupe, MMR diversification and extractive sentence selection of retrieved chunks"""
+
+    def __init__(self, token_budget: int = 600, mmr_lambda: float = 0.7,
+                 duplicate_threshold: float = 0.95, max_runs: int = 64):
+        self.token_budget = token_budget
+        self.mmr_lambda = mmr_lambda
+        self.duplicate_threshold = duplicate_threshold
+        self.max_runs = max_runs
+        self._lock = threading.Lock()
+        # history key (run, task, agent) -> chunk ids, sentence keys and vectors of chunks returned in full
+        self._runs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.queries = 0
+        self.tokens_before = 0
+        self.tokens_after = 0
+        self.repeated_chunks = 0
+
+    def compress(self, hits: List[Dict[str, Any]], vectors: np.ndarray, query_vec: np.ndarray, limit: int,
+                 embed: Callable[[List[str]], np.ndarray], run_key: Optional[str],
+                 relevance: Optional[np.ndarray] = None,
+                 terms: Optional[Set[str]] = None) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Reduce `hits` (best first, with one vector per hit) to at most `limit`
+        trimmed hits. `relevance` (0-1 per hit) replaces cosine similarity to
+        the query for MMR; sentences containing query `terms` score higher.
+        Returns the hits and how many of the top `limit` were left out
+        because the caller identified by `run_key` had already seen them;
+        with no `run_key` nothing is remembered or left out.
+        """
+        with self._lock:
+            state = self._state(run_key)
+            seen_chunks: Set[int] = set(state["chunks"])
+            seen_sentences: Set[str] = set(state["sentences"])
+            delivered = np.vstack(state["vectors"]) if state["vectors"] else None
+
+        sentences = [[(s, sentence_key(s)) for s in split_sentences(hit["content"])] for hit in hits]
+        repeated = np.array([
+            hit["id"] in seen_chunks or all(key in seen_sentences for _, key in sentences[i])
+            for i, hit in enumerate(hits)
+        ], dtype=bool)
+        if delivered is not None and len(hits):
+            repeated |= (vectors @ delivered.T).max(axis=1) >= self.duplicate_threshold
+        dropped = int(repeated[:limit].sum())
+
+        relevance = vectors @ query_vec if relevance is None else relevance
+        fresh = np.flatnonzero(~repeated)
+        picked = [int(fresh[i]) for i in mmr(relevance[fresh], vectors[fresh], limit, self.mmr_lambda)]
+
+        # Sentences of the picked chunks not returned before (overlap between chunks counts once)
+        candidates: List[Tuple[int, int, str, str]] = []
+        keys: Set[str] = set()
+        for rank, hit_index in enumerate(picked):
+            for position, (text, key) in enumerate(sentences[hit_index]):
+                if key not in seen_sentences and key not in keys:
+                    keys.add(key)
+                    candidates.append((rank, position, text, key))
+
+        kept: Set[Tuple[int, int]] = set()
+        if candidates:
+            sentence_scores = embed([text for _, _, text, _ in candidates]) @ query_vec
+            if terms:
+                sentence_scores = sentence_scores + LEXICAL_BONUS * np.array([
+                    len(terms.intersection(tokenize(text))) / len(terms) for _, _, text, _ in candidates
+                ])
+            budget = self.token_budget
+            for i in np.argsort(-sentence_scores):
+                cost = estimate_tokens(candidates[i][2])
+                if cost <= budget or not kept:
+                    kept.add(candidates[i][:2])
+                    budget -= cost
+
+        results: List[Dict[str, Any]] = []
+        full_chunks: List[int] = []
+        for rank, hit_index in enumerate(picked):
+            chosen = [c for c in candidates if c[0] == rank and c[:2] in kept]
+            if not chosen:
+                continue
+            results.append({**hits[hit_index], "content": " ".join(text for _, _, text, _ in chosen)})
+            if len(chosen) == len(sentences[hit_index]):
+                full_chunks.append(hit_index)
+
+        with self._lock:
+            state = self._state(run_key)
+            state["sentences"].update(c[3] for c in candidates if c[:2] in kept)
+            for hit_index in full_chunks:
+                state["chunks"].add(hits[hit_index]["id"])
+                state["vectors"].append(vectors[hit_index])
+            self.repeated_chunks += dropped
+        return results, dropped
+
+    def account(self, before: str, after: str, chunks_before: int, chunks_after: int) -> Tuple[int, int]:
+        """Count one query's tokens before/after compression and record them against the active run"""
+        tokens_before, tokens_after = estimate_tokens(before), estimate_tokens(after)
+        with self._lock:
+            self.queries += 1
+            self.tokens_before += tokens_before
+            self.tokens_after += tokens_after
+        record_retrieval(chunks_before, chunks_after, tokens_before, tokens_after)
+        return tokens_before, tokens_after
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "queries": self.queries,
+                "tokens_before": self.tokens_before,
+                "tokens_after": self.tokens_after,
+                "saved_fraction": round(1 - self.tokens_after / self.tokens_before, 3) if self.tokens_before else 0.0,
+                "repeated_chunks": self.repeated_chunks,
+            }
+
+    def _state(self, run_key: Optional[str]) -> Dict[str, Any]:
+        if run_key is None:
+            return {"chunks": set(), "sentences": set(), "vectors": []}
+        state = self._runs.get(run_key)
+        if state is None:
+            state = self._runs[run_key] = {"chunks": set(), "sentences": set(), "vectors": []}
+            while len(self._runs) > self.max_runs:
+                self._runs.popitem(last=False)
+        else:
+            self._runs.move_to_end(run_key)
+        return state
@@ -1,16 +1,67 @@
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
 from crewai_tools import RagTool
+from tools.rag_adapter import LocalRagAdapter, SourceItem
 
-rag_tool = RagTool(
-    config={
-        "embedding_model": {
-            "provider": "huggingface",
-            "config": {"model": "sentence-transformers/all-MiniLM-L6-v2"}
-        },
-        "chunker": {
-            "chunk_size": 1000,  # Larger chunks for better context
-            "chunk_overlap": 100   # Reduced overlap to fix warning
-        }
-    },
-)
 
+class KnowledgeBaseTool(RagTool):
+    """RagTool with a bulk ingestion API on top of the local adapter"""
 
+    def add_many(self, sources: List[SourceItem], namespace: Optional[str] = None) -> Dict[str, Any]:
+        """Chunk, embed and store many sources in one batched pass"""
+        return self.adapter.add_many(sources, namespace=namespace)
+
+    def use_namespace(self, namespace: str, also_search: Union[str, Iterable[str], None] = None):
+        """Context manager scoping ingestion and queries to one topic/run namespace"""
+        return self.adapter.use_namespace(namespace, also_search=also_search)
+
+    def namespaces(self) -> Dict[str, int]:
+        """Chunk count per namespace"""
+        return self.adapter.namespaces()
+
+    def query_cache_stats(self) -> Dict[str, Any]:
+        """Hit/miss counters of the semantic query cache (empty if disabled)"""
+        cache = self.adapter.query_cache
+        return cache.stats() if cache else {}
+
+    def compression_stats(self) -> Dict[str, Any]:
+        """Tokens of RAG results before/after context compression (empty if disabled)"""
+        compressor = self.adapter.compressor
+        return compressor.stats() if compressor else {}
+
+    def search_latency_stats(self) -> Dict[str, Dict[str, Any]]:
+        """p50/p95 latency of the dense, BM25 and fusion legs of recent searches"""
+        return self.adapter.search_latency_stats()
+
+    def ann_recall(self, k: int = 10, queries: int = 100) -> Dict[str, Any]:
+        """Recall@k and latency of the approximate index against exact search, per nprobe"""
+        return self.adapter.ann_recall(k=k, queries=queries)
+
+    def has_source(self, url: str) -> bool:
+        """True if the URL is already in the knowledge base"""
+        return self.adapter.has_source(url)
+
+    def read_new_content(self, path: str) -> Tuple[str, int]:
+        """Text appended to `path` since the last `mark_ingested`, plus its byte offset"""
+        return self.adapter.read_new_content(path)
+
+    def mark_ingested(self, path: str, byte_offset: int) -> None:
+        self.adapter.mark_ingested(path, byte_offset)
+
+
+def build_rag_tool() -> KnowledgeBaseTool:
+    return KnowledgeBaseTool(
+        adapter=LocalRagAdapter(
+            embedding_model="sentence-transformers/all-MiniLM-L6-v2",
+            chunk_size=1000,  # Larger chunks for better context
+            chunk_overlap=100,  # Reduced overlap to fix warning
+            embed_batch_size=64,  # Fixed-size batches keep the model busy across sources
+        ),
+    )
+
+
+def __getattr__(name: str) -> Any:
+    # `from tools.rag_tool import rag_tool` keeps working, built lazily via the registry
+    if name == "rag_tool":
+        from utils.registry import registry
+        return registry.get("rag_tool")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,12 +1,16 @@
 import os
 import json
-from typing import Type, Dict, List, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import Type, Dict, List, Any, Optional, Tuple
 from dotenv import load_dotenv
 from pydantic import BaseModel, Field, PrivateAttr
 from crewai.tools import BaseTool
 from crewai_tools.tools import TavilySearchTool
-from tools.rag_tool import rag_tool
-from tools.youtube_tool import YouTubeSearchTool, YouTubeTranscriptTool
+from utils.registry import registry
+from utils.tracing import span, propagate
+from utils.cache import PersistentCache, cache_key
+from tools.web_loader import fetch_page_text
+from tools.youtube_tool import YouTubeSearchTool, YouTubeTranscriptTool, parse_transcript_blocks, segments_path, video_url
 
 # Load .env variables
 load_dotenv()
@@ -25,10 +29,32 @@ class SearchAndEmbeddingTool(BaseTool):
     )
     args_schema: Type[BaseModel] = SearchAndEmbeddingInput
 
+    # Web ingestion settings: fetch/parse pages in parallel, then embed in one batched add
+    concurrent_ingest: bool = True
+    max_workers: int = 5
+    fetch_timeout: float = 15.0
+
+    # Transcript extraction settings: bounded pool, blocks written in search order
+    parallel_transcripts: bool = True
+    transcript_workers: int = 4
+    # YouTube search re-ranks a wide candidate pool; only this many top videos are transcribed
+    transcribe_top_k: int = 3
+    # Only index transcript blocks appended since the last ingest of the topic file
+    incremental_transcripts: bool = True
+    # Index timed, sentence-aligned segments (from the JSONL sidecar) instead of whole videos
+    transcript_segments: bool = True
+
+    # Tavily results are cached per (query, search_depth, max_results); past the TTL
+    # they are still served for `search_cache_stale_hours` while being refreshed
+    use_search_cache: bool = True
+    search_cache_ttl_hours: float = float(os.getenv("TAVILY_CACHE_TTL_HOURS", "24"))
+    search_cache_stale_hours: float = float(os.getenv("TAVILY_CACHE_STALE_HOURS", "72"))
+
     # Private attrs - correctly imported from pydantic
     _tavily: TavilySearchTool = PrivateAttr()
     _yt_search: YouTubeSearchTool = PrivateAttr()
     _yt_transcribe: YouTubeTranscriptTool = PrivateAttr()
+    _search_cache: Optional[PersistentCache] = PrivateAttr(default=None)
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
@@ -48,10 +74,17 @@ class SearchAndEmbeddingTool(BaseTool):
         )
         self._yt_search = YouTubeSearchTool()
         self._yt_transcribe = YouTubeTranscriptTool()
+        if self.use_search_cache:
+            self._search_cache = PersistentCache(
+                "tavily_search",
+                ttl_seconds=self.search_cache_ttl_hours * 3600,
+                stale_seconds=self.search_cache_stale_hours * 3600,
+            )
 
     def _run(self, query: str) -> str:
-        web_out = self._search_web_and_embed(query)
-        yt_out = self._search_youtube_and_transcribe(query)
+        with span(f"tool:{self.name}", "tool", query=query) as s:
+            web_out = self._search_web_and_embed(query)
+            yt_out = self._search_youtube_and_transcribe(query)
 
         summary = {
             "web_embedded": len(web_out["embedded"]),
@@ -59,6 +92,7 @@ class SearchAndEmbeddingTool(BaseTool):
             "yt_found": len(yt_out["videos"]),
             "yt_transcribed": sum(1 for r in yt_out["transcripts"] if r["status"] == "success"),
         }
+        s.set(**summary)
 
         return json.dumps(
             {"query": query, "web": web_out, "youtube": yt_out, "summary": summary},
@@ -67,12 +101,17 @@ class SearchAndEmbeddingTool(BaseTool):
 
     def _search_web_and_embed(self, query: str) -> Dict[str, Any]:
         try:
-            raw = self._tavily.run(query)
-            data = json.loads(raw) if isinstance(raw, str) else raw
-            results: List[Dict[str, Any]] = data.get("results", [])
+            with span("tavily_search", "http", query=query) as s:
+                data = self._tavily_search(query)
+                results: List[Dict[str, Any]] = data.get("results", [])
+                s.set(results=len(results))
         except Exception as e:
             return {"error": str(e), "embedded": [], "failed": []}
 
+        if self.concurrent_ingest:
+            return self._ingest_web_results_concurrently(results)
+
+        rag_tool = registry.get("rag_tool")
         embedded, failed = [], []
 
         for item in results:
@@ -88,17 +127,222 @@ class SearchAndEmbeddingTool(BaseTool):
 
         return {"embedded": embedded, "failed": failed}
 
+    def _tavily_search(self, query: str) -> Dict[str, Any]:
+        """Tavily results for `query`, from the cache when a recent copy exists"""
+        def fetch() -> Dict[str, Any]:
+            raw = self._tavily.run(query)
+            return json.loads(raw) if isinstance(raw, str) else raw
+
+        if self._search_cache is None:
+            return fetch()
+        key = cache_key(query, self._tavily.search_depth, self._tavily.max_results)
+        return self._search_cache.get_or_fetch(key, fetch)
+
+    def search_cache_stats(self) -> Optional[Dict[str, Any]]:
+        return self._search_cache.stats() if self._search_cache is not None else None
+
+    def _ingest_web_results_concurrently(self, results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Fetch and parse all result pages with a bounded thread pool, then ingest
+        them with a single rag_tool.add_many() call, which embeds the chunks of
+        all pages in fixed-size batches and keeps each page's URL and title as
+        metadata. Results keep the Tavily ranking order.
+        """
+        items = [(r["url"], r.get("title", "Untitled")) for r in results if r.get("url")]
+        if not items:
+            return {"embedded": [], "failed": []}
+
+        rag_tool = registry.get("rag_tool")
+        # Pages already in the knowledge base are not downloaded again
+        known = [rag_tool.has_source(url) for url, _ in items]
+        to_fetch = [item for item, is_known in zip(items, known) if not is_known]
+
+        fetched = []
+        if to_fetch:
+            workers = max(1, min(self.max_workers, len(to_fetch)))
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                # map() yields in submission order, so the output stays deterministic
+                fetched = list(pool.map(propagate(lambda it: self._fetch_page_safe(*it)), to_fetch))
+        fetched_iter = iter(fetched)
+        pages = [(None, None) if is_known else next(fetched_iter) for is_known in known]
+
+        # Known pages are passed by URL only: the store links their chunks into
+        # the active namespace without fetching or embedding anything
+        sources = [
+            {"source": url, "data_type": "web_page", "metadata": {"url": url, "title": title}} if is_known
+            else {"content": text, "data_type": "text", "metadata": {"url": url, "title": title}}
+            for (url, title), (text, _), is_known in zip(items, pages, known) if text or is_known
+        ]
+        try:
+            ingest = rag_tool.add_many(sources)
+        except Exception as e:
+            # The batch failed as a whole (e.g. embedding): add pages one at a time
+            # so a single bad page does not lose the others
+            print(f"⚠️ Batched web ingest failed, adding pages one by one: {e}")
+            ingest = {"results": [self._add_one(rag_tool, source) for source in sources], "batched": False}
+        ingest_results = iter(ingest.pop("results"))
+
+        embedded, failed = [], []
+        for (url, title), (text, error), is_known in zip(items, pages, known):
+            if text or is_known:
+                result = next(ingest_results)
+                error = result.get("error") if result["status"] == "failed" else None
+            if error is not None:
+                failed.append({"url": url, "title": title, "error": error})
+            elif is_known:
+                embedded.append({"url": url, "title": title, "already_indexed": True})
+            else:
+                embedded.append({"url": url, "title": title})
+
+        return {"embedded": embedded, "failed": failed, "ingest": ingest}
+
+    @staticmethod
+    def _add_one(rag_tool: Any, source: Dict[str, Any]) -> Dict[str, Any]:
+        """Ingest result for one page (its URL and title kept as metadata)"""
+        try:
+            return rag_tool.add_many([source])["results"][0]
+        except Exception as e:
+            return {"source": source["metadata"]["url"], "status": "failed", "error": str(e)}
+
+    def _fetch_page_safe(self, url: str, title: str) -> Tuple[Optional[str], Optional[str]]:
+        """Return (text, None) on success or (None, error) on failure."""
+        try:
+            with span("fetch_page", "http", url=url) as s:
+                text = fetch_page_text(url, timeout=self.fetch_timeout)
+                s.set(chars=len(text or ""))
+            if not text:
+                return None, "No text content extracted"
+            return f"Source: {url}\nTitle: {title}\n\n{text}", None
+        except Exception as e:
+            return None, str(e)
+
     def _search_youtube_and_transcribe(self, query: str) -> Dict[str, Any]:
         try:
-            raw = self._yt_search._run(topic=query, max_results=5, days_back=90)
-            data = json.loads(raw)
-            videos: List[Dict[str, Any]] = data.get("videos", [])
-            
+            with span("youtube_search", "http", query=query) as s:
+                raw = self._yt_search._run(topic=query, max_results=self.transcribe_top_k, days_back=90)
+                data = json.loads(raw)
+                videos: List[Dict[str, Any]] = data.get("videos", [])
+                s.set(videos=len(videos))
+
         except Exception as e:
             print("*"*50)
             print(f"Error searching YouTube: {e}")
             return {"error": str(e), "videos": [], "transcripts": []}
 
+        if self.parallel_transcripts:
+            transcripts = self._transcribe_videos_in_parallel(videos, query)
+        else:
+            transcripts = self._transcribe_videos(videos, query)
+
+        transcript_file = f"output/transcriptions/transcript_{query}.txt"
+        ingest = self._index_transcripts(transcript_file, query)
+        rag_added_status = ingest["failed"] == 0
+        
+        return {
+            "videos": videos,
+            "transcripts": transcripts,
+            "rag_transcript_added": rag_added_status,
+            "ingest": ingest,
+        }
+
+    def _index_transcripts(self, transcript_file: str, query: str) -> Dict[str, Any]:
+        """
+        Index the timed segments of the topic's transcripts, one document per
+        segment, or (without a segments sidecar) every video block of the
+        topic file. In incremental mode only records appended since the last
+        ingest are read.
+        """
+        sidecar = segments_path(transcript_file)
+        if self.transcript_segments and os.path.isfile(sidecar):
+            return self._index_segments(sidecar, query)
+
+        rag_tool = registry.get("rag_tool")
+        if self.incremental_transcripts:
+            text, start = rag_tool.read_new_content(transcript_file)
+        else:
+            text, start = "", 0
+            if os.path.isfile(transcript_file):
+                with open(transcript_file, "r", encoding="utf-8") as f:
+                    text = f.read()
+        blocks, consumed = parse_transcript_blocks(text)
+
+        ingest = rag_tool.add_many([
+            {
+                "source": f"youtube:{block.get('video_id', 'unknown')}",
+                "content": block["text"],
+                "data_type": "transcript",
+                "metadata": {
+                    "video_id": block.get("video_id"),
+                    "language": block.get("language"),
+                    "source_type": block.get("source_type"),
+                    "topic": query,
+                    "video_url": f"https://www.youtube.com/watch?v={block.get('video_id')}",
+                },
+            }
+            for block in blocks if block["text"]
+        ])
+        ingest.pop("results")
+
+        # Advance the offset only when everything landed, so failed blocks are retried next run
+        if self.incremental_transcripts and ingest["failed"] == 0:
+            rag_tool.mark_ingested(transcript_file, start + len(text[:consumed].encode("utf-8")))
+        return ingest
+
+    def _index_segments(self, sidecar: str, query: str) -> Dict[str, Any]:
+        """Ingest segment records from the JSONL sidecar, each with its video and time range"""
+        rag_tool = registry.get("rag_tool")
+        if self.incremental_transcripts:
+            text, start = rag_tool.read_new_content(sidecar)
+        else:
+            with open(sidecar, "r", encoding="utf-8") as f:
+                text, start = f.read(), 0
+        # Only complete lines; a record still being appended is picked up next time
+        consumed = text.rfind("\n") + 1
+        records = [json.loads(line) for line in text[:consumed].splitlines() if line.strip()]
+
+        ingest = rag_tool.add_many([
+            {
+                "source": f"youtube:{record['video_id']}#{record['segment']}",
+                "content": record["text"],
+                "data_type": "transcript",
+                "metadata": {
+                    "video_id": record["video_id"],
+                    "segment": record["segment"],
+                    "start": record["start"],
+                    "end": record["end"],
+                    "language": record.get("language"),
+                    "source_type": record.get("source_type"),
+                    "topic": query,
+                    "video_url": video_url(record["video_id"], record["start"]),
+                },
+            }
+            for record in records if record["text"]
+        ])
+        ingest.pop("results")
+
+        if self.incremental_transcripts and ingest["failed"] == 0:
+            rag_tool.mark_ingested(sidecar, start + len(text[:consumed].encode("utf-8")))
+        return ingest
+
+    def _transcribe_videos_in_parallel(self, videos: List[Dict[str, Any]], query: str) -> List[Dict[str, Any]]:
+        try:
+            results = self._yt_transcribe.run_many(
+                videos, topic=query, language_preference="en", max_workers=self.transcript_workers
+            )
+        except Exception as e:
+            return [{"video_id": v["video_id"], "status": "error", "error": str(e)} for v in videos]
+
+        return [
+            {
+                "video_id": t_data.get("video_id"),
+                "status": t_data.get("status", "unknown"),
+                "source": t_data.get("source_type", "n/a"),
+                "word_count": t_data.get("word_count", 0),
+            }
+            for t_data in results
+        ]
+
+    def _transcribe_videos(self, videos: List[Dict[str, Any]], query: str) -> List[Dict[str, Any]]:
         transcripts = []
         for v in videos:
             vid = v["video_id"]
@@ -118,12 +362,10 @@ class SearchAndEmbeddingTool(BaseTool):
                 )
             except Exception as e:
                 transcripts.append({"video_id": vid, "status": "error", "error": str(e)})
-                
-        transcript_file = f"output/transcriptions/transcript_{query}.txt"
-        rag_tool.add(transcript_file, data_type="text")
-        rag_added_status = True
-        
-        return {"videos": videos, "transcripts": transcripts,"rag_transcript_added": rag_added_status}
+        return transcripts
 
-# Create tool instance
-search_and_emb_tool = SearchAndEmbeddingTool()
+def __getattr__(name: str):
+    # Lazy module attribute: the shared instance is built by the registry on first use
+    if name == "search_and_emb_tool":
+        return registry.get("search_and_emb_tool")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,103 @@
+# tools/video_ranking.py
+"""
+Batch scoring of YouTube search candidates.
+Features (duration, age, views, engagement, title match) are parsed once
+per candidate and scored as numpy arrays across the whole candidate set.
+A semantic feature compares the topic with each title + description using
+the same MiniLM model as the RAG store, with vectors kept in the embedding
+cache so repeated candidates are not re-encoded.
+"""
+
+import re
+import hashlib
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+
+# Points per feature; the lexical title match gave up half its weight to semantic similarity
+WEIGHTS = {"title": 20.0, "semantic": 20.0, "views": 20.0, "engagement": 20.0, "duration": 10.0, "recency": 10.0}
+# MiniLM cosine similarity at which the semantic feature is saturated
+SEMANTIC_FULL_SCORE = 0.6
+
+ISO_DURATION = re.compile(r'PT(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?')
+
+
+def parse_duration(duration_str: str) -> int:
+    """Parse YouTube duration format (PT#H#M#S) to seconds"""
+    match = ISO_DURATION.match(duration_str or "")
+    if not match:
+        return 0
+    hours, minutes, seconds = (int(group or 0) for group in match.groups())
+    return hours * 3600 + minutes * 60 + seconds
+
+
+def extract_features(items: List[Dict[str, Any]], topic: str, now: Optional[datetime] = None) -> Dict[str, np.ndarray]:
+    """Parse every videos.list item once into per-feature arrays"""
+    now = now or datetime.now(timezone.utc)
+    topic_words = topic.lower().split()
+    titles = [item['snippet']['title'].lower() for item in items]
+    stats = [item.get('statistics', {}) for item in items]
+    return {
+        "duration": np.array([parse_duration(item['contentDetails']['duration']) for item in items], dtype=np.int64),
+        "days_old": np.array([
+            (now - datetime.fromisoformat(item['snippet']['publishedAt'].replace('Z', '+00:00'))).days
+            for item in items
+        ], dtype=np.int64),
+        "views": np.array([int(s.get('viewCount', 0)) for s in stats], dtype=np.float64),
+        "likes": np.array([int(s.get('likeCount', 0)) for s in stats], dtype=np.float64),
+        "comments": np.array([int(s.get('commentCount', 0)) for s in stats], dtype=np.float64),
+        "title_matches": np.array([sum(1 for word in topic_words if word in title) for title in titles],
+                                  dtype=np.float64) / max(1, len(topic_words)),
+    }
+
+
+def select(features: Dict[str, np.ndarray], mask: np.ndarray) -> Dict[str, np.ndarray]:
+    return {name: values[mask] for name, values in features.items()}
+
+
+def semantic_similarity(topic: str, items: List[Dict[str, Any]], model_name: str = EMBEDDING_MODEL) -> np.ndarray:
+    """Cosine similarity of the topic to each candidate's title + description"""
+    from tools.rag_adapter import get_embedding_model
+    from tools.embedding_cache import EmbeddingCache
+
+    texts = [topic] + [
+        f"{item['snippet']['title']}. {item['snippet'].get('description', '')[:500]}" for item in items
+    ]
+    hashes = [hashlib.sha256(text.encode("utf-8")).hexdigest() for text in texts]
+    cache = EmbeddingCache(model_name, settings="video-candidates")
+    cached = cache.get_many(hashes)
+    missing = [i for i, h in enumerate(hashes) if h not in cached]
+    if missing:
+        vectors = get_embedding_model(model_name).encode(
+            [texts[i] for i in missing], normalize_embeddings=True, convert_to_numpy=True, show_progress_bar=False,
+        )
+        fresh = {hashes[i]: np.asarray(vector, dtype=np.float32) for i, vector in zip(missing, vectors)}
+        cache.put_many(fresh)
+        cached.update(fresh)
+    matrix = np.stack([cached[h] for h in hashes])
+    return matrix[1:] @ matrix[0]
+
+
+def score_candidates(features: Dict[str, np.ndarray], similarity: Optional[np.ndarray] = None) -> np.ndarray:
+    """Relevance score (0-100) for every candidate at once"""
+    views = features["views"]
+    duration = features["duration"]
+    days_old = features["days_old"]
+
+    score = features["title_matches"] * WEIGHTS["title"]
+    if similarity is not None:
+        score += np.clip(similarity / SEMANTIC_FULL_SCORE, 0.0, 1.0) * WEIGHTS["semantic"]
+    score += np.where(views > 10000, np.minimum(WEIGHTS["views"], views / 50000), 0.0)
+    engagement = (features["likes"] + features["comments"] * 2) / np.maximum(views, 1.0)
+    score += np.where(views > 0, np.minimum(WEIGHTS["engagement"], engagement * 1_000_000), 0.0)
+    # Duration preference: 10-30 minutes, then 5-10, then longer
+    score += np.select(
+        [(duration >= 600) & (duration <= 1800), (duration >= 300) & (duration < 600), duration > 1800],
+        [WEIGHTS["duration"], WEIGHTS["duration"] * 0.7, WEIGHTS["duration"] * 0.5],
+        default=0.0,
+    )
+    score += np.select([days_old <= 7, days_old <= 30], [WEIGHTS["recency"], WEIGHTS["recency"] * 0.5], default=0.0)
+    return score
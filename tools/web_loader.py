@@ -0,0 +1,55 @@
+# tools/web_loader.py
+import re
+import time
+from typing import Union
+from bs4 import BeautifulSoup
+from requests.utils import get_encoding_from_headers
+from utils import http_client
+
+USER_AGENT = "Mozilla/5.0 (compatible; BlogResearchBot/1.0)"
+
+# Tags that never carry article text
+NOISE_TAGS = ["script", "style", "noscript", "nav", "header", "footer", "aside", "form"]
+
+
+def fetch_page_text(url: str, timeout: float = 15.0) -> str:
+    """
+    Download a web page within `timeout` seconds (total, not per read)
+    and return its readable text.
+    """
+    deadline = time.monotonic() + timeout
+    # Retries stop early enough to stay within the overall timeout
+    with http_client.get(url, headers={"User-Agent": USER_AGENT}, timeout=timeout, stream=True,
+                         deadline=deadline) as response:
+        response.raise_for_status()
+        body = []
+        for chunk in response.iter_content(chunk_size=65536):
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Fetching page took longer than {timeout}s")
+            body.append(chunk)
+        raw = b"".join(body)
+
+    return extract_text(decode_html(raw, response.headers.get("content-type", "")))
+
+
+def decode_html(raw: bytes, content_type: str) -> Union[str, bytes]:
+    """
+    Text in the charset declared by Content-Type. Without one, requests
+    would assume ISO-8859-1 for any text/* page, so the bytes are returned
+    as they are and BeautifulSoup reads <meta charset> (or detects it).
+    """
+    if "charset=" not in content_type.lower():
+        return raw
+    try:
+        return raw.decode(get_encoding_from_headers({"content-type": content_type}), errors="replace")
+    except LookupError:
+        # Unknown charset name
+        return raw
+
+
+def extract_text(html: Union[str, bytes]) -> str:
+    """Strip markup and boilerplate tags from an HTML document (text, or bytes in their declared encoding)"""
+    soup = BeautifulSoup(html, "html.parser")
+    for tag in soup(NOISE_TAGS):
+        tag.decompose()
+    return re.sub(r"\s+", " ", soup.get_text(" ", strip=True)).strip()
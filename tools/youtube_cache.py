@@ -0,0 +1,268 @@
+# tools/youtube_cache.py
+"""
+Quota-aware caching layer for the YouTube Data API.
+search.list costs 100 quota units and videos.list 1, against a daily quota
+(10,000 by default) that resets at midnight Pacific time. Search responses
+are cached with a TTL and video details per video_id; stale entries are
+revalidated with their ETag. A local quota ledger counts the units spent
+today, warns as the budget runs low and then serves stale results instead
+of spending more, so a run degrades instead of failing on quotaExceeded.
+"""
+
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from googleapiclient.errors import HttpError
+
+from utils.cache import DEFAULT_CACHE_PATH, FRESH, STALE, PersistentCache, cache_key, normalize_text
+from utils.tracing import span
+
+QUOTA_COSTS = {"search.list": 100, "videos.list": 1}
+DEFAULT_DAILY_QUOTA = 10_000
+
+
+class QuotaExceeded(Exception):
+    """The daily YouTube quota cannot cover a request"""
+
+
+def quota_day(now: Optional[datetime] = None) -> str:
+    """The quota day of `now`: YouTube quotas reset at midnight Pacific time"""
+    now = now or datetime.now(timezone.utc)
+    try:
+        from zoneinfo import ZoneInfo
+        return now.astimezone(ZoneInfo("America/Los_Angeles")).date().isoformat()
+    except Exception:
+        # No tz database available; UTC is off by at most a few hours
+        return now.astimezone(timezone.utc).date().isoformat()
+
+
+class QuotaLedger:
+    """Units spent per quota day and API method, kept next to the result cache"""
+
+    def __init__(self, daily_limit: Optional[int] = None, warn_fraction: Optional[float] = None,
+                 path: Optional[str] = None):
+        self.daily_limit = daily_limit or int(os.getenv("YOUTUBE_DAILY_QUOTA", DEFAULT_DAILY_QUOTA))
+        self.warn_fraction = warn_fraction or float(os.getenv("YOUTUBE_QUOTA_WARN_FRACTION", 0.8))
+        self.path = path or os.getenv("RESULT_CACHE_PATH", DEFAULT_CACHE_PATH)
+        self._lock = threading.Lock()
+        self._warned_day: Optional[str] = None
+
+        quota_dir = os.path.dirname(self.path)
+        if quota_dir:
+            os.makedirs(quota_dir, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS youtube_quota (
+                    day TEXT NOT NULL,
+                    method TEXT NOT NULL,
+                    requests INTEGER NOT NULL DEFAULT 0,
+                    units INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (day, method)
+                )
+            """)
+
+    def used(self, day: Optional[str] = None) -> int:
+        with self._connect() as conn:
+            row = conn.execute("SELECT COALESCE(SUM(units), 0) FROM youtube_quota WHERE day = ?",
+                               (day or quota_day(),)).fetchone()
+        return int(row[0])
+
+    def remaining(self) -> int:
+        return max(0, self.daily_limit - self.used())
+
+    def is_low(self) -> bool:
+        """Past the warning threshold: callers should prefer stale results over new requests"""
+        return self.used() >= self.daily_limit * self.warn_fraction
+
+    def reserve(self, method: str) -> None:
+        """Charge one request of `method` to today's quota, or raise QuotaExceeded"""
+        units = QUOTA_COSTS[method]
+        day = quota_day()
+        with self._lock:
+            used = self.used(day)
+            if used + units > self.daily_limit:
+                raise QuotaExceeded(
+                    f"{method} needs {units} units but only {self.daily_limit - used} of "
+                    f"{self.daily_limit} are left today"
+                )
+            self._charge(day, method, units)
+            used += units
+            if used >= self.daily_limit * self.warn_fraction and self._warned_day != day:
+                self._warned_day = day
+                print(f"⚠️ YouTube quota at {used / self.daily_limit:.0%} ({used:,}/{self.daily_limit:,} units); "
+                      "serving cached results where possible")
+
+    def exhaust(self) -> None:
+        """Record that the API itself reported quotaExceeded for today"""
+        day = quota_day()
+        with self._lock:
+            missing = self.daily_limit - self.used(day)
+            if missing > 0:
+                self._charge(day, "quotaExceeded", missing, requests=0)
+
+    def _charge(self, day: str, method: str, units: int, requests: int = 1) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO youtube_quota (day, method, requests, units) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(day, method) DO UPDATE SET requests = requests + excluded.requests, "
+                "units = units + excluded.units",
+                (day, method, requests, units),
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        day = quota_day()
+        with self._connect() as conn:
+            rows = conn.execute("SELECT method, requests, units FROM youtube_quota WHERE day = ? ORDER BY method",
+                                (day,)).fetchall()
+        used = sum(units for _, _, units in rows)
+        return {
+            "day": day,
+            "used": used,
+            "limit": self.daily_limit,
+            "remaining": max(0, self.daily_limit - used),
+            "methods": {method: {"requests": requests, "units": units} for method, requests, units in rows},
+        }
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+
+def _is_quota_error(error: HttpError) -> bool:
+    return error.resp.status == 403 and b"quotaExceeded" in (error.content or b"")
+
+
+def _execute(request: Any, etag: Optional[str]) -> Optional[Dict[str, Any]]:
+    """Execute a googleapiclient request, conditionally if `etag` is set; None means 304 Not Modified"""
+    if etag:
+        request.headers["If-None-Match"] = etag
+    try:
+        return request.execute()
+    except HttpError as e:
+        if etag and e.resp.status == 304:
+            return None
+        raise
+
+
+class YouTubeApiCache:
+    """Cached, quota-metered search.list and videos.list"""
+
+    def __init__(self, client: Callable[[], Any], ledger: Optional[QuotaLedger] = None,
+                 search_ttl_hours: Optional[float] = None, video_ttl_hours: Optional[float] = None,
+                 stale_hours: Optional[float] = None, path: Optional[str] = None):
+        self._client = client
+        self.ledger = ledger or QuotaLedger(path=path)
+        search_ttl = search_ttl_hours or float(os.getenv("YOUTUBE_SEARCH_CACHE_TTL_HOURS", 12))
+        video_ttl = video_ttl_hours or float(os.getenv("YOUTUBE_VIDEO_CACHE_TTL_HOURS", 24))
+        # Past the TTL an entry is revalidated; within the stale window it is also the fallback on low quota
+        stale = stale_hours or float(os.getenv("YOUTUBE_CACHE_STALE_HOURS", 7 * 24))
+        self.searches = PersistentCache("youtube_search", search_ttl * 3600, stale * 3600, path=path)
+        self.videos = PersistentCache("youtube_videos", video_ttl * 3600, stale * 3600, path=path)
+
+    # ------------------------------------------------------------------ #
+    def search(self, **params: Any) -> Dict[str, Any]:
+        """search.list with `params`; raises QuotaExceeded when neither quota nor a cached result is left"""
+        # Only the free-text query is case/space-insensitive; page tokens and ids are not
+        key = cache_key("search.list", *(
+            f"{name}={normalize_text(params[name]) if name == 'q' else params[name]}" for name in sorted(params)
+        ), normalize=False)
+        cached, state, meta = self.searches.lookup(key)
+        if state == FRESH:
+            self.searches.record("hits")
+            return cached
+        if state == STALE and self.ledger.is_low():
+            self.searches.record("stale_hits")
+            return cached
+
+        try:
+            self.ledger.reserve("search.list")
+            etag = meta.get("etag") if state == STALE else None
+            with span("youtube_api:search.list", "http", query=params.get("q", ""), conditional=bool(etag)) as s:
+                response = _execute(self._client().search().list(**params), etag)
+                s.set(not_modified=response is None)
+        except (QuotaExceeded, HttpError) as e:
+            if isinstance(e, HttpError):
+                if not _is_quota_error(e):
+                    raise
+                self.ledger.exhaust()
+            if state == STALE:
+                print(f"⚠️ YouTube quota exhausted, using cached search results for '{params.get('q', '')}'")
+                self.searches.record("stale_hits")
+                return cached
+            raise QuotaExceeded(str(e)) from e
+
+        if response is None:
+            self.searches.touch(key)
+            self.searches.record("revalidated")
+            return cached
+        self.searches.record("misses")
+        self.searches.put(key, response, {"etag": response.get("etag")})
+        return response
+
+    def video_details(self, video_ids: List[str], part: str) -> List[Dict[str, Any]]:
+        """
+        videos.list items for `video_ids`, in that order. Only ids without a
+        fresh entry are requested, in one call; videos that cannot be fetched
+        on an exhausted quota fall back to stale entries or are left out.
+        """
+        items: Dict[str, Dict[str, Any]] = {}
+        stale: Dict[str, Tuple[Dict[str, Any], Dict[str, Any]]] = {}
+        for video_id in video_ids:
+            item, state, meta = self.videos.lookup(cache_key("videos.list", part, video_id, normalize=False))
+            if state == FRESH:
+                self.videos.record("hits")
+                items[video_id] = item
+            elif state == STALE:
+                stale[video_id] = (item, meta)
+        missing = [video_id for video_id in video_ids if video_id not in items]
+
+        if missing:
+            self._fetch_videos(missing, part, stale, items)
+        return [items[video_id] for video_id in video_ids if video_id in items]
+
+    def _fetch_videos(self, missing: List[str], part: str,
+                      stale: Dict[str, Tuple[Dict[str, Any], Dict[str, Any]]],
+                      items: Dict[str, Dict[str, Any]]) -> None:
+        # A list ETag only covers the exact id set it was returned for
+        list_key = cache_key("videos.list", part, *sorted(missing), normalize=False)
+        etag = None
+        if len(stale) == len(missing) and all(meta.get("list_key") == list_key for _, meta in stale.values()):
+            etag = stale[missing[0]][1].get("list_etag")
+
+        try:
+            self.ledger.reserve("videos.list")
+            with span("youtube_api:videos.list", "http", video_ids=len(missing), conditional=bool(etag)) as s:
+                response = _execute(self._client().videos().list(part=part, id=",".join(missing)), etag)
+                s.set(not_modified=response is None)
+        except (QuotaExceeded, HttpError) as e:
+            if isinstance(e, HttpError):
+                if not _is_quota_error(e):
+                    raise
+                self.ledger.exhaust()
+            print(f"⚠️ YouTube quota exhausted, using cached details for {len(stale)}/{len(missing)} videos")
+            for video_id, (item, _) in stale.items():
+                self.videos.record("stale_hits")
+                items[video_id] = item
+            return
+
+        if response is None:
+            for video_id, (item, _) in stale.items():
+                self.videos.touch(cache_key("videos.list", part, video_id, normalize=False))
+                self.videos.record("revalidated")
+                items[video_id] = item
+            return
+
+        meta = {"list_key": list_key, "list_etag": response.get("etag")}
+        for item in response.get("items", []):
+            self.videos.record("misses")
+            self.videos.put(cache_key("videos.list", part, item["id"], normalize=False), item, meta)
+            items[item["id"]] = item
@@ -7,28 +7,220 @@ Falls back to video description when transcripts are unavailable
 import os
 import json
 import re
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional, ClassVar
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple, ClassVar
 from collections import Counter
-from pydantic import Field
+import numpy as np
+from pydantic import Field, PrivateAttr
 from crewai.tools import BaseTool
 from googleapiclient.discovery import build
-from textwrap import wrap
 from youtube_transcript_api import YouTubeTranscriptApi, TranscriptsDisabled, NoTranscriptFound
+from utils.tracing import span, propagate
+from tools.youtube_cache import YouTubeApiCache, QuotaExceeded
+from tools.video_ranking import EMBEDDING_MODEL, extract_features, score_candidates, select, semantic_similarity
+
+TRANSCRIPT_BLOCK = re.compile(r'===== BEGIN TRANSCRIPT =====\n(.*?)\n===== END TRANSCRIPT =====\n', re.DOTALL)
+HEADER_FIELDS = {'Video ID': 'video_id', 'Language': 'language', 'Source': 'source_type', 'Saved At': 'saved_at'}
+
+
+def parse_transcript_blocks(text: str) -> tuple:
+    """
+    Split the contents of a transcript file into per-video blocks.
+    Returns (blocks, consumed) where `consumed` is the number of characters up
+    to the end of the last complete block, so a partially written block is
+    picked up on the next read.
+    """
+    blocks = []
+    consumed = 0
+    for match in TRANSCRIPT_BLOCK.finditer(text):
+        block: Dict[str, Any] = {}
+        body = []
+        for line in match.group(1).split('\n'):
+            key, _, value = line.partition(': ')
+            if not body and key in HEADER_FIELDS and HEADER_FIELDS[key] not in block:
+                block[HEADER_FIELDS[key]] = value.strip()
+            elif line.strip():
+                body.append(line.strip())
+        block['text'] = ' '.join(body)
+        blocks.append(block)
+        consumed = match.end()
+    return blocks, consumed
+
+
+BLOCK_FOOTER = "\n===== END TRANSCRIPT =====\n\n"
+# Bracketed annotations such as [Music] or [Applause]
+ANNOTATION = re.compile(r'\[[^\[\]]*\]')
+# An unclosed '[' longer than this is treated as text, not as an annotation
+MAX_ANNOTATION_CHARS = 200
+
+
+# (text, start seconds, end seconds); times are None for text without captions
+TimedText = Tuple[str, Optional[float], Optional[float]]
+SENTENCE_END = re.compile(r'[.!?]["\')\]]*$')
+
+
+def clean_timed_words(snippets: Iterable[TimedText]) -> Iterator[TimedText]:
+    """
+    Yield the words of timed transcript snippets with bracketed annotations
+    removed. Annotations split across snippets are joined first, so only a
+    short unclosed tail is ever carried over (keeping the time it started at).
+    """
+    carry, carry_start = "", None
+    for piece, start, end in snippets:
+        if carry:
+            text, start = f"{carry} {piece}", carry_start
+        else:
+            text = piece
+        carry = ""
+        text = ANNOTATION.sub('', text)
+        open_at = text.rfind('[')
+        if open_at != -1 and len(text) - open_at <= MAX_ANNOTATION_CHARS:
+            text, carry, carry_start = text[:open_at], text[open_at:], start
+        for word in text.split():
+            yield word, start, end
+    for word in carry.split():
+        yield word, carry_start, None
+
+
+def clean_transcript_words(pieces: Iterable[str]) -> Iterator[str]:
+    """Words of untimed transcript pieces with bracketed annotations removed"""
+    return (word for word, _, _ in clean_timed_words((piece, None, None) for piece in pieces))
+
+
+def sentence_segments(words: Iterable[TimedText], max_chars: int) -> Iterator[Dict[str, Any]]:
+    """
+    Group timed words into segments of whole sentences of at most `max_chars`
+    characters, each with the start of its first and the end of its last
+    word. A sentence longer than a segment (or unpunctuated auto-generated
+    captions) is split on a word boundary, and a single word longer than a
+    segment is split into pieces.
+    """
+    segment: List[TimedText] = []
+    length = 0
+    boundary = 0  # words in `segment` up to the last sentence end
+    for word in _split_long_words(words, max_chars):
+        # The words left after a cut at a sentence end may still not leave room for `word`
+        while segment and length + 1 + len(word[0]) > max_chars:
+            cut = boundary or len(segment)
+            yield _segment(segment[:cut])
+            segment = segment[cut:]
+            length = sum(len(w[0]) for w in segment) + max(0, len(segment) - 1)
+            boundary = 0
+        length += len(word[0]) + (1 if segment else 0)
+        segment.append(word)
+        if SENTENCE_END.search(word[0]):
+            boundary = len(segment)
+    if segment:
+        yield _segment(segment)
+
+
+def _split_long_words(words: Iterable[TimedText], max_chars: int) -> Iterator[TimedText]:
+    for text, start, end in words:
+        if len(text) <= max_chars:
+            yield text, start, end
+            continue
+        for offset in range(0, len(text), max_chars):
+            yield text[offset:offset + max_chars], start, end
+
+
+def _segment(words: List[TimedText]) -> Dict[str, Any]:
+    starts = [start for _, start, _ in words if start is not None]
+    ends = [end for _, _, end in words if end is not None]
+    return {
+        'text': " ".join(word for word, _, _ in words),
+        'start': round(starts[0], 2) if starts else None,
+        'end': round(ends[-1], 2) if ends else None,
+    }
+
+
+def video_url(video_id: str, start: Optional[float] = None) -> str:
+    """Watch URL, jumping to `start` seconds when given"""
+    url = f"https://www.youtube.com/watch?v={video_id}"
+    return f"{url}&t={int(start)}s" if start else url
+
+
+def segments_path(transcript_file: str) -> str:
+    """JSONL sidecar with the timed segments of a topic transcript file"""
+    return f"{os.path.splitext(transcript_file)[0]}.segments.jsonl"
+
+
+def wrap_words(words: Iterable[str], width: int) -> Iterator[str]:
+    """Join words into lines of at most `width` characters (textwrap.wrap, streamed, no hyphen breaks)"""
+    line: List[str] = []
+    length = 0
+    for word in words:
+        space_left = width - (length + 1 if line else 0)
+        if len(word) <= space_left:
+            line.append(word)
+            length = width - space_left + len(word)
+            continue
+        if len(word) > width:
+            # Words longer than a line fill the current line and are then broken, as textwrap does
+            if space_left > 0:
+                line.append(word[:space_left])
+                word = word[space_left:]
+            if line:
+                yield " ".join(line)
+            while len(word) > width:
+                yield word[:width]
+                word = word[width:]
+        elif line:
+            yield " ".join(line)
+        line, length = ([word], len(word)) if word else ([], 0)
+    if line:
+        yield " ".join(line)
+
 
 class YouTubeSearchTool(BaseTool):
     name: str = "YouTube Video Search"
     description: str = "Search for the latest YouTube videos on a specific topic with quality filtering"
     api_key: Optional[str] = Field(default=None, exclude=True)
     youtube: Optional[Any] = Field(default=None, exclude=True)
+    # search.list videoDuration: 'any', 'short' (<4 min), 'medium' (4-20 min) or 'long' (>20 min)
+    video_duration: str = Field(default_factory=lambda: os.getenv('YOUTUBE_VIDEO_DURATION', 'medium'), exclude=True)
+    # Candidates fetched per search and re-ranked; only the best `max_results` are returned
+    candidate_pool: int = Field(default=50, exclude=True)
+    # Add MiniLM topic/title+description similarity to the ranking features
+    semantic_ranking: bool = Field(default=True, exclude=True)
+    embedding_model: str = Field(default=EMBEDDING_MODEL, exclude=True)
+    _thread_clients: threading.local = PrivateAttr(default_factory=threading.local)
+    _api: Optional[YouTubeApiCache] = PrivateAttr(default=None)
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.api_key = os.getenv('YOUTUBE_API_KEY')
         if not self.api_key:
             raise ValueError("YOUTUBE_API_KEY environment variable is required")
-        self.youtube = build('youtube', 'v3', developerKey=self.api_key)
-        
+
+    def _client(self) -> Any:
+        """
+        YouTube Data API client, built on first search (discovery is slow).
+        httplib2 is not thread-safe, so concurrent flows each get their own client.
+        """
+        if self.youtube is not None:
+            return self.youtube
+        client = getattr(self._thread_clients, "youtube", None)
+        if client is None:
+            # YOUTUBE_API_BASE points the client at another endpoint (e.g. a local stand-in)
+            api_base = os.getenv('YOUTUBE_API_BASE')
+            client_options = {'api_endpoint': api_base} if api_base else None
+            client = build('youtube', 'v3', developerKey=self.api_key, client_options=client_options)
+            self._thread_clients.youtube = client
+        return client
+
+    def _cached_api(self) -> YouTubeApiCache:
+        """Quota-metered, cached access to search.list and videos.list"""
+        if self._api is None:
+            self._api = YouTubeApiCache(self._client)
+        return self._api
+
+    def quota_stats(self) -> Dict[str, Any]:
+        return self._cached_api().ledger.stats()
+
     def _run(self, topic: str, max_results: int = 10, days_back: int = 90) -> str:
         """
         Search for YouTube videos on a specific topic
@@ -42,24 +234,32 @@ class YouTubeSearchTool(BaseTool):
             JSON string with video information including descriptions
         """
         try:
-            # Calculate date for filtering recent videos
+            # Calculate date for filtering recent videos; whole days keep the search cache key stable
             cutoff_date = datetime.now() - timedelta(days=days_back)
-            published_after = cutoff_date.isoformat() + 'Z'
+            published_after = cutoff_date.strftime('%Y-%m-%dT00:00:00Z')
             
-            # Search for videos
-            search_response = self.youtube.search().list( # type: ignore
-                q=topic,
-                part='snippet',
-                type='video',
-                order='relevance',
-                maxResults=min(max_results, 50),
-                publishedAfter=published_after,
-                videoDuration='medium',
-                videoDefinition='high',
-                safeSearch='moderate'
-            ).execute()
+            # Search a wide candidate pool (search.list costs the same for 5 or 50 results)
+            try:
+                search_response = self._cached_api().search(
+                    q=topic,
+                    part='snippet',
+                    type='video',
+                    order='relevance',
+                    maxResults=min(max(max_results, self.candidate_pool), 50),
+                    publishedAfter=published_after,
+                    videoDuration=self.video_duration,
+                    videoDefinition='high',
+                    safeSearch='moderate'
+                )
+            except QuotaExceeded as e:
+                return json.dumps({
+                    'search_query': topic,
+                    'total_found': 0,
+                    'search_date': datetime.now().isoformat(),
+                    'videos': [],
+                    'message': f'YouTube quota exhausted, skipping video search: {e}'
+                })
             
-            videos = []
             video_ids = [item['id']['videoId'] for item in search_response['items']]
             
             if not video_ids:
@@ -71,19 +271,31 @@ class YouTubeSearchTool(BaseTool):
                     'message': 'No videos found for this topic'
                 })
             
-            # Get additional video details
-            videos_response = self.youtube.videos().list( # type: ignore
-                part='snippet,statistics,contentDetails',
-                id=','.join(video_ids)
-            ).execute()
+            # Get additional video details (cached per video; one videos.list call for up to 50 ids)
+            video_items = self._cached_api().video_details(video_ids, part='snippet,statistics,contentDetails')
             
-            for item in videos_response['items']:
-                # Parse duration
-                duration = self._parse_duration(item['contentDetails']['duration'])
-                
-                # Filter for videos with substantial content (at least 5 minutes)
-                if duration < 300:
-                    continue
+            # Parse every candidate once, then drop videos under 5 minutes
+            features = extract_features(video_items, topic)
+            keep = features['duration'] >= 300
+            features = select(features, keep)
+            video_items = [item for item, kept in zip(video_items, keep) if kept]
+            if not video_items:
+                return json.dumps({
+                    'search_query': topic,
+                    'total_found': 0,
+                    'search_date': datetime.now().isoformat(),
+                    'videos': [],
+                    'message': 'No videos with substantial content found for this topic'
+                })
+            
+            # Score the whole candidate set at once and keep the best `max_results`
+            scores = score_candidates(features, self._semantic_similarity(topic, video_items))
+            top = np.argsort(-scores, kind='stable')[:max_results]
+            
+            videos = []
+            for index in top:
+                item = video_items[index]
+                duration = int(features['duration'][index])
                 
                 # Get full description (not truncated)
                 full_description = item['snippet'].get('description', '')
@@ -98,21 +310,19 @@ class YouTubeSearchTool(BaseTool):
                     'channel_id': item['snippet']['channelId'],
                     'duration_seconds': duration,
                     'duration_formatted': self._format_duration(duration),
-                    'view_count': int(item['statistics'].get('viewCount', 0)),
-                    'like_count': int(item['statistics'].get('likeCount', 0)),
-                    'comment_count': int(item['statistics'].get('commentCount', 0)),
+                    'view_count': int(features['views'][index]),
+                    'like_count': int(features['likes'][index]),
+                    'comment_count': int(features['comments'][index]),
                     'thumbnail_url': item['snippet']['thumbnails'].get('high', {}).get('url', ''),
                     'video_url': f"https://www.youtube.com/watch?v={item['id']}",
-                    'relevance_score': self._calculate_relevance_score(item, topic)
+                    'relevance_score': round(float(scores[index]), 2)
                 }
                 videos.append(video_data)
             
-            # Sort by relevance score
-            videos.sort(key=lambda x: x['relevance_score'], reverse=True)
-            
             return json.dumps({
                 'search_query': topic,
                 'total_found': len(videos),
+                'candidates_considered': len(video_items),
                 'search_date': datetime.now().isoformat(),
                 'videos': videos
             }, indent=2)
@@ -123,18 +333,6 @@ class YouTubeSearchTool(BaseTool):
                 'search_query': topic
             })
     
-    def _parse_duration(self, duration_str: str) -> int:
-        """Parse YouTube duration format (PT#M#S) to seconds"""
-        match = re.match(r'PT(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?', duration_str)
-        if not match:
-            return 0
-        
-        hours = int(match.group(1) or 0)
-        minutes = int(match.group(2) or 0)
-        seconds = int(match.group(3) or 0)
-        
-        return hours * 3600 + minutes * 60 + seconds
-    
     def _format_duration(self, seconds: int) -> str:
         """Format seconds to HH:MM:SS or MM:SS"""
         hours = seconds // 3600
@@ -145,47 +343,17 @@ class YouTubeSearchTool(BaseTool):
             return f"{hours:02d}:{minutes:02d}:{secs:02d}"
         else:
             return f"{minutes:02d}:{secs:02d}"
-    
-    def _calculate_relevance_score(self, video_item: Dict, topic: str) -> float:
-        """Calculate relevance score for ranking videos"""
-        score = 0.0
-        
-        # Title relevance (40% weight)
-        title = video_item['snippet']['title'].lower()
-        topic_words = topic.lower().split()
-        title_matches = sum(1 for word in topic_words if word in title)
-        score += (title_matches / len(topic_words)) * 40
-        
-        # View count factor (20% weight)
-        view_count = int(video_item['statistics'].get('viewCount', 0))
-        if view_count > 10000:
-            score += min(20, view_count / 50000)
-        
-        # Engagement rate (20% weight)
-        likes = int(video_item['statistics'].get('likeCount', 0))
-        comments = int(video_item['statistics'].get('commentCount', 0))
-        if view_count > 0:
-            engagement_rate = (likes + comments * 2) / view_count
-            score += min(20, engagement_rate * 1000000)
-        
-        # Duration preference (10% weight)
-        duration = self._parse_duration(video_item['contentDetails']['duration'])
-        if 600 <= duration <= 1800:  # 10-30 minutes
-            score += 10
-        elif 300 <= duration < 600:  # 5-10 minutes
-            score += 7
-        elif duration > 1800:  # > 30 minutes
-            score += 5
-        
-        # Recency bonus (10% weight)
-        published_date = datetime.fromisoformat(video_item['snippet']['publishedAt'].replace('Z', '+00:00'))
-        days_old = (datetime.now().replace(tzinfo=published_date.tzinfo) - published_date).days
-        if days_old <= 7:
-            score += 10
-        elif days_old <= 30:
-            score += 5
-        
-        return score
+
+    def _semantic_similarity(self, topic: str, video_items: List[Dict[str, Any]]) -> Optional[np.ndarray]:
+        """Topic vs title + description similarity, or None to rank on the other features only"""
+        if not self.semantic_ranking:
+            return None
+        try:
+            with span("video_rerank_embedding", "embedding", candidates=len(video_items)):
+                return semantic_similarity(topic, video_items, self.embedding_model)
+        except Exception as e:
+            print(f"⚠️ Semantic re-ranking unavailable, using metadata only: {e}")
+            return None
 
 
 class YouTubeTranscriptTool(BaseTool):
@@ -194,115 +362,269 @@ class YouTubeTranscriptTool(BaseTool):
 
     # Use ClassVar for class-level constants
     OUTPUT_DIR: str = "output/transcriptions"
+    # Transcript lines are wrapped at this width for better RAG indexing
+    LINE_WIDTH: ClassVar[int] = 400
+    # Timed segments stay within the RAG chunk size, so each is embedded whole
+    SEGMENT_MAX_CHARS: ClassVar[int] = 1000
+    # Serializes appends to the shared per-topic transcript file
+    _file_lock: ClassVar[threading.Lock] = threading.Lock()
 
     def _run(self, video_id: str, video_description: str = "", language_preference: str = 'en',topic: str = "default") -> str:
         """
         Extract the FULL transcript from a YouTube video and save it to output/transcriptions.txt.
         Returns simple status information.
         """
-        transcript_file = f"output/transcriptions/transcript_{topic}.txt"
+        transcript = self._extract_transcript(video_id, video_description, language_preference)
+        return self._save_and_report(transcript, topic)
+
+    def run_many(self, videos: List[Dict[str, Any]], topic: str = "default", language_preference: str = 'en', max_workers: int = 4) -> List[Dict[str, Any]]:
+        """
+        Extract transcripts for several videos with a bounded worker pool.
+        Blocks are written in the order of `videos`, so the transcript file is
+        identical to calling `_run` for each video in sequence.
+        """
+        if not videos:
+            return []
+
+        def extract(video: Dict[str, Any]) -> Dict[str, Any]:
+            return self._extract_transcript(video["video_id"], video.get("description", ""), language_preference)
 
+        results: List[Dict[str, Any]] = []
+        futures: list = []
+        pool = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(videos))))
         try:
-            full_text = ""
-            source_type = ""
-            language_code = language_preference
-            
+            futures = [pool.submit(propagate(extract), video) for video in videos]
+            # Consumed in input order; each block is written as soon as its predecessors are
+            for future in futures:
+                results.append(json.loads(self._save_and_report(future.result(), topic)))
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+            # Part files of transcripts that were extracted but never appended
+            for future in futures[len(results):]:
+                if not future.cancelled() and future.exception() is None:
+                    self._remove_parts(future.result())
+        return results
+
+    def _extract_transcript(self, video_id: str, video_description: str, language_preference: str) -> Dict[str, Any]:
+        """
+        Fetch a transcript and stream its cleaned segments to part files. A
+        failure is kept in `error` and reported by `_save_and_report`.
+        """
+        with span("transcript_fetch", "http", video_id=video_id) as s:
+            transcript = self._fetch_transcript(video_id, video_description, language_preference)
             try:
-                # Initialize YouTubeTranscriptApi and get transcript list
-                ytt_api = YouTubeTranscriptApi()
-                transcript_list = ytt_api.list(video_id)
-
-                # Try to find transcript in preferred language
-                try:
-                    transcript = transcript_list.find_transcript([language_preference])
-                    fetched_transcript = transcript.fetch()
-                    source_type = "manual" if not transcript.is_generated else "auto-generated"
-                    transcript_data = fetched_transcript.to_raw_data()
-                    language_code = getattr(transcript, "language_code", language_preference)
-                except:
-                    # Fallback to any available English transcript
-                    languages = ['en', 'en-US', 'en-GB', 'en-CA', 'en-AU']
-                    transcript = transcript_list.find_generated_transcript(languages)
-                    fetched_transcript = transcript.fetch()
-                    transcript_data = fetched_transcript.to_raw_data()
-                    source_type = "auto-generated"
-                    language_code = getattr(transcript, "language_code", "en")
-
-                # Extract raw full text
-                full_text = ' '.join([item.get('text', '') for item in transcript_data]).strip()
-                
-                # Clean up the text slightly (remove bracketed annotations)
-                full_text = re.sub(r'\[\s*.*?\s*\]', '', full_text)
-                full_text = re.sub(r'\s+', ' ', full_text).strip()
+                transcript.update(self._write_parts(transcript.pop('snippets'), transcript))
+            except Exception as e:
+                transcript['error'] = str(e)
+                s.set(error=str(e))
+                return transcript
+            s.set(source_type=transcript['source_type'], words=transcript['word_count'],
+                  segments=transcript['segment_count'])
+        return transcript
+
+    def _fetch_transcript(self, video_id: str, video_description: str, language_preference: str) -> Dict[str, Any]:
+        """
+        Fetch a transcript (as an iterable of timed snippets), falling back to
+        the video description. fetch() downloads the whole transcript at once
+        (the API has no streaming); only cleaning and writing are incremental.
+        """
+        try:
+            # Initialize YouTubeTranscriptApi and get transcript list
+            ytt_api = YouTubeTranscriptApi()
+            transcript_list = ytt_api.list(video_id)
+
+            # Try to find transcript in preferred language
+            try:
+                transcript = transcript_list.find_transcript([language_preference])
+                fetched_transcript = transcript.fetch()
+                source_type = "manual" if not transcript.is_generated else "auto-generated"
+                language_code = getattr(transcript, "language_code", language_preference)
+            except:
+                # Fallback to any available English transcript
+                languages = ['en', 'en-US', 'en-GB', 'en-CA', 'en-AU']
+                transcript = transcript_list.find_generated_transcript(languages)
+                fetched_transcript = transcript.fetch()
+                source_type = "auto-generated"
+                language_code = getattr(transcript, "language_code", "en")
+
+            # Snippets are consumed one at a time; no joined or cleaned copy of the full text is built
+            snippets = ((snippet.text, snippet.start, snippet.start + snippet.duration) for snippet in fetched_transcript)
+
+        except (TranscriptsDisabled, NoTranscriptFound, Exception):
+            # Fallback: use video description if no transcript available
+            snippets = [(video_description or "(No transcript or description available)", None, None)]
+            source_type = "description-fallback"
+            language_code = "n/a"
 
-            except (TranscriptsDisabled, NoTranscriptFound, Exception):
-                # Fallback: use video description if no transcript available
-                full_text = video_description or "(No transcript or description available)"
-                source_type = "description-fallback"
-                language_code = "n/a"
+        return {
+            'video_id': video_id,
+            'video_description': video_description,
+            'snippets': snippets,
+            'language_code': language_code,
+            'source_type': source_type,
+        }
+
+    def _write_parts(self, snippets: Iterable[TimedText], transcript: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Clean transcript snippets into sentence-aligned segments as they are
+        iterated and write them to two temporary part files: wrapped lines for
+        the transcript text file and one JSON record per segment (with
+        video_id, start/end time and source_type) for the segments sidecar.
+        Cleaning and writing hold one segment at a time (the fetched snippets
+        themselves are already in memory).
+        """
+        os.makedirs(self.OUTPUT_DIR, exist_ok=True)
+        video_id = transcript['video_id']
+        part_path = self._part_file(video_id, ".part")
+        segments_part_path = self._part_file(video_id, ".segments.part")
+        word_count = segment_count = 0
+        try:
+            with open(part_path, "w", encoding="utf-8") as part, \
+                    open(segments_part_path, "w", encoding="utf-8") as segments_part:
+                for segment in sentence_segments(clean_timed_words(snippets), self.SEGMENT_MAX_CHARS):
+                    words = segment['text'].split()
+                    word_count += len(words)
+                    segment_count += 1
+                    for line in wrap_words(words, self.LINE_WIDTH):
+                        part.write(line + "\n")
+                    record = {
+                        'video_id': video_id,
+                        'segment': segment_count - 1,
+                        'start': segment['start'],
+                        'end': segment['end'],
+                        'source_type': transcript['source_type'],
+                        'language': transcript['language_code'],
+                        'text': segment['text'],
+                    }
+                    segments_part.write(json.dumps(record, ensure_ascii=False) + "\n")
+        except Exception:
+            for path in (part_path, segments_part_path):
+                os.remove(path)
+            raise
+        return {'part_path': part_path, 'segments_part_path': segments_part_path,
+                'word_count': word_count, 'segment_count': segment_count}
+
+    def _part_file(self, video_id: str, suffix: str) -> str:
+        fd, path = tempfile.mkstemp(prefix=f"{video_id}-", suffix=suffix, dir=self.OUTPUT_DIR)
+        os.close(fd)
+        return path
+
+    def _save_and_report(self, transcript: Dict[str, Any], topic: str) -> str:
+        """Append an extracted transcript to the topic file and return the JSON status"""
+        transcript_file = f"output/transcriptions/transcript_{topic}.txt"
+        video_id = transcript['video_id']
+
+        try:
+            if 'error' in transcript:
+                # Extraction failed: written as an error-fallback block below
+                raise RuntimeError(transcript['error'])
 
             # Save the full transcript
-            self._save_full_transcript(
+            self._append_block(
                 video_id=video_id,
-                full_text=full_text,
-                language_code=language_code,
-                source_type=source_type,
-                file_path=transcript_file.format(topic=topic)
+                part_path=transcript['part_path'],
+                segments_part_path=transcript['segments_part_path'],
+                language_code=transcript['language_code'],
+                source_type=transcript['source_type'],
+                file_path=transcript_file
             )
 
             # Return simple status
-            word_count = len(full_text.split()) if full_text else 0
             return json.dumps({
                 'video_id': video_id,
                 'status': 'success',
-                'source_type': source_type,
-                'language': language_code,
-                'word_count': word_count,
-                'saved_to': transcript_file.format(topic=topic),
+                'source_type': transcript['source_type'],
+                'language': transcript['language_code'],
+                'word_count': transcript['word_count'],
+                'segment_count': transcript['segment_count'],
+                'saved_to': transcript_file,
                 'timestamp': datetime.now().isoformat()
             }, indent=2)
 
         except Exception as e:
             # Final fallback on any other error
-            fallback_text = f"(Error occurred) {str(e)}\n\n{video_description or ''}".strip()
+            fallback_text = f"(Error occurred) {str(e)}\n\n{transcript['video_description'] or ''}".strip()
             self._save_full_transcript(
                 video_id=video_id,
                 full_text=fallback_text,
                 language_code="n/a",
                 source_type="error-fallback",
-                file_path=transcript_file.format(topic=topic)
+                file_path=transcript_file,
+                error=str(e),
             )
             return json.dumps({
                 'video_id': video_id,
                 'status': 'error',
                 'error': str(e),
                 'source_type': 'error-fallback',
-                'saved_to': transcript_file.format(topic=topic),
+                'saved_to': transcript_file,
                 'timestamp': datetime.now().isoformat()
             })
+        finally:
+            self._remove_parts(transcript)
 
-    def _save_full_transcript(self, video_id: str, full_text: str, language_code: str, source_type: str,file_path: str) -> None:
-        """
-        Append the full transcript to output/transcriptions.txt with clear delimiters.
-        Splits transcript into smaller chunks for better RAG indexing.
-        """
-        os.makedirs(self.OUTPUT_DIR, exist_ok=True)         
-        timestamp = datetime.now().isoformat()
+    @staticmethod
+    def _remove_parts(transcript: Dict[str, Any]) -> None:
+        for key in ('part_path', 'segments_part_path'):
+            path = transcript.get(key)
+            if path and os.path.exists(path):
+                os.remove(path)
+
+    def _block_header(self, video_id: str, language_code: str, source_type: str) -> str:
         header = [
             "===== BEGIN TRANSCRIPT =====",
             f"Video ID: {video_id}",
             f"Language: {language_code}",
             f"Source: {source_type}",
-            f"Saved At: {timestamp}",
+            f"Saved At: {datetime.now().isoformat()}",
             ""
         ]
-        footer = ["", "===== END TRANSCRIPT =====", ""]
+        return "\n".join(header)
+
+    def _append_block(self, video_id: str, part_path: str, segments_part_path: str, language_code: str,
+                      source_type: str, file_path: str) -> None:
+        """
+        Append streamed part files to the topic transcript file (as one
+        delimited block) and to its segments sidecar. Both are copied in
+        fixed-size chunks under a lock, so parallel extractions never interleave.
+        """
+        os.makedirs(self.OUTPUT_DIR, exist_ok=True)
+        with self._file_lock:
+            with open(file_path, "a", encoding="utf-8") as f, open(part_path, "r", encoding="utf-8") as part:
+                f.write(self._block_header(video_id, language_code, source_type))
+                shutil.copyfileobj(part, f, length=1 << 16)
+                f.write(BLOCK_FOOTER)
+            with open(segments_path(file_path), "a", encoding="utf-8") as f, \
+                    open(segments_part_path, "r", encoding="utf-8") as part:
+                shutil.copyfileobj(part, f, length=1 << 16)
 
-        # 🔑 Split transcript into smaller chunks (e.g., 400 characters per line)
-        chunks = wrap(full_text, width=400)
+    def _save_full_transcript(self, video_id: str, full_text: str, language_code: str, source_type: str,file_path: str,
+                              error: Optional[str] = None) -> None:
+        """
+        Append an in-memory transcript (e.g. an error fallback) to the topic
+        file, split into lines of at most LINE_WIDTH characters for better RAG
+        indexing, and as one untimed record to its segments sidecar. Both are
+        written under the lock, so they stay in step with streamed blocks.
+        """
+        os.makedirs(self.OUTPUT_DIR, exist_ok=True)
+        words = full_text.split()
+        block = self._block_header(video_id, language_code, source_type)
+        block += "".join(line + "\n" for line in wrap_words(words, self.LINE_WIDTH))
+        block += BLOCK_FOOTER
+        record = {
+            'video_id': video_id,
+            'segment': 0,
+            'start': None,
+            'end': None,
+            'source_type': source_type,
+            'language': language_code,
+            'text': " ".join(words),
+        }
+        if error is not None:
+            record['error'] = error
 
-        with open(file_path, "a", encoding="utf-8") as f:
-            f.write("\n".join(header))
-            for chunk in chunks:
-                f.write(chunk.strip() + "\n")
-            f.write("\n".join(footer) + "\n")
\ No newline at end of file
+        with self._file_lock:
+            with open(file_path, "a", encoding="utf-8") as f:
+                f.write(block)
+            with open(segments_path(file_path), "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
@@ -0,0 +1,209 @@
+# utils/cache.py
+"""
+Persistent TTL cache for external API results.
+Entries are JSON values in a local SQLite file, grouped by cache name and
+keyed by a hash of the request parameters. Fresh entries are served
+directly; entries past their TTL but inside the stale window are served at
+once while a background refresh replaces them (stale-while-revalidate).
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional, Tuple
+
+DEFAULT_CACHE_PATH = "output/cache/results.db"
+
+FRESH = "fresh"
+STALE = "stale"
+
+
+def normalize_text(text: str) -> str:
+    """Lowercased with runs of whitespace folded, for free-text queries"""
+    return " ".join(text.lower().split())
+
+
+def cache_key(*parts: Any, normalize: bool = True) -> str:
+    """
+    Stable key for request parameters. Order matters; with `normalize` the
+    case and spacing of strings do not. Pass normalize=False when parts
+    include case-sensitive values such as ids or page tokens.
+    """
+    normalized = [normalize_text(p) if normalize and isinstance(p, str) else p for p in parts]
+    return hashlib.sha256(json.dumps(normalized, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class PersistentCache:
+    """Named TTL cache with stale-while-revalidate and hit/miss stats"""
+
+    # One small pool for background refreshes across every cache
+    _refresh_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="cache-refresh")
+
+    def __init__(self, name: str, ttl_seconds: float, stale_seconds: float = 0.0,
+                 path: Optional[str] = None, max_entries: int = 5000):
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        # How long past the TTL an entry may still be served while it is refreshed
+        self.stale_seconds = stale_seconds
+        self.max_entries = max_entries
+        self.path = path or os.getenv("RESULT_CACHE_PATH", DEFAULT_CACHE_PATH)
+        self._lock = threading.Lock()
+        self._refreshing: set = set()
+        self._stats = {"hits": 0, "stale_hits": 0, "misses": 0, "refreshes": 0,
+                       "refresh_errors": 0, "revalidated": 0}
+
+        cache_dir = os.path.dirname(self.path)
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS cache_entries (
+                    cache TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    meta TEXT,
+                    created_at REAL NOT NULL,
+                    last_used REAL NOT NULL,
+                    PRIMARY KEY (cache, key)
+                )
+            """)
+        _register(self)
+
+    # ------------------------------------------------------------------ #
+    def lookup(self, key: str) -> Tuple[Optional[Any], Optional[str], Dict[str, Any]]:
+        """Return (value, FRESH/STALE/None, meta) without fetching or counting stats"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT value, meta, created_at FROM cache_entries WHERE cache = ? AND key = ?",
+                (self.name, key),
+            ).fetchone()
+            if row is None:
+                return None, None, {}
+            age = time.time() - row[2]
+            meta = json.loads(row[1]) if row[1] else {}
+            if age <= self.ttl_seconds:
+                state = FRESH
+            elif age <= self.ttl_seconds + self.stale_seconds:
+                state = STALE
+            else:
+                # Expired entries are kept for their metadata (e.g. an ETag to revalidate with)
+                return None, None, meta
+            conn.execute(
+                "UPDATE cache_entries SET last_used = ? WHERE cache = ? AND key = ?",
+                (time.time(), self.name, key),
+            )
+        return json.loads(row[0]), state, meta
+
+    def put(self, key: str, value: Any, meta: Optional[Dict[str, Any]] = None) -> None:
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache_entries (cache, key, value, meta, created_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (self.name, key, json.dumps(value), json.dumps(meta) if meta else None, now, now),
+            )
+            self._evict(conn)
+
+    def touch(self, key: str) -> None:
+        """Mark an entry as freshly validated without rewriting its value"""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE cache_entries SET created_at = ?, last_used = ? WHERE cache = ? AND key = ?",
+                (now, now, self.name, key),
+            )
+
+    def get_or_fetch(self, key: str, fetch: Callable[[], Any]) -> Any:
+        """
+        Serve `key` from the cache, calling `fetch()` on a miss. A stale entry
+        is returned immediately and refreshed in the background.
+        """
+        value, state, _ = self.lookup(key)
+        if state == FRESH:
+            self._count("hits")
+            return value
+        if state == STALE:
+            self._count("stale_hits")
+            self._refresh_in_background(key, fetch)
+            return value
+        self._count("misses")
+        value = fetch()
+        self.put(key, value)
+        return value
+
+    def _refresh_in_background(self, key: str, fetch: Callable[[], Any]) -> None:
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh() -> None:
+            try:
+                self.put(key, fetch())
+                self._count("refreshes")
+            except Exception as e:
+                # The stale value keeps being served until a refresh succeeds
+                self._count("refresh_errors")
+                print(f"⚠️ {self.name} cache refresh failed: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        self._refresh_pool.submit(refresh)
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        count = conn.execute("SELECT COUNT(*) FROM cache_entries WHERE cache = ?", (self.name,)).fetchone()[0]
+        if count > self.max_entries:
+            conn.execute(
+                "DELETE FROM cache_entries WHERE cache = ? AND key IN ("
+                "SELECT key FROM cache_entries WHERE cache = ? ORDER BY last_used LIMIT ?)",
+                (self.name, self.name, count - self.max_entries),
+            )
+
+    def record(self, stat: str) -> None:
+        """Count a lookup that a caller served itself instead of via get_or_fetch"""
+        self._count(stat)
+
+    def _count(self, stat: str) -> None:
+        with self._lock:
+            self._stats[stat] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._connect() as conn:
+            entries = conn.execute("SELECT COUNT(*) FROM cache_entries WHERE cache = ?", (self.name,)).fetchone()[0]
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["stale_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["hits"] + stats["stale_hits"]) / lookups, 3) if lookups else 0.0
+        stats["entries"] = entries
+        return stats
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+
+_caches: Dict[str, PersistentCache] = {}
+_caches_lock = threading.Lock()
+
+
+def _register(cache: PersistentCache) -> None:
+    with _caches_lock:
+        _caches[cache.name] = cache
+
+
+def cache_stats() -> Dict[str, Dict[str, Any]]:
+    """Stats of every cache created in this process"""
+    with _caches_lock:
+        caches = dict(_caches)
+    return {name: cache.stats() for name, cache in caches.items()}
@@ -0,0 +1,161 @@
+# utils/http_client.py
+"""
+Shared HTTP transport for the tools.
+One process-wide requests.Session keeps connections alive, with a bounded
+connection pool per host. Requests are retried with jittered exponential
+backoff on 429 and 5xx responses (and connection errors), honoring
+Retry-After. POST and other non-idempotent requests are only retried on 429,
+which means the server did not act on them. Latency, retries and bytes are
+counted per host.
+"""
+
+import os
+import time
+import random
+import threading
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+
+MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", 3))
+BACKOFF_BASE = float(os.getenv("HTTP_BACKOFF_BASE", 0.5))
+BACKOFF_MAX = float(os.getenv("HTTP_BACKOFF_MAX", 30.0))
+# Connections kept (and allowed at once) per host; further requests wait for a free one
+MAX_PER_HOST = int(os.getenv("HTTP_MAX_PER_HOST", 10))
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """The process-wide session, created on first use"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            adapter = HTTPAdapter(pool_connections=32, pool_maxsize=MAX_PER_HOST, pool_block=True)
+            session = requests.Session()
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+        return _session
+
+
+def retry_after_seconds(response: requests.Response) -> Optional[float]:
+    """Wait requested by a Retry-After header (delta seconds or HTTP date)"""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_seconds(attempt: int) -> float:
+    """Full-jitter exponential backoff for retry number `attempt` (0-based)"""
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)))
+
+
+class HttpMetrics:
+    """Per-host request counts, retries, errors, bytes and latencies"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._hosts: Dict[str, Dict[str, Any]] = {}
+
+    def record(self, host: str, latency: float, received: int = 0, sent: int = 0,
+               retries: int = 0, error: bool = False) -> None:
+        with self._lock:
+            stats = self._hosts.setdefault(host, {
+                "requests": 0, "retries": 0, "errors": 0, "bytes_received": 0, "bytes_sent": 0, "latencies": [],
+            })
+            stats["requests"] += 1
+            stats["retries"] += retries
+            stats["errors"] += int(error)
+            stats["bytes_received"] += received
+            stats["bytes_sent"] += sent
+            stats["latencies"].append(latency)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            hosts = {host: dict(stats, latencies=list(stats["latencies"])) for host, stats in self._hosts.items()}
+        for stats in hosts.values():
+            latencies: List[float] = sorted(stats.pop("latencies"))
+            stats["p50_ms"] = round(latencies[len(latencies) // 2] * 1000, 1) if latencies else 0.0
+            stats["p95_ms"] = round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000, 1) if latencies else 0.0
+        return hosts
+
+
+metrics = HttpMetrics()
+
+
+def request(method: str, url: str, max_retries: Optional[int] = None, deadline: Optional[float] = None,
+            **kwargs: Any) -> requests.Response:
+    """
+    Send a request through the shared session, retrying throttled and failed
+    attempts. `deadline` (time.monotonic()) stops retries that would end after
+    it. The final response is returned whatever its status; only connection
+    errors that are not retried raise.
+    """
+    method = method.upper()
+    max_retries = MAX_RETRIES if max_retries is None else max_retries
+    retry_statuses = RETRY_STATUSES if method in IDEMPOTENT_METHODS else frozenset({429})
+    host = urlsplit(url).netloc
+    session = get_session()
+    start = time.monotonic()
+    attempt = 0
+
+    while True:
+        try:
+            response = session.request(method, url, **kwargs)
+        except (requests.ConnectionError, requests.Timeout):
+            delay = backoff_seconds(attempt)
+            if method not in IDEMPOTENT_METHODS or attempt >= max_retries or not _in_time(delay, deadline):
+                metrics.record(host, time.monotonic() - start, retries=attempt, error=True)
+                raise
+        else:
+            if response.status_code not in retry_statuses or attempt >= max_retries:
+                break
+            server_wait = retry_after_seconds(response)
+            delay = server_wait if server_wait is not None else backoff_seconds(attempt)
+            if delay > BACKOFF_MAX or not _in_time(delay, deadline):
+                break
+            response.close()
+        attempt += 1
+        time.sleep(delay)
+
+    # Streamed bodies are not read here; their declared length is counted instead
+    if kwargs.get("stream"):
+        received = int(response.headers.get("Content-Length") or 0)
+    else:
+        received = len(response.content)
+    body = response.request.body if response.request is not None else None
+    metrics.record(host, time.monotonic() - start, received=received, sent=len(body or b""),
+                   retries=attempt, error=response.status_code >= 400)
+    return response
+
+
+def _in_time(delay: float, deadline: Optional[float]) -> bool:
+    return deadline is None or time.monotonic() + delay < deadline
+
+
+def get(url: str, **kwargs: Any) -> requests.Response:
+    return request("GET", url, **kwargs)
+
+
+def post(url: str, **kwargs: Any) -> requests.Response:
+    return request("POST", url, **kwargs)
+
+
+def http_stats() -> Dict[str, Dict[str, Any]]:
+    return metrics.snapshot()
@@ -0,0 +1,467 @@
+# utils/ledger.py
+"""
+Persistent token and cost ledger.
+Every LLM call made during a flow phase is recorded with its run, phase,
+task and agent; each phase also stores the exact crew totals from
+CrewOutput.token_usage, and every RAG query records the tokens of its
+results before and after context compression. Runs are kept in SQLite so cost per topic, tokens per
+published word and trends over time can be queried later:
+
+    python -m utils.ledger runs
+    python -m utils.ledger show <run-id>
+    python -m utils.ledger topics
+    python -m utils.ledger trend --days 30
+"""
+
+import os
+import time
+import sqlite3
+import argparse
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Tuple
+
+DEFAULT_DB_PATH = "output/ledger/ledger.db"
+
+# USD per million tokens; update when provider pricing changes
+MODEL_PRICES: Dict[str, Dict[str, float]] = {
+    "gemini/gemini-2.5-flash": {"input": 0.30, "cached_input": 0.075, "output": 2.50},
+}
+DEFAULT_PRICE = {"input": 0.30, "cached_input": 0.075, "output": 2.50}
+
+# (ledger, run id, phase) that LLM calls in the current flow phase belong to
+_attribution: ContextVar[Optional[Tuple["TokenLedger", str, str]]] = ContextVar("ledger_attribution", default=None)
+# (task, agent) of the last LLM call in this context; the tool calls an agent
+# asks for run right after its LLM call, in the same thread
+_caller: ContextVar[Optional[Tuple[Optional[str], Optional[str]]]] = ContextVar("ledger_caller", default=None)
+
+
+def price_for(model: Optional[str]) -> Dict[str, float]:
+    return MODEL_PRICES.get(model or "", DEFAULT_PRICE)
+
+
+def cost_usd(prompt_tokens: int, completion_tokens: int, cached_prompt_tokens: int = 0,
+             model: Optional[str] = None) -> float:
+    """Cost of a call or total; cached prompt tokens are part of `prompt_tokens`"""
+    price = price_for(model)
+    uncached = max(0, prompt_tokens - cached_prompt_tokens)
+    return (
+        uncached * price["input"]
+        + cached_prompt_tokens * price["cached_input"]
+        + completion_tokens * price["output"]
+    ) / 1_000_000
+
+
+def count_words(markdown: str) -> int:
+    """Words in a published article, ignoring YAML frontmatter"""
+    text = markdown.strip()
+    if text.startswith("---"):
+        end = text.find("\n---", 3)
+        if end != -1:
+            text = text[end + 4:]
+    return len(text.split())
+
+
+class TokenLedger:
+    """SQLite store of runs, per-call usage and exact per-phase totals"""
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or os.getenv("LEDGER_DB_PATH", DEFAULT_DB_PATH)
+        os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS runs (
+                    run_id TEXT PRIMARY KEY,
+                    topic TEXT,
+                    namespace TEXT,
+                    started_at REAL NOT NULL,
+                    finished_at REAL,
+                    status TEXT NOT NULL DEFAULT 'running',
+                    published_words INTEGER NOT NULL DEFAULT 0
+                );
+                CREATE TABLE IF NOT EXISTS llm_calls (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    run_id TEXT NOT NULL,
+                    phase TEXT,
+                    task TEXT,
+                    agent TEXT,
+                    model TEXT,
+                    prompt_tokens INTEGER NOT NULL,
+                    completion_tokens INTEGER NOT NULL,
+                    cached_prompt_tokens INTEGER NOT NULL DEFAULT 0,
+                    estimated INTEGER NOT NULL DEFAULT 0,
+                    seconds REAL,
+                    created_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_llm_calls_run ON llm_calls(run_id);
+                CREATE TABLE IF NOT EXISTS phase_usage (
+                    run_id TEXT NOT NULL,
+                    phase TEXT NOT NULL,
+                    model TEXT,
+                    prompt_tokens INTEGER NOT NULL,
+                    completion_tokens INTEGER NOT NULL,
+                    cached_prompt_tokens INTEGER NOT NULL,
+                    total_tokens INTEGER NOT NULL,
+                    successful_requests INTEGER NOT NULL,
+                    PRIMARY KEY (run_id, phase)
+                );
+                CREATE TABLE IF NOT EXISTS retrieval_calls (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    run_id TEXT NOT NULL,
+                    phase TEXT,
+                    chunks_before INTEGER NOT NULL,
+                    chunks_after INTEGER NOT NULL,
+                    tokens_before INTEGER NOT NULL,
+                    tokens_after INTEGER NOT NULL,
+                    created_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_retrieval_calls_run ON retrieval_calls(run_id);
+                """
+            )
+
+    # ------------------------------------------------------------------ #
+    # Recording
+    # ------------------------------------------------------------------ #
+    def start_run(self, run_id: str, topic: str, namespace: Optional[str] = None) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO runs (run_id, topic, namespace, started_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(run_id) DO UPDATE SET status = 'running', finished_at = NULL",
+                (run_id, topic, namespace, time.time()),
+            )
+
+    def finish_run(self, run_id: str, status: str = "completed", published_words: Optional[int] = None) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE runs SET status = ?, finished_at = ?, "
+                "published_words = COALESCE(?, published_words) WHERE run_id = ?",
+                (status, time.time(), published_words, run_id),
+            )
+
+    def record_call(self, run_id: str, phase: Optional[str], model: Optional[str], prompt_tokens: int,
+                    completion_tokens: int, cached_prompt_tokens: int = 0, estimated: bool = False,
+                    seconds: Optional[float] = None, task: Optional[str] = None, agent: Optional[str] = None) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO llm_calls (run_id, phase, task, agent, model, prompt_tokens, completion_tokens, "
+                "cached_prompt_tokens, estimated, seconds, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (run_id, phase, task, agent, model, prompt_tokens, completion_tokens,
+                 cached_prompt_tokens, int(estimated), seconds, time.time()),
+            )
+
+    def record_retrieval(self, run_id: str, phase: Optional[str], chunks_before: int, chunks_after: int,
+                         tokens_before: int, tokens_after: int) -> None:
+        """One RAG query: chunks and estimated tokens of its results before and after compression"""
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO retrieval_calls (run_id, phase, chunks_before, chunks_after, tokens_before, "
+                "tokens_after, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (run_id, phase, chunks_before, chunks_after, tokens_before, tokens_after, time.time()),
+            )
+
+    def record_phase(self, run_id: str, phase: str, usage: Dict[str, Any], model: Optional[str] = None) -> None:
+        """
+        Store the exact crew totals (CrewOutput.token_usage) for a phase. A
+        resumed phase only runs its remaining tasks, so attempts add up.
+        """
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO phase_usage (run_id, phase, model, prompt_tokens, completion_tokens, "
+                "cached_prompt_tokens, total_tokens, successful_requests) VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(run_id, phase) DO UPDATE SET "
+                "prompt_tokens = prompt_tokens + excluded.prompt_tokens, "
+                "completion_tokens = completion_tokens + excluded.completion_tokens, "
+                "cached_prompt_tokens = cached_prompt_tokens + excluded.cached_prompt_tokens, "
+                "total_tokens = total_tokens + excluded.total_tokens, "
+                "successful_requests = successful_requests + excluded.successful_requests",
+                (
+                    run_id, phase, model,
+                    int(usage.get("prompt_tokens") or 0),
+                    int(usage.get("completion_tokens") or 0),
+                    int(usage.get("cached_prompt_tokens") or 0),
+                    int(usage.get("total_tokens") or 0),
+                    int(usage.get("successful_requests") or 0),
+                ),
+            )
+
+    # ------------------------------------------------------------------ #
+    # Queries
+    # ------------------------------------------------------------------ #
+    def runs(self, limit: int = 20, topic: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Most recent runs with token totals, cost and tokens per published word"""
+        sql = "SELECT run_id FROM runs" + (" WHERE topic = ?" if topic else "") + " ORDER BY started_at DESC LIMIT ?"
+        with self._connect() as conn:
+            run_ids = [r[0] for r in conn.execute(sql, ((topic, limit) if topic else (limit,))).fetchall()]
+        return [self.run_summary(run_id) for run_id in run_ids]
+
+    def run_summary(self, run_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Totals for one run. Exact per-phase totals are used where recorded;
+        phases without them fall back to the sum of the per-call rows.
+        """
+        with self._connect() as conn:
+            run = conn.execute(
+                "SELECT run_id, topic, namespace, started_at, finished_at, status, published_words "
+                "FROM runs WHERE run_id = ?", (run_id,)
+            ).fetchone()
+            if run is None:
+                return None
+            phases = {
+                r[0]: {"model": r[1], "prompt_tokens": r[2], "completion_tokens": r[3], "cached_prompt_tokens": r[4],
+                       "requests": r[5], "source": "crew"}
+                for r in conn.execute(
+                    "SELECT phase, model, prompt_tokens, completion_tokens, cached_prompt_tokens, successful_requests "
+                    "FROM phase_usage WHERE run_id = ?", (run_id,)
+                )
+            }
+            for r in conn.execute(
+                "SELECT COALESCE(phase, ''), MAX(model), SUM(prompt_tokens), SUM(completion_tokens), "
+                "SUM(cached_prompt_tokens), COUNT(*) FROM llm_calls WHERE run_id = ? GROUP BY phase", (run_id,)
+            ):
+                phases.setdefault(r[0], {"model": r[1], "prompt_tokens": r[2], "completion_tokens": r[3],
+                                         "cached_prompt_tokens": r[4], "requests": r[5], "source": "calls"})
+            retrieval = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(chunks_before), 0), COALESCE(SUM(chunks_after), 0), "
+                "COALESCE(SUM(tokens_before), 0), COALESCE(SUM(tokens_after), 0) FROM retrieval_calls WHERE run_id = ?",
+                (run_id,),
+            ).fetchone()
+
+        for usage in phases.values():
+            usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+            usage["cost_usd"] = cost_usd(usage["prompt_tokens"], usage["completion_tokens"],
+                                         usage["cached_prompt_tokens"], usage["model"])
+        total_tokens = sum(p["total_tokens"] for p in phases.values())
+        words = run[6]
+        return {
+            "run_id": run[0],
+            "topic": run[1],
+            "namespace": run[2],
+            "started_at": run[3],
+            "seconds": round(run[4] - run[3], 1) if run[4] else None,
+            "status": run[5],
+            "published_words": words,
+            "prompt_tokens": sum(p["prompt_tokens"] for p in phases.values()),
+            "completion_tokens": sum(p["completion_tokens"] for p in phases.values()),
+            "cached_prompt_tokens": sum(p["cached_prompt_tokens"] for p in phases.values()),
+            "total_tokens": total_tokens,
+            "requests": sum(p["requests"] for p in phases.values()),
+            "cost_usd": round(sum(p["cost_usd"] for p in phases.values()), 6),
+            "tokens_per_word": round(total_tokens / words, 1) if words else None,
+            "phases": phases,
+            "retrieval": {
+                "queries": retrieval[0],
+                "chunks_before": retrieval[1],
+                "chunks_after": retrieval[2],
+                "tokens_before": retrieval[3],
+                "tokens_after": retrieval[4],
+                # Tool results are re-sent on every later step of a task, so this is a lower bound
+                "saved_usd": round(cost_usd(max(0, retrieval[3] - retrieval[4]), 0), 6),
+            },
+        }
+
+    def breakdown(self, run_id: str, by: str = "task") -> List[Dict[str, Any]]:
+        """Per-call usage of a run grouped by `task`, `agent` or `phase`"""
+        if by not in ("task", "agent", "phase"):
+            raise ValueError(f"Cannot group by {by!r}")
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT COALESCE({by}, '?'), MAX(model), COUNT(*), SUM(prompt_tokens), SUM(completion_tokens), "
+                f"SUM(cached_prompt_tokens), SUM(estimated), SUM(COALESCE(seconds, 0)) FROM llm_calls "
+                f"WHERE run_id = ? GROUP BY {by} ORDER BY SUM(prompt_tokens + completion_tokens) DESC",
+                (run_id,),
+            ).fetchall()
+        return [
+            {
+                by: r[0], "requests": r[2], "prompt_tokens": r[3], "completion_tokens": r[4],
+                "cached_prompt_tokens": r[5], "estimated_calls": r[6], "llm_seconds": round(r[7], 2),
+                "cost_usd": round(cost_usd(r[3], r[4], r[5], r[1]), 6),
+            }
+            for r in rows
+        ]
+
+    def topics(self) -> List[Dict[str, Any]]:
+        """Cost per topic across completed runs"""
+        per_topic: Dict[str, Dict[str, Any]] = {}
+        for summary in self._completed_runs():
+            row = per_topic.setdefault(summary["topic"], {"topic": summary["topic"], "runs": 0, "total_tokens": 0,
+                                                          "cost_usd": 0.0, "published_words": 0})
+            row["runs"] += 1
+            row["total_tokens"] += summary["total_tokens"]
+            row["cost_usd"] += summary["cost_usd"]
+            row["published_words"] += summary["published_words"]
+        for row in per_topic.values():
+            row["avg_cost_usd"] = round(row["cost_usd"] / row["runs"], 6)
+            row["cost_usd"] = round(row["cost_usd"], 6)
+            row["tokens_per_word"] = round(row["total_tokens"] / row["published_words"], 1) if row["published_words"] else None
+        return sorted(per_topic.values(), key=lambda r: r["cost_usd"], reverse=True)
+
+    def trend(self, days: int = 30) -> List[Dict[str, Any]]:
+        """Daily runs, tokens, cost and tokens per published word"""
+        since = time.time() - days * 86400
+        per_day: Dict[str, Dict[str, Any]] = {}
+        for summary in self._completed_runs(since):
+            day = time.strftime("%Y-%m-%d", time.localtime(summary["started_at"]))
+            row = per_day.setdefault(day, {"day": day, "runs": 0, "total_tokens": 0, "cost_usd": 0.0, "published_words": 0})
+            row["runs"] += 1
+            row["total_tokens"] += summary["total_tokens"]
+            row["cost_usd"] += summary["cost_usd"]
+            row["published_words"] += summary["published_words"]
+        for row in per_day.values():
+            row["cost_usd"] = round(row["cost_usd"], 6)
+            row["tokens_per_word"] = round(row["total_tokens"] / row["published_words"], 1) if row["published_words"] else None
+        return [per_day[day] for day in sorted(per_day)]
+
+    def _completed_runs(self, since: float = 0.0) -> List[Dict[str, Any]]:
+        with self._connect() as conn:
+            run_ids = [r[0] for r in conn.execute(
+                "SELECT run_id FROM runs WHERE status = 'completed' AND started_at >= ? ORDER BY started_at", (since,)
+            )]
+        return [self.run_summary(run_id) for run_id in run_ids]
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return _Closing(conn, self._lock)
+
+
+class _Closing:
+    """Commit-and-close connection context, serialized per ledger"""
+
+    def __init__(self, conn: sqlite3.Connection, lock: threading.Lock):
+        self.conn = conn
+        self.lock = lock
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.lock.acquire()
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        try:
+            if exc_type is None:
+                self.conn.commit()
+        finally:
+            self.conn.close()
+            self.lock.release()
+
+
+# ---------------------------------------------------------------------- #
+# Attribution of LLM calls to the running flow phase
+# ---------------------------------------------------------------------- #
+@contextmanager
+def attribute_to(ledger: TokenLedger, run_id: str, phase: str):
+    """Record LLM calls made in this context against `run_id` / `phase`"""
+    token = _attribution.set((ledger, run_id, phase))
+    try:
+        yield
+    finally:
+        _attribution.reset(token)
+
+
+def record_llm_call(model: Optional[str], prompt_tokens: int, completion_tokens: int,
+                    cached_prompt_tokens: int = 0, estimated: bool = False, seconds: Optional[float] = None,
+                    task: Optional[str] = None, agent: Optional[str] = None) -> None:
+    """Record one call against the active run; a no-op outside a flow phase"""
+    _caller.set((task, agent) if task or agent else None)
+    active = _attribution.get()
+    if active is None:
+        return
+    ledger, run_id, phase = active
+    try:
+        ledger.record_call(run_id, phase, model, prompt_tokens, completion_tokens, cached_prompt_tokens,
+                           estimated, seconds, task, agent)
+    except sqlite3.Error as e:
+        # Accounting must never fail the LLM call itself
+        print(f"⚠️ Ledger write failed: {e}")
+
+
+def record_retrieval(chunks_before: int, chunks_after: int, tokens_before: int, tokens_after: int) -> None:
+    """Record one RAG query's compression against the active run; a no-op outside a flow phase"""
+    active = _attribution.get()
+    if active is None:
+        return
+    ledger, run_id, phase = active
+    try:
+        ledger.record_retrieval(run_id, phase, chunks_before, chunks_after, tokens_before, tokens_after)
+    except sqlite3.Error as e:
+        print(f"⚠️ Ledger write failed: {e}")
+
+
+def active_run_id() -> Optional[str]:
+    """Run the current flow phase belongs to, if any"""
+    active = _attribution.get()
+    return active[1] if active else None
+
+
+def active_caller() -> Optional[Tuple[Optional[str], Optional[str]]]:
+    """(task, agent) of the latest LLM call in this context, i.e. the agent a tool call is made for"""
+    return _caller.get()
+
+
+# ---------------------------------------------------------------------- #
+# CLI
+# ---------------------------------------------------------------------- #
+def _fmt_words(value: Optional[float]) -> str:
+    return "-" if value is None else f"{value:,.1f}"
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m utils.ledger", description="Query the token and cost ledger")
+    parser.add_argument("--db", default=None, help=f"Ledger database (default: $LEDGER_DB_PATH or {DEFAULT_DB_PATH})")
+    sub = parser.add_subparsers(dest="command", required=True)
+    runs_cmd = sub.add_parser("runs", help="Recent runs with tokens, cost and tokens per published word")
+    runs_cmd.add_argument("--limit", type=int, default=20)
+    runs_cmd.add_argument("--topic", default=None)
+    show_cmd = sub.add_parser("show", help="Phase, task and agent breakdown of one run")
+    show_cmd.add_argument("run_id")
+    sub.add_parser("topics", help="Cost per topic across completed runs")
+    trend_cmd = sub.add_parser("trend", help="Daily totals")
+    trend_cmd.add_argument("--days", type=int, default=30)
+    args = parser.parse_args(argv)
+
+    ledger = TokenLedger(args.db)
+    if args.command == "runs":
+        print(f"{'Run':<22} {'Status':<10} {'Tokens':>10} {'Reqs':>5} {'Cost $':>9} {'Words':>6} {'Tok/word':>9}  Topic")
+        for r in ledger.runs(args.limit, args.topic):
+            print(f"{r['run_id']:<22} {r['status']:<10} {r['total_tokens']:>10,} {r['requests']:>5} "
+                  f"{r['cost_usd']:>9.4f} {r['published_words']:>6} {_fmt_words(r['tokens_per_word']):>9}  {r['topic']}")
+    elif args.command == "show":
+        summary = ledger.run_summary(args.run_id)
+        if summary is None:
+            print(f"❌ No run {args.run_id}")
+            return 1
+        print(f"📒 {summary['run_id']} — {summary['topic']} ({summary['status']})")
+        print(f"  Tokens: {summary['total_tokens']:,} (prompt {summary['prompt_tokens']:,}, "
+              f"completion {summary['completion_tokens']:,}, cached {summary['cached_prompt_tokens']:,})")
+        print(f"  Requests: {summary['requests']}   Cost: ${summary['cost_usd']:.4f}")
+        print(f"  Published words: {summary['published_words']}   Tokens/word: {_fmt_words(summary['tokens_per_word'])}")
+        retrieval = summary["retrieval"]
+        if retrieval["queries"]:
+            saved = 1 - retrieval["tokens_after"] / retrieval["tokens_before"] if retrieval["tokens_before"] else 0.0
+            print(f"  RAG context: {retrieval['queries']} queries, {retrieval['tokens_before']:,} -> "
+                  f"{retrieval['tokens_after']:,} tokens ({saved:.0%} saved, >= ${retrieval['saved_usd']:.4f})")
+        print(f"\n{'Phase':<26} {'Tokens':>10} {'Reqs':>5} {'Cost $':>9}  Source")
+        for phase, usage in summary["phases"].items():
+            print(f"{phase:<26} {usage['total_tokens']:>10,} {usage['requests']:>5} {usage['cost_usd']:>9.4f}  {usage['source']}")
+        for by in ("task", "agent"):
+            rows = ledger.breakdown(args.run_id, by)
+            if rows:
+                print(f"\n{by.capitalize():<40} {'Prompt':>9} {'Compl.':>8} {'Reqs':>5} {'Cost $':>9}")
+                for r in rows:
+                    print(f"{r[by][:40]:<40} {r['prompt_tokens']:>9,} {r['completion_tokens']:>8,} "
+                          f"{r['requests']:>5} {r['cost_usd']:>9.4f}")
+    elif args.command == "topics":
+        print(f"{'Runs':>4} {'Avg cost $':>10} {'Total $':>9} {'Tok/word':>9}  Topic")
+        for r in ledger.topics():
+            print(f"{r['runs']:>4} {r['avg_cost_usd']:>10.4f} {r['cost_usd']:>9.4f} {_fmt_words(r['tokens_per_word']):>9}  {r['topic']}")
+    elif args.command == "trend":
+        print(f"{'Day':<10} {'Runs':>4} {'Tokens':>10} {'Cost $':>9} {'Tok/word':>9}")
+        for r in ledger.trend(args.days):
+            print(f"{r['day']:<10} {r['runs']:>4} {r['total_tokens']:>10,} {r['cost_usd']:>9.4f} {_fmt_words(r['tokens_per_word']):>9}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,150 @@
+# utils/rate_limiter.py
+"""
+Process-wide adaptive rate limiting for LLM calls.
+One limiter per model is shared by every crew and every concurrent flow in
+the process. It keeps two token buckets, requests/minute and tokens/minute,
+and adapts AIMD-style: a 429/quota error halves the allowed rate and pauses
+callers, and every success adds a little rate back up to the configured limit.
+"""
+
+import re
+import time
+import threading
+from typing import Dict, Optional
+
+RATE_LIMIT_MARKERS = ("rate limit", "ratelimit", "resource_exhausted", "resource exhausted", "quota")
+
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    """True for provider throttling errors (HTTP 429, quota exhausted)"""
+    if getattr(error, "status_code", None) == 429 or type(error).__name__ == "RateLimitError":
+        return True
+    text = str(error).lower()
+    return bool(re.search(r"\b429\b", text)) or any(marker in text for marker in RATE_LIMIT_MARKERS)
+
+
+def retry_after_seconds(error: BaseException) -> Optional[float]:
+    """Server-suggested wait from the error, if any ('retry in 17s', 'retryDelay': '17s')"""
+    match = re.search(r"retry(?:[ _-]?after|[ _-]?delay|\s+in)[\"':\s]*([\d.]+)\s*s", str(error), re.IGNORECASE)
+    return float(match.group(1)) if match else None
+
+
+class _Bucket:
+    """Token bucket refilled continuously at `rate_per_minute`"""
+
+    def __init__(self, rate_per_minute: float):
+        self.rate = rate_per_minute
+        self.level = rate_per_minute
+        self.updated = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        self.level = min(self.rate, self.level + (now - self.updated) * self.rate / 60.0)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        # A request bigger than the whole bucket only waits for a full bucket
+        amount = min(amount, self.rate)
+        return 0.0 if self.level >= amount else (amount - self.level) * 60.0 / self.rate
+
+
+class AdaptiveRateLimiter:
+    """Requests/minute and tokens/minute buckets with AIMD on throttling errors"""
+
+    def __init__(self, max_rpm: float, max_tpm: float, min_fraction: float = 0.1,
+                 decrease_factor: float = 0.5, increase_fraction: float = 0.05,
+                 default_backoff: float = 10.0):
+        self.max_rpm = max_rpm
+        self.max_tpm = max_tpm
+        self.min_fraction = min_fraction
+        self.decrease_factor = decrease_factor
+        # Rate regained per success, as a fraction of the configured maximum
+        self.increase_fraction = increase_fraction
+        self.default_backoff = default_backoff
+        self._requests = _Bucket(max_rpm)
+        self._tokens = _Bucket(max_tpm)
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "throttled": 0, "rate_limited": 0, "waited_seconds": 0.0}
+
+    @property
+    def fraction(self) -> float:
+        """Current allowed rate as a fraction of the configured maximum"""
+        return self._requests.rate / self.max_rpm
+
+    def acquire(self, tokens: float = 0) -> float:
+        """Block until one request of about `tokens` tokens may be sent; returns seconds waited"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._requests.refill(now)
+                self._tokens.refill(now)
+                wait = max(
+                    self._paused_until - now,
+                    self._requests.wait_time(1),
+                    self._tokens.wait_time(tokens),
+                )
+                if wait <= 0:
+                    self._requests.level -= 1
+                    self._tokens.level -= min(tokens, self._tokens.rate)
+                    self.stats["requests"] += 1
+                    if waited:
+                        self.stats["throttled"] += 1
+                        self.stats["waited_seconds"] = round(self.stats["waited_seconds"] + waited, 3)
+                    return waited
+            time.sleep(wait)
+            waited += wait
+
+    def record_tokens(self, extra_tokens: float) -> None:
+        """Charge (or refund, if negative) the difference between estimated and actual tokens"""
+        with self._lock:
+            self._tokens.level = min(self._tokens.rate, self._tokens.level - extra_tokens)
+
+    def on_success(self) -> None:
+        """Additive increase back towards the configured limits"""
+        with self._lock:
+            self._set_fraction(self.fraction + self.increase_fraction)
+
+    def on_rate_limit(self, retry_after: Optional[float] = None) -> float:
+        """Multiplicative decrease plus a pause for every caller; returns the pause length"""
+        with self._lock:
+            self.stats["rate_limited"] += 1
+            self._set_fraction(self.fraction * self.decrease_factor)
+            pause = retry_after if retry_after is not None else self.default_backoff
+            self._paused_until = max(self._paused_until, time.monotonic() + pause)
+            return pause
+
+    def _set_fraction(self, fraction: float) -> None:
+        fraction = max(self.min_fraction, min(1.0, fraction))
+        self._requests.rate = self.max_rpm * fraction
+        self._tokens.rate = self.max_tpm * fraction
+        self._requests.level = min(self._requests.level, self._requests.rate)
+        self._tokens.level = min(self._tokens.level, self._tokens.rate)
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                **self.stats,
+                "rpm": round(self._requests.rate, 2),
+                "tpm": round(self._tokens.rate),
+                "max_rpm": self.max_rpm,
+                "max_tpm": self.max_tpm,
+            }
+
+
+_limiters: Dict[str, AdaptiveRateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(key: str, max_rpm: float, max_tpm: float) -> AdaptiveRateLimiter:
+    """Process-wide limiter for `key` (usually the model name); created on first use"""
+    with _limiters_lock:
+        if key not in _limiters:
+            _limiters[key] = AdaptiveRateLimiter(max_rpm=max_rpm, max_tpm=max_tpm)
+        return _limiters[key]
+
+
+def rate_limiter_stats() -> Dict[str, Dict[str, float]]:
+    with _limiters_lock:
+        limiters = dict(_limiters)
+    return {key: limiter.snapshot() for key, limiter in limiters.items()}
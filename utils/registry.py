@@ -0,0 +1,104 @@
+# utils/registry.py
+"""
+Lazy component registry.
+Tools, LLM clients and models are registered by import path and only built
+on first use; every crew gets the same shared instance. The registry also
+records what each component cost to import and initialize.
+"""
+
+import time
+import importlib
+import threading
+from typing import Any, Callable, Dict, List, Optional, Union
+
+Factory = Union[str, Callable[[], Any]]
+
+
+def _resolve(target: str) -> tuple:
+    """Import 'package.module:attr' and return (attr, import seconds)"""
+    module_name, _, attr = target.partition(":")
+    started = time.perf_counter()
+    module = importlib.import_module(module_name)
+    import_seconds = time.perf_counter() - started
+    return getattr(module, attr), import_seconds
+
+
+class LazyRegistry:
+    """Builds shared components on first `get()` and times their startup cost"""
+
+    def __init__(self):
+        self._factories: Dict[str, Factory] = {}
+        self._instances: Dict[str, Any] = {}
+        self._timings: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.RLock()
+
+    def register(self, name: str, factory: Factory) -> None:
+        """
+        Register a component. `factory` is either a callable or an import path
+        like "tools.rag_tool:build_rag_tool" (a class or zero-argument function).
+        """
+        with self._lock:
+            self._factories[name] = factory
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._factories
+
+    def get(self, name: str) -> Any:
+        if name in self._instances:
+            return self._instances[name]
+        with self._lock:
+            if name in self._instances:
+                return self._instances[name]
+            if name not in self._factories:
+                raise KeyError(f"Unknown component: {name}")
+
+            factory = self._factories[name]
+            import_seconds = 0.0
+            if isinstance(factory, str):
+                factory, import_seconds = _resolve(factory)
+
+            started = time.perf_counter()
+            instance = factory()
+            self._timings[name] = {
+                "component": name,
+                "import_seconds": round(import_seconds, 3),
+                "init_seconds": round(time.perf_counter() - started, 3),
+            }
+            self._instances[name] = instance
+            return instance
+
+    def timed_import(self, target: str) -> Any:
+        """Import 'module:attr', recording the import cost in the startup report"""
+        attr, import_seconds = _resolve(target)
+        with self._lock:
+            self._timings.setdefault(target, {
+                "component": target,
+                "import_seconds": round(import_seconds, 3),
+                "init_seconds": 0.0,
+            })
+        return attr
+
+    def report(self) -> List[Dict[str, Any]]:
+        """Startup cost per component, most expensive first"""
+        rows = list(self._timings.values())
+        return sorted(rows, key=lambda r: r["import_seconds"] + r["init_seconds"], reverse=True)
+
+    def print_report(self, printer: Optional[Callable[[str], None]] = None) -> None:
+        printer = printer or print
+        rows = self.report()
+        printer(f"{'Component':<40} {'Import (s)':>10} {'Init (s)':>10}")
+        for row in rows:
+            printer(f"{row['component']:<40} {row['import_seconds']:>10.3f} {row['init_seconds']:>10.3f}")
+        total = sum(r["import_seconds"] + r["init_seconds"] for r in rows)
+        printer(f"{'Total':<40} {total:>21.3f}")
+
+
+registry = LazyRegistry()
+
+# Shared components used by both crews
+registry.register("gemini_flash", "crew.llm:build_gemini_flash")
+registry.register("rag_tool", "tools.rag_tool:build_rag_tool")
+registry.register("search_and_emb_tool", "tools.search_and_emb:SearchAndEmbeddingTool")
+registry.register("pexels_cover_tool", "tools.image_search_tool:PexelsCoverImageTool")
+registry.register("devto_publisher_tool", "tools.devto_publisher_tool:DevToPublisherTool")
+registry.register("ledger", "utils.ledger:TokenLedger")
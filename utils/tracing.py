@@ -0,0 +1,238 @@
+# utils/tracing.py
+"""
+Lightweight span tracing for flow runs.
+Spans nest through a context variable (flow phase -> crew -> task -> agent
+step -> LLM/tool call -> HTTP request / embedding batch) and carry attributes
+such as URL, video_id, chunk and token counts. A run's spans export to the
+Chrome trace format (open in chrome://tracing or https://ui.perfetto.dev).
+With no active tracer every call here is a cheap no-op.
+"""
+
+import os
+import json
+import time
+import functools
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+TRACE_DIR = "output/traces"
+
+_active_tracer: contextvars.ContextVar[Optional["Tracer"]] = contextvars.ContextVar("active_tracer", default=None)
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    """One timed operation; attributes can be added until it ends"""
+
+    __slots__ = ("name", "category", "attrs", "parent", "start", "end", "thread_id")
+
+    def __init__(self, name: str, category: str, attrs: Dict[str, Any], parent: Optional["Span"]):
+        self.name = name
+        self.category = category
+        self.attrs = attrs
+        self.parent = parent
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+        self.thread_id = threading.get_ident()
+
+    def set(self, **attrs: Any) -> None:
+        self.attrs.update(attrs)
+
+    @property
+    def duration(self) -> float:
+        return (self.end or time.perf_counter()) - self.start
+
+
+class _NoopSpan:
+    def set(self, **attrs: Any) -> None:
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+class Tracer:
+    """Collects the finished spans of one run"""
+
+    def __init__(self, run_id: str):
+        self.run_id = run_id
+        self.origin = time.perf_counter()
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+        # Per-thread boundary of the last task/agent step, for callback-based spans
+        self._marks: Dict[tuple, float] = {}
+
+    @contextmanager
+    def activate(self):
+        """Make this tracer record spans in the current context"""
+        token = _active_tracer.set(self)
+        try:
+            yield self
+        finally:
+            _active_tracer.reset(token)
+
+    def record(self, span: Span) -> None:
+        with self._lock:
+            self.spans.append(span)
+
+    def add_completed(self, name: str, category: str, start: float, end: float, **attrs: Any) -> None:
+        """Record a span whose boundaries were observed after the fact"""
+        span = Span(name, category, attrs, _current_span.get())
+        span.start, span.end = start, end
+        self.record(span)
+
+    def mark(self, key: str, now: Optional[float] = None) -> float:
+        """Set a per-thread boundary and return the previous one (or now)"""
+        now = now or time.perf_counter()
+        slot = (threading.get_ident(), key)
+        with self._lock:
+            previous = self._marks.get(slot, now)
+            self._marks[slot] = now
+        return previous
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """Total time per span name, largest first"""
+        totals: Dict[str, Dict[str, Any]] = {}
+        with self._lock:
+            spans = list(self.spans)
+        for span in spans:
+            row = totals.setdefault(span.name, {"name": span.name, "category": span.category, "count": 0, "seconds": 0.0})
+            row["count"] += 1
+            row["seconds"] += span.duration
+        for row in totals.values():
+            row["seconds"] = round(row["seconds"], 3)
+        return sorted(totals.values(), key=lambda r: r["seconds"], reverse=True)
+
+    def to_chrome_trace(self) -> Dict[str, Any]:
+        with self._lock:
+            spans = list(self.spans)
+        thread_ids: Dict[int, int] = {}
+        events = []
+        # Parents first when spans start together, so viewers nest them correctly
+        for span in sorted(spans, key=lambda s: (s.start, -s.duration)):
+            tid = thread_ids.setdefault(span.thread_id, len(thread_ids) + 1)
+            events.append({
+                "name": span.name,
+                "cat": span.category,
+                "ph": "X",
+                "ts": round((span.start - self.origin) * 1e6, 1),
+                "dur": round(span.duration * 1e6, 1),
+                "pid": 1,
+                "tid": tid,
+                "args": {k: _jsonable(v) for k, v in span.attrs.items()},
+            })
+        events.extend(
+            {"name": "thread_name", "ph": "M", "pid": 1, "tid": tid, "args": {"name": f"thread-{tid}"}}
+            for tid in thread_ids.values()
+        )
+        events.append({"name": "process_name", "ph": "M", "pid": 1, "args": {"name": f"run {self.run_id}"}})
+        return {"traceEvents": events, "displayTimeUnit": "ms", "otherData": {"run_id": self.run_id}}
+
+    def export(self, path: Optional[str] = None) -> str:
+        """Write the Chrome trace JSON (default: output/traces/trace_{run_id}.json)"""
+        path = path or os.path.join(TRACE_DIR, f"trace_{self.run_id}.json")
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_chrome_trace(), f)
+        return path
+
+
+def _jsonable(value: Any) -> Any:
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    return str(value)
+
+
+def current_tracer() -> Optional[Tracer]:
+    return _active_tracer.get()
+
+
+@contextmanager
+def span(name: str, category: str = "app", **attrs: Any):
+    """Time the enclosed block as a child of the current span"""
+    tracer = _active_tracer.get()
+    if tracer is None:
+        yield _NOOP
+        return
+    current = Span(name, category, attrs, _current_span.get())
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.set(error=f"{type(e).__name__}: {e}")
+        raise
+    finally:
+        current.end = time.perf_counter()
+        _current_span.reset(token)
+        tracer.record(current)
+
+
+def traced(name: Optional[str] = None, category: str = "app") -> Callable:
+    """Decorator form of `span`"""
+    def decorator(func: Callable) -> Callable:
+        label = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with span(label, category):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def propagate(func: Callable) -> Callable:
+    """
+    Run `func` in a copy of the caller's context, so spans (and the RAG
+    namespace) follow work handed to thread pools.
+    """
+    context = contextvars.copy_context()
+
+    @functools.wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        return context.copy().run(func, *args, **kwargs)
+    return wrapper
+
+
+def task_callback(output: Any) -> None:
+    """Crew task_callback: records each finished task as a span since the previous boundary"""
+    tracer = _active_tracer.get()
+    if tracer is None:
+        return
+    now = time.perf_counter()
+    start = tracer.mark("task", now)
+    tracer.mark("step", now)
+    raw = str(getattr(output, "raw", "") or "")
+    tracer.add_completed(
+        f"task:{getattr(output, 'name', None) or 'task'}", "task", start, now,
+        agent=str(getattr(output, "agent", "") or "").strip(),
+        output_chars=len(raw),
+        output_tokens_est=len(raw) // 4,
+    )
+
+
+def step_callback(step: Any) -> None:
+    """Crew step_callback: records each agent iteration (tool use or final answer) as a span"""
+    tracer = _active_tracer.get()
+    # Tool results are reported too, just before the AgentAction that closes the step
+    if tracer is None or not hasattr(step, "thought"):
+        return
+    now = time.perf_counter()
+    start = tracer.mark("step", now)
+    tool = getattr(step, "tool", None)
+    tracer.add_completed(
+        f"agent_step:{tool}" if tool else "agent_step:final_answer", "agent", start, now,
+        tool=tool,
+        tool_input=str(getattr(step, "tool_input", "") or "")[:200] if tool else None,
+        thought_chars=len(str(getattr(step, "thought", "") or "")),
+    )
+
+
+def start_crew_boundaries() -> None:
+    """Reset task/step boundaries to now; call right before a crew kickoff"""
+    tracer = _active_tracer.get()
+    if tracer is not None:
+        now = time.perf_counter()
+        tracer.mark("task", now)
+        tracer.mark("step", now)